@@ -0,0 +1,143 @@
+"""이미지 해상도(max_pixels)별 visual token 수 / 처리량 벤치마크.
+
+학습 데이터셋 앞부분 샘플을 태스크의 build_messages로 렌더링하고, max_pixels 설정마다
+- 샘플당 이미지 토큰 / 전체 토큰 수
+- processor 전처리 처리량 (samples/s)
+- (--train) bf16 LoRA forward+backward 처리량 (samples/s), peak GPU 메모리
+를 측정한다. 해상도를 얼마나 낮추면 얼마나 빨라지는지 보고 MAX_PIXELS를 고르는 용도.
+
+사용 예 (학습 Pod 또는 GPU 머신):
+    python bench_visual_tokens.py --task emoji --max-pixels 0,401408,200704,100352 --train
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from datasets import load_dataset
+from transformers import AutoProcessor
+
+from tasks import TASKS, get_task
+from utils.visual_tokens import apply_pixel_budget, image_tokens
+
+
+def render_samples(spec, processor, dataset_repo: str, n: int):
+    ds = load_dataset(dataset_repo, split=f"train[:{n}]")
+    conversations = [spec.build_messages(row) for row in ds]
+    texts = processor.apply_chat_template(conversations, tools=spec.tools, tokenize=False, add_generation_prompt=False)
+    images = [[row["image"].convert("RGB")] for row in ds]
+    return texts, images
+
+
+def measure_tokens(processor, texts, images) -> dict:
+    image_counts = [sum(image_tokens(processor.image_processor, im.height, im.width) for im in row) for row in images]
+    started = time.perf_counter()
+    total_counts = []
+    for text, row in zip(texts, images):
+        batch = processor(text=[text], images=row, return_tensors="pt")
+        total_counts.append(int(batch["input_ids"].shape[1]))
+    elapsed = time.perf_counter() - started
+    return {
+        "image_tokens_mean": float(np.mean(image_counts)),
+        "image_tokens_max": int(np.max(image_counts)),
+        "total_tokens_mean": float(np.mean(total_counts)),
+        "total_tokens_p95": float(np.percentile(total_counts, 95)),
+        "preprocess_samples_per_sec": len(texts) / elapsed,
+    }
+
+
+def measure_training(model, processor, texts, images, batch_size: int, steps: int, warmup: int = 2) -> dict:
+    import torch
+
+    def batches():
+        while True:
+            for start in range(0, len(texts) - batch_size + 1, batch_size):
+                batch = processor(
+                    text=texts[start:start + batch_size],
+                    images=[im for row in images[start:start + batch_size] for im in row],
+                    padding=True,
+                    return_tensors="pt",
+                ).to(model.device)
+                batch["labels"] = batch["input_ids"].masked_fill(batch["attention_mask"] == 0, -100)
+                yield batch
+
+    model.train()
+    it = batches()
+    torch.cuda.reset_peak_memory_stats()
+    for i in range(warmup + steps):
+        if i == warmup:
+            torch.cuda.synchronize()
+            started = time.perf_counter()
+        loss = model(**next(it)).loss
+        loss.backward()
+        model.zero_grad(set_to_none=True)
+    torch.cuda.synchronize()
+    elapsed = time.perf_counter() - started
+    return {
+        "train_samples_per_sec": steps * batch_size / elapsed,
+        "peak_memory_gb": torch.cuda.max_memory_allocated() / 1e9,
+    }
+
+
+def load_lora_model(model_id: str, attn_implementation: str):
+    import torch
+    from peft import LoraConfig, TaskType, get_peft_model
+    from transformers import Qwen3VLForConditionalGeneration
+
+    model = Qwen3VLForConditionalGeneration.from_pretrained(
+        model_id, torch_dtype=torch.bfloat16, device_map="auto", attn_implementation=attn_implementation,
+    )
+    model.gradient_checkpointing_enable()
+    model.enable_input_require_grads()
+    return get_peft_model(model, LoraConfig(
+        r=16, lora_alpha=32, task_type=TaskType.CAUSAL_LM,
+        target_modules=["q_proj", "k_proj", "v_proj", "o_proj", "gate_proj", "up_proj", "down_proj"],
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--task", default="emoji", choices=sorted(TASKS))
+    parser.add_argument("--dataset", default="", help="데이터셋 repo (기본: 태스크 기본 repo)")
+    parser.add_argument("--model-id", default="Qwen/Qwen3-VL-2B-Thinking")
+    parser.add_argument("--samples", type=int, default=64)
+    parser.add_argument("--min-pixels", type=int, default=0)
+    parser.add_argument("--max-pixels", default="0,802816,401408,200704,100352",
+                        help="쉼표 구분 max_pixels 목록 (0 = 모델 기본값)")
+    parser.add_argument("--train", action="store_true", help="GPU forward+backward 처리량도 측정")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--attn-implementation", default="sdpa")
+    parser.add_argument("--output", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    spec = get_task(args.task)
+    processor = AutoProcessor.from_pretrained(args.model_id)
+    texts, images = render_samples(spec, processor, args.dataset or spec.dataset_repo, args.samples)
+    model = load_lora_model(args.model_id, args.attn_implementation) if args.train else None
+
+    default = dict(processor.image_processor.size)
+    results = []
+    for max_pixels in (int(v) for v in args.max_pixels.split(",")):
+        budget = apply_pixel_budget(
+            processor, args.min_pixels or default["shortest_edge"], max_pixels or default["longest_edge"],
+        )
+        row = {**budget, **measure_tokens(processor, texts, images)}
+        if model is not None:
+            row.update(measure_training(model, processor, texts, images, args.batch_size, args.steps))
+        results.append(row)
+        print(f"  max_pixels={row['max_pixels']:>9}: image tokens {row['image_tokens_mean']:7.1f}/sample, "
+              f"total {row['total_tokens_mean']:7.1f} (p95 {row['total_tokens_p95']:.0f}), "
+              f"preprocess {row['preprocess_samples_per_sec']:6.1f} samples/s"
+              + (f", train {row['train_samples_per_sec']:5.2f} samples/s, peak {row['peak_memory_gb']:.1f}GB"
+                 if model is not None else ""))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"task": spec.name, "samples": len(texts), "results": results}, f, indent=2)
+        print(f"  saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
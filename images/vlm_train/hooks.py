@@ -0,0 +1,205 @@
+"""HuggingFace TrainerCallback 훅."""
+
+import os
+import time
+
+from transformers import TrainerCallback
+
+from utils.discord import send_progress_notification
+from utils.distributed import all_reduce, is_main_process, world_size
+
+
+class DiscordHook(TrainerCallback):
+    def __init__(self, run_name: str, hook_steps: int = 10):
+        self.run_name = run_name
+        self.hook_steps = hook_steps
+        self.training_start_time = None
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.training_start_time = time.time()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if state.global_step % self.hook_steps == 0 and state.global_step != 0:
+            send_progress_notification(
+                title=f"{self.run_name} Training",
+                current_step=state.global_step,
+                total_steps=state.max_steps,
+                start_time=self.training_start_time,
+                background=True,  # 학습 루프를 webhook 왕복 시간만큼 멈추지 않도록
+            )
+
+
+class ThroughputHook(TrainerCallback):
+    """logging window(logging_steps)마다 학습 처리량 측정.
+
+    - samples/s, tokens/s(padding 제외), image tokens/s, padding 비율
+    - step 시간 분해: data wait(on_step_end → 다음 on_step_begin: batch fetch + collate)
+      vs compute(on_step_begin → on_step_end: forward/backward/optimizer)
+    - window별 peak GPU 메모리, optimizer step당 effective batch 토큰 수
+    토큰 수는 wrap_collator()로 감싼 collator에서 센다 (dataloader_num_workers=0 기준 — 메인 프로세스).
+    분산 학습이면 샘플/토큰 수는 모든 rank 합(전체 처리량), 시간과 메모리는 rank 0 기준(메모리는 최댓값)이고
+    world_size, samples_per_sec_per_gpu를 함께 기록해 GPU 수에 따른 scaling을 볼 수 있다.
+    """
+
+    def __init__(self, run_name: str, image_token_id: int, log_fn=None):
+        self.run_name = run_name
+        self.image_token_id = image_token_id
+        self.log_fn = log_fn
+        self.summary = {}
+        self._window = self._empty()
+        self._total = self._empty()
+        self._last_step_end = None
+        self._step_begin = None
+        self._window_start = None
+        self._train_start = None
+        self._peak_memory = 0.0
+
+    @staticmethod
+    def _empty() -> dict:
+        return {"samples": 0, "tokens": 0, "padded_tokens": 0, "image_tokens": 0,
+                "steps": 0, "data_wait": 0.0, "compute": 0.0, "collate": 0.0}
+
+    def _add(self, **counts):
+        for bucket in (self._window, self._total):
+            for key, value in counts.items():
+                bucket[key] += value
+
+    def wrap_collator(self, collator):
+        def collate(examples):
+            started = time.perf_counter()
+            batch = collator(examples)
+            input_ids = batch["input_ids"]
+            mask = batch.get("attention_mask")
+            self._add(
+                samples=sum(len(e["indices"]) if "indices" in e else 1 for e in examples),
+                tokens=int(mask.sum()) if mask is not None else input_ids.numel(),
+                padded_tokens=input_ids.numel(),
+                image_tokens=int((input_ids == self.image_token_id).sum()),
+                collate=time.perf_counter() - started,
+            )
+            return batch
+        return collate
+
+    @staticmethod
+    def _sync():
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+
+    @staticmethod
+    def _reset_peak_memory():
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+
+    @staticmethod
+    def _peak_memory_gb() -> float:
+        import torch
+
+        return torch.cuda.max_memory_allocated() / 1e9 if torch.cuda.is_available() else 0.0
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self._train_start = self._window_start = self._last_step_end = time.perf_counter()
+        self._reset_peak_memory()
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self._step_begin = time.perf_counter()
+        self._add(data_wait=self._step_begin - self._last_step_end)
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self._sync()
+        self._last_step_end = time.perf_counter()
+        self._add(compute=self._last_step_end - self._step_begin, steps=1)
+        if state.global_step % args.logging_steps == 0:
+            self._flush_window(state)
+
+    @staticmethod
+    def _global(counts: dict) -> dict:
+        """샘플/토큰 수를 모든 rank에 대해 합산 (단일 프로세스면 그대로)."""
+        keys = ("samples", "tokens", "padded_tokens", "image_tokens")
+        return {**counts, **dict(zip(keys, all_reduce([counts[k] for k in keys])))}
+
+    def _rates(self, counts: dict, elapsed: float) -> dict:
+        elapsed = max(elapsed, 1e-6)
+        counts = self._global(counts)
+        step_time = counts["data_wait"] + counts["compute"]
+        return {
+            "samples_per_sec": counts["samples"] / elapsed,
+            "tokens_per_sec": counts["tokens"] / elapsed,
+            "image_tokens_per_sec": counts["image_tokens"] / elapsed,
+            "padding_ratio": 1 - counts["tokens"] / counts["padded_tokens"] if counts["padded_tokens"] else 0.0,
+            "data_wait_ratio": counts["data_wait"] / step_time if step_time else 0.0,
+            "collate_sec_per_step": counts["collate"] / max(counts["steps"], 1),
+            "effective_batch_tokens": counts["tokens"] / max(counts["steps"], 1),
+            "world_size": world_size(),
+            "samples_per_sec_per_gpu": counts["samples"] / elapsed / world_size(),
+        }
+
+    def _flush_window(self, state):
+        now = time.perf_counter()
+        metrics = {f"throughput/{k}": v for k, v in self._rates(self._window, now - self._window_start).items()}
+        metrics["throughput/peak_memory_gb"] = all_reduce([self._peak_memory_gb()], op="max")[0]
+        self._peak_memory = max(self._peak_memory, metrics["throughput/peak_memory_gb"])
+        if self.log_fn and is_main_process():
+            self.log_fn(metrics, step=state.global_step)
+        self._window = self._empty()
+        self._window_start = now
+        self._reset_peak_memory()
+
+    def on_train_end(self, args, state, control, **kwargs):
+        elapsed = time.perf_counter() - self._train_start
+        total = self._global(self._total)
+        self.summary = {
+            **self._rates(self._total, elapsed),
+            "train_seconds": elapsed,
+            "samples": total["samples"],
+            "tokens": total["tokens"],
+            "image_tokens": total["image_tokens"],
+            "peak_memory_gb": all_reduce([max(self._peak_memory, self._peak_memory_gb())], op="max")[0],
+        }
+        if not is_main_process():
+            return
+        s = self.summary
+        print(f"  [{self.run_name}] throughput: {s['samples_per_sec']:.2f} samples/s, "
+              f"{s['tokens_per_sec']:.0f} tokens/s, {s['image_tokens_per_sec']:.0f} image tokens/s")
+        print(f"    data wait {s['data_wait_ratio']:.1%} of step time, padding {s['padding_ratio']:.1%}, "
+              f"effective batch {s['effective_batch_tokens']:.0f} tokens/step")
+        if s["world_size"] > 1:
+            print(f"    {s['world_size']} processes: {s['samples_per_sec_per_gpu']:.2f} samples/s per GPU")
+
+
+class CheckpointSyncHook(TrainerCallback):
+    """Trainer가 체크포인트를 저장할 때마다 Hub ckpt-<run_id> 브랜치로 동기화 (spot Pod 회수 대비)."""
+
+    def __init__(self, sync, stage_key: str):
+        self.sync = sync
+        self.stage_key = stage_key
+
+    def on_save(self, args, state, control, **kwargs):
+        if not state.is_world_process_zero:
+            return
+        checkpoint_dir = os.path.join(args.output_dir, f"checkpoint-{state.global_step}")
+        try:
+            self.sync.push_checkpoint(self.stage_key, checkpoint_dir)
+        except Exception as e:
+            # 동기화 실패로 학습을 멈추지는 않는다 — 다음 저장 시 다시 시도
+            print(f"  [ckpt] push 실패 ({checkpoint_dir}): {e}")
+
+
+class EpochCapHook(TrainerCallback):
+    """streaming 학습의 데이터 pass 수를 num_train_epochs로 제한.
+
+    max_steps는 필터(THOUGHT_POLICY=filter, OVERLENGTH_POLICY=drop) 전 row 수로 추정하므로, row가 버려지면
+    스트림이 예상보다 일찍 끝나고 Trainer가 max_steps를 채우려 새 pass를 시작한다 — 그 전에 멈춘다.
+    """
+
+    def __init__(self, epochs: int):
+        self.epochs = epochs
+        self.passes = 0
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        self.passes += 1
+        if self.passes >= self.epochs:
+            control.should_training_stop = True
@@ -0,0 +1,40 @@
+"""WandB 로그인 유틸."""
+
+import os
+
+
+def login_wandb(project_name: str, run_name: str = None):
+    """WandB 로그인 및 init. WANDB_API_KEY 미설정 시 무시."""
+    if not os.getenv("WANDB_API_KEY"):
+        return False
+    import wandb
+    wandb.login()
+    os.environ["WANDB_PROJECT"] = project_name
+    wandb.init(
+        name=run_name,
+        project=project_name,
+        entity=os.getenv("WANDB_ENTITY"),
+        reinit="return_previous",
+    )
+    return True
+
+
+def log_metrics(metrics: dict, step: int | None = None):
+    """WandB run이 있으면 metric 기록. step은 Trainer와 같은 train/global_step 축으로 남긴다."""
+    import wandb
+
+    if wandb.run is None:
+        return
+    if step is not None:
+        metrics = {**metrics, "train/global_step": step}
+    wandb.log(metrics)
+
+
+def log_summary(summary: dict, prefix: str = "throughput/"):
+    """WandB run summary에 값 기록 (run 비교 표에 표시)."""
+    import wandb
+
+    if wandb.run is None:
+        return
+    for key, value in summary.items():
+        wandb.run.summary[f"{prefix}{key}"] = value
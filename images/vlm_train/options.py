@@ -0,0 +1,160 @@
+"""Pydantic 설정 모델.
+
+컨트롤러(노트북)에서 Pydantic → flat env vars 변환 → Pod 내부에서 env vars → Pydantic 복원.
+serverless-mlops options.py 패턴.
+"""
+
+import os
+
+from pydantic import BaseModel
+
+
+class TrainingOptions(BaseModel):
+    model_id: str = "Qwen/Qwen3-VL-2B-Thinking"
+    model_revision: str = ""  # 브랜치/태그/커밋. 비우면 main
+    model_cache_dir: str = "/workspace/models"  # 가중치 캐시 (network volume이면 Pod 간 공유). 빈 문자열이면 HF 기본 캐시
+    model_download_workers: int = 16  # 캐시 miss 시 병렬 다운로드 파일 수
+    lora_r: int = 16
+    lora_alpha: int = 32
+    lora_dropout: float = 0.05
+    lora_target_modules: str = "q_proj,k_proj,v_proj,o_proj,gate_proj,up_proj,down_proj"
+    per_device_train_batch_size: int = 2
+    gradient_accumulation_steps: int = 4
+    learning_rate: float = 2e-4
+    num_train_epochs: int = 3
+    max_steps: int = -1  # streaming 모드에서 데이터셋 메타데이터에 row 수가 없을 때 필요
+    seed: int = 42
+    bf16: bool = True
+    max_seq_length: int = 8192
+    min_pixels: int = 0  # 이미지 resize 하한 (H×W). 0이면 모델 기본값
+    max_pixels: int = 0  # 이미지 resize 상한 (H×W) — 샘플당 이미지 토큰 ≈ max_pixels / 32². 0이면 모델 기본값
+    episode_windows: bool = False  # 에피소드 턴들을 max_seq_length 이하 멀티턴 window로 묶음 (safari 등 멀티턴 태스크만)
+    overlength_policy: str = "drop"  # max_seq_length 초과 샘플: drop(제거) | flag(표시만)
+    thought_policy: str = "keep"  # teacher thought_text 예산: keep | cap(잘라냄) | compress(반복 제거 후 cap) | filter(초과 샘플 제거)
+    thought_max_tokens: int = 0  # thought 토큰 예산 (cap/filter는 필수, compress는 0이면 반복 제거만)
+    packing: bool = False  # vision cache 필요
+    attn_implementation: str = "sdpa"  # packing 시 flash_attention_2 권장 (varlen)
+    nproc_per_node: int = 0  # torchrun 프로세스 수. 0이면 보이는 GPU 수 (2개 이상이면 분산 학습)
+    fsdp: str = ""  # 분산 학습 시 FSDP 사용 (예: "full_shard auto_wrap"). 비우면 DDP
+    output_dir: str = "/workspace/output"
+    save_steps: int = 0  # 0이면 epoch마다 저장. interruptible Pod에서는 step 단위로 저장해 유실 구간을 줄인다
+    save_total_limit: int = 2
+    async_checkpoint: bool = True  # 체크포인트를 host 메모리로 snapshot 후 백그라운드에서 쓰기/Hub 동기화
+    checkpoint_max_pending: int = 2  # 백그라운드 writer에 쌓일 수 있는 snapshot 수 (초과 시 학습이 대기)
+    merge_max_shard_size_mb: int = 2048  # HF_MERGED_REPO 병합 시 출력 shard 크기 (병합 피크 메모리 ≈ shard 하나)
+    quant_scheme: str = "fp8"  # HF_QUANTIZED_REPO export: fp8 | int8 (가중치 per-channel, activation per-token 동적)
+    quant_calibration_samples: int = 8  # logit 오차 리포트용 학습 데이터셋 샘플 수 (0이면 리포트 생략)
+    streaming: bool = False
+    shuffle_buffer_size: int = 1000
+    dataset_num_proc: int = 0  # 0이면 Pod에 할당된 CPU 수만큼
+    dataset_map_batch_size: int = 32
+    dataset_cache_dir: str = "/workspace/cache/datasets"  # 빈 문자열이면 렌더링 캐시 비활성
+    dataset_cache_hub: bool = False  # True면 <dataset>-render-cache repo의 render-cache-<key> 브랜치에도 캐시
+    vision_cache_dir: str = "/workspace/cache/vision"  # 빈 문자열이면 collator가 매 step 이미지 처리
+
+    @classmethod
+    def from_env(cls) -> "TrainingOptions":
+        kwargs = {}
+        for field_name, field_info in cls.model_fields.items():
+            env_key = field_name.upper()
+            val = os.environ.get(env_key)
+            if val is not None:
+                kwargs[field_name] = val
+        return cls(**kwargs)
+
+
+TASK_MODES = ("stages", "mix")
+
+
+class FlowParameters(BaseModel):
+    tasks: str = "safari"  # 쉼표 구분 태스크 이름 (tasks 레지스트리), stages 모드에서는 학습 순서
+    task_mode: str = "stages"  # stages: 태스크별로 순차 학습(이전 stage LoRA 병합 후 다음 stage) | mix: 가중치로 섞어 한 번에 학습
+    task_weights: str = ""  # mix 모드 샘플링 가중치 (tasks와 같은 순서, 예: "0.3,0.7"). 비우면 데이터셋 크기 비례
+    hf_dataset_repo: str = ""  # 단일 태스크일 때 데이터셋 override (태스크별: HF_DATASET_REPO_<TASK>)
+    hf_dataset_repos: dict[str, str] = {}
+    hf_dataset_revision: str = ""  # 데이터셋 브랜치/태그/커밋 고정 (태스크별: HF_DATASET_REVISION_<TASK>). 비우면 main 최신
+    hf_dataset_revisions: dict[str, str] = {}
+    hf_output_repo: str = ""  # 비우면 마지막 태스크의 기본 output repo
+    hf_output_branch: str = "main"
+    hf_merged_repo: str = ""  # 설정 시 학습 후 베이스 + stage 어댑터들을 스트리밍 병합한 전체 모델을 이 repo에 업로드
+    hf_quantized_repo: str = ""  # 설정 시 병합 모델을 QUANT_SCHEME으로 양자화(vLLM compressed-tensors)해 이 repo에 업로드
+    run_id: str = ""  # 설정 시 체크포인트를 output repo의 ckpt-<run_id> 브랜치에 동기화, 같은 run_id 재실행 시 이어서 학습
+    hf_token: str = ""
+    runpod_api_key: str = ""
+    runpod_pod_id: str = ""
+    prefect_api_url: str = ""
+    prefect_api_key: str = ""
+    safari_webhook_url: str = ""
+    wandb_project: str = ""
+    wandb_entity: str = ""
+    wandb_api_key: str = ""
+    training: TrainingOptions = TrainingOptions()
+
+    @classmethod
+    def from_env(cls) -> "FlowParameters":
+        return cls(
+            tasks=os.environ.get("TASKS", cls.model_fields["tasks"].default),
+            task_mode=os.environ.get("TASK_MODE", cls.model_fields["task_mode"].default),
+            task_weights=os.environ.get("TASK_WEIGHTS", ""),
+            hf_dataset_repo=os.environ.get("HF_DATASET_REPO", ""),
+            hf_dataset_repos={
+                key.removeprefix("HF_DATASET_REPO_").lower(): value
+                for key, value in os.environ.items()
+                if key.startswith("HF_DATASET_REPO_") and value
+            },
+            hf_dataset_revision=os.environ.get("HF_DATASET_REVISION", ""),
+            hf_dataset_revisions={
+                key.removeprefix("HF_DATASET_REVISION_").lower(): value
+                for key, value in os.environ.items()
+                if key.startswith("HF_DATASET_REVISION_") and value
+            },
+            hf_output_repo=os.environ.get("HF_OUTPUT_REPO", ""),
+            hf_output_branch=os.environ.get("HF_OUTPUT_BRANCH", cls.model_fields["hf_output_branch"].default),
+            hf_merged_repo=os.environ.get("HF_MERGED_REPO", ""),
+            hf_quantized_repo=os.environ.get("HF_QUANTIZED_REPO", ""),
+            run_id=os.environ.get("RUN_ID", ""),
+            hf_token=os.environ.get("HF_TOKEN", ""),
+            runpod_api_key=os.environ.get("RUNPOD_API_KEY", ""),
+            runpod_pod_id=os.environ.get("RUNPOD_POD_ID", ""),
+            prefect_api_url=os.environ.get("PREFECT_API_URL", ""),
+            prefect_api_key=os.environ.get("PREFECT_API_KEY", ""),
+            safari_webhook_url=os.environ.get("SAFARI_WEBHOOK_URL", ""),
+            wandb_project=os.environ.get("WANDB_PROJECT", ""),
+            wandb_entity=os.environ.get("WANDB_ENTITY", ""),
+            wandb_api_key=os.environ.get("WANDB_API_KEY", ""),
+            training=TrainingOptions.from_env(),
+        )
+
+    def task_names(self) -> list[str]:
+        names = [name.strip() for name in self.tasks.split(",") if name.strip()]
+        if not names:
+            raise ValueError("TASKS가 비어 있습니다")
+        if self.task_mode not in TASK_MODES:
+            raise ValueError(f"task_mode는 {TASK_MODES} 중 하나여야 합니다: {self.task_mode}")
+        return names
+
+    def task_weight_list(self) -> list[float] | None:
+        """mix 모드 샘플링 확률 (합 1로 정규화). 지정하지 않으면 None."""
+        if not self.task_weights.strip():
+            return None
+        weights = [float(w) for w in self.task_weights.split(",")]
+        if len(weights) != len(self.task_names()) or min(weights) < 0 or sum(weights) <= 0:
+            raise ValueError(f"task_weights({self.task_weights})는 tasks({self.tasks})와 개수가 같은 양수여야 합니다")
+        return [w / sum(weights) for w in weights]
+
+    def dataset_repo(self, task: str, default: str) -> str:
+        if task in self.hf_dataset_repos:
+            return self.hf_dataset_repos[task]
+        if self.hf_dataset_repo and len(self.task_names()) == 1:
+            return self.hf_dataset_repo
+        return default
+
+    def dataset_revision(self, task: str) -> str:
+        if task in self.hf_dataset_revisions:
+            return self.hf_dataset_revisions[task]
+        if self.hf_dataset_revision and len(self.task_names()) == 1:
+            return self.hf_dataset_revision
+        return ""
+
+    def output_repo(self, default: str) -> str:
+        return self.hf_output_repo or default
@@ -0,0 +1,222 @@
+"""학습 전 빠른 사전 점검 (preflight).
+
+torch/transformers/datasets 등 무거운 import와 모델/데이터 다운로드 전에, options.py와 HF Hub HTTP API만으로
+설정·토큰·repo 접근 권한을 확인한다. 실패하면 Discord로 알리고 Pod을 바로 삭제한다 (과금 안전).
+통과하면 같은 프로세스를 학습 스크립트로 교체(exec)하며, preflight 소요 시간을 env로 넘겨
+train.py의 startup 리포트에 포함시킨다.
+
+    python -u preflight.py train.py      # Dockerfile CMD
+    python preflight.py                  # 점검만
+"""
+
+import os
+import sys
+import time
+
+PREFLIGHT_STARTED = time.time()
+
+import requests  # noqa: E402
+
+from options import FlowParameters  # noqa: E402
+from tasks import get_task  # noqa: E402
+from utils.discord import flush_discord, send_discord  # noqa: E402
+from utils.quantize_export import SCHEMES  # noqa: E402
+from utils.runpod_client import terminate_self  # noqa: E402
+
+HF_API = "https://huggingface.co/api"
+OVERLENGTH_POLICIES = ("drop", "flag")
+THOUGHT_POLICIES = ("keep", "cap", "compress", "filter")
+HF_RETRIES = 3
+HF_BACKOFF = 2.0  # 초, 재시도마다 2배
+
+
+class PreflightError(Exception):
+    pass
+
+
+class HubUnavailable(Exception):
+    """HF Hub 일시 장애 (5xx/429/연결 실패) — 판정 불가이므로 경고만 하고 통과."""
+
+
+def _hf_get(path: str, token: str) -> requests.Response:
+    """GET + backoff 재시도. 재시도 후에도 일시 장애면 HubUnavailable."""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    for attempt in range(HF_RETRIES):
+        if attempt:
+            time.sleep(HF_BACKOFF * 2 ** (attempt - 1))
+        try:
+            resp = requests.get(f"{HF_API}/{path}", headers=headers, timeout=15)
+        except requests.RequestException as e:
+            reason = f"{type(e).__name__}: {e}"
+            continue
+        if resp.status_code != 429 and resp.status_code < 500:
+            return resp
+        reason = f"HTTP {resp.status_code}"
+    raise HubUnavailable(f"HF Hub 응답 없음 ({HF_RETRIES}회 시도, {reason})")
+
+
+def check_config(params: FlowParameters) -> list:
+    """설정 값 검증 — 학습 도중에야 터지는 ValueError를 미리."""
+    specs = [get_task(name) for name in params.task_names()]
+    params.task_weight_list()
+    t = params.training
+    if t.overlength_policy not in OVERLENGTH_POLICIES:
+        raise PreflightError(f"OVERLENGTH_POLICY는 {OVERLENGTH_POLICIES} 중 하나여야 합니다: {t.overlength_policy}")
+    if t.thought_policy not in THOUGHT_POLICIES:
+        raise PreflightError(f"THOUGHT_POLICY는 {THOUGHT_POLICIES} 중 하나여야 합니다: {t.thought_policy}")
+    if t.thought_policy in ("cap", "filter") and t.thought_max_tokens <= 0:
+        raise PreflightError(f"THOUGHT_POLICY={t.thought_policy}에는 THOUGHT_MAX_TOKENS > 0이 필요합니다")
+    if t.thought_policy == "filter" and t.episode_windows:
+        raise PreflightError("THOUGHT_POLICY=filter는 EPISODE_WINDOWS와 함께 쓸 수 없습니다 (cap/compress 사용)")
+    if t.min_pixels and t.max_pixels and t.min_pixels > t.max_pixels:
+        raise PreflightError(f"MIN_PIXELS({t.min_pixels})가 MAX_PIXELS({t.max_pixels})보다 큽니다")
+    if t.packing and not t.vision_cache_dir:
+        raise PreflightError("PACKING은 VISION_CACHE_DIR(vision cache)가 필요합니다")
+    if t.vision_cache_dir and t.overlength_policy == "flag":
+        # cached collator는 이미지 토큰을 자르지 못한다 (image token/pixel_values 개수 불일치)
+        raise PreflightError("VISION_CACHE_DIR/PACKING은 OVERLENGTH_POLICY=drop이 필요합니다")
+    if t.streaming and t.episode_windows:
+        raise PreflightError("EPISODE_WINDOWS는 STREAMING 모드와 함께 쓸 수 없습니다")
+    if t.quant_scheme not in SCHEMES:
+        raise PreflightError(f"QUANT_SCHEME은 {SCHEMES} 중 하나여야 합니다: {t.quant_scheme}")
+    return specs
+
+
+def check_token(token: str) -> dict:
+    """HF_TOKEN 유효성 — whoami 응답(사용자/조직/토큰 권한) 반환."""
+    if not token:
+        raise PreflightError("HF_TOKEN이 설정되지 않았습니다 (어댑터 업로드에 필요)")
+    resp = _hf_get("whoami-v2", token)
+    if resp.status_code in (401, 403):
+        raise PreflightError(f"HF_TOKEN이 유효하지 않습니다 ({resp.status_code})")
+    if not resp.ok:
+        raise HubUnavailable(f"whoami 응답 {resp.status_code}")
+    return resp.json()
+
+
+def _can_write(whoami: dict, repo_id: str) -> bool:
+    namespace = repo_id.split("/")[0]
+    owners = {whoami.get("name")} | {org.get("name") for org in whoami.get("orgs", [])}
+    if namespace not in owners:
+        return False
+    token = whoami.get("auth", {}).get("accessToken", {})
+    role = token.get("role")
+    if role == "write":
+        return True
+    if role != "fineGrained":
+        return False
+    for scope in token.get("fineGrained", {}).get("scoped", []):
+        entity = scope.get("entity", {})
+        matches = (entity.get("type") in ("user", "org") and entity.get("name") == namespace) or \
+                  (entity.get("type") == "model" and entity.get("name") == repo_id)
+        if matches and "repo.write" in scope.get("permissions", []):
+            return True
+    return False
+
+
+def check_output_repo(whoami: dict, repo_id: str):
+    if not _can_write(whoami, repo_id):
+        role = whoami.get("auth", {}).get("accessToken", {}).get("role")
+        raise PreflightError(f"HF_TOKEN({whoami.get('name')}, role={role})으로 {repo_id}에 쓸 수 없습니다")
+
+
+def check_repo(repo_id: str, repo_type: str, token: str, revision: str = ""):
+    """repo 존재/접근 확인 (gated/private 포함)."""
+    path = f"{repo_type}s/{repo_id}" + (f"/revision/{revision}" if revision else "")
+    resp = _hf_get(path, token)
+    if resp.status_code in (401, 403, 404):
+        raise PreflightError(f"{repo_type} repo {repo_id}{'@' + revision if revision else ''}에 접근할 수 없습니다 "
+                             f"({resp.status_code})")
+    if not resp.ok:
+        raise HubUnavailable(f"응답 {resp.status_code}")
+
+
+def check_merge_weights(model_id: str, token: str, revision: str = ""):
+    """HF_MERGED_REPO/HF_QUANTIZED_REPO — 스트리밍 병합은 베이스 safetensors를 로컬로 받아 읽는다."""
+    if os.path.isdir(model_id):
+        files = os.listdir(model_id)
+    else:
+        resp = _hf_get(f"models/{model_id}" + (f"/revision/{revision}" if revision else ""), token)
+        if resp.status_code in (401, 403, 404):
+            raise PreflightError(f"model repo {model_id}에 접근할 수 없습니다 ({resp.status_code})")
+        if not resp.ok:
+            raise HubUnavailable(f"응답 {resp.status_code}")
+        files = [sibling["rfilename"] for sibling in resp.json().get("siblings", [])]
+    if not any(name.endswith(".safetensors") for name in files):
+        raise PreflightError(f"{model_id}에 safetensors 가중치가 없어 병합할 수 없습니다")
+
+
+def run_checks(params: FlowParameters) -> list[str]:
+    """모든 점검 실행. 실패 메시지 목록 반환 (비어 있으면 통과)."""
+    errors = []
+
+    def check(name: str, fn, *args):
+        started = time.time()
+        try:
+            result = fn(*args)
+            print(f"  ✓ {name} ({time.time() - started:.1f}s)")
+            return result
+        except HubUnavailable as e:
+            print(f"  ! {name}: {e} — 확인하지 못하고 계속 진행")
+            return None
+        except Exception as e:
+            print(f"  ✗ {name}: {e}")
+            errors.append(f"{name}: {e}")
+            return None
+
+    specs = check("config", check_config, params)
+    if specs is None:
+        return errors
+    whoami = check("hf_token", check_token, params.hf_token)
+    output_repo = params.output_repo(specs[-1].output_repo)
+    if whoami is not None:
+        check(f"output repo 쓰기 권한 ({output_repo})", check_output_repo, whoami, output_repo)
+        if params.hf_merged_repo:
+            check(f"merged repo 쓰기 권한 ({params.hf_merged_repo})", check_output_repo, whoami, params.hf_merged_repo)
+        if params.hf_quantized_repo:
+            check(f"quantized repo 쓰기 권한 ({params.hf_quantized_repo})", check_output_repo, whoami,
+                  params.hf_quantized_repo)
+    t = params.training
+    if not os.path.isdir(t.model_id):
+        check(f"model ({t.model_id})", check_repo, t.model_id, "model", params.hf_token, t.model_revision)
+    if params.hf_merged_repo or params.hf_quantized_repo:
+        check(f"병합용 베이스 가중치 ({t.model_id})", check_merge_weights, t.model_id, params.hf_token, t.model_revision)
+    for spec in specs:
+        repo = params.dataset_repo(spec.name, spec.dataset_repo)
+        check(f"dataset ({repo})", check_repo, repo, "dataset", params.hf_token, params.dataset_revision(spec.name))
+    if not params.runpod_pod_id or not params.runpod_api_key:
+        print("  ! RUNPOD_POD_ID/RUNPOD_API_KEY 없음 — 학습 후 자가 종료 불가")
+    return errors
+
+
+def main():
+    print("[0/5] preflight — 설정/토큰/repo 접근 사전 점검")
+    params = None
+    try:
+        params = FlowParameters.from_env()
+        errors = run_checks(params)
+    except Exception as e:
+        errors = [f"config: {e}"]
+    seconds = time.time() - PREFLIGHT_STARTED
+
+    if errors:
+        pod_id = params.runpod_pod_id if params else os.environ.get("RUNPOD_POD_ID", "")
+        details = "\n".join(f"- {e}" for e in errors)
+        print(f"  preflight 실패 ({seconds:.1f}s)")
+        send_discord(f"🛑 *preflight 실패* — 학습을 시작하지 않습니다\n{details}\npod: `{pod_id}`")
+        flush_discord()
+        api_key = params.runpod_api_key if params else os.environ.get("RUNPOD_API_KEY", "")
+        if pod_id and api_key:
+            terminate_self(pod_id, api_key, notify=send_discord)
+        sys.exit(1)
+
+    print(f"  preflight 통과 ({seconds:.1f}s)")
+    if len(sys.argv) > 1:
+        os.environ["PREFLIGHT_STARTED"] = str(PREFLIGHT_STARTED)
+        os.environ["PREFLIGHT_SECONDS"] = f"{seconds:.2f}"
+        sys.stdout.flush()
+        os.execv(sys.executable, [sys.executable, "-u", *sys.argv[1:]])
+
+
+if __name__ == "__main__":
+    main()
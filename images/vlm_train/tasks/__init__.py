@@ -0,0 +1,46 @@
+"""학습 태스크 레지스트리.
+
+태스크 = 데이터셋 row → Qwen3-VL 메시지 변환(build_messages) + chat template에 주입할 TOOLS.
+트레이너(train.py)는 태스크 이름(TASKS env)으로 TaskSpec을 찾아 렌더링/학습만 한다.
+새 태스크는 tasks/<name>.py에 TaskSpec을 정의하고 register()로 등록한 뒤 아래 import에 추가.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    name: str
+    label: str  # Discord/로그 표시 이름
+    tools: list[dict]
+    build_messages: Callable[[dict], list[dict]]
+    build_messages_version: int  # build_messages 출력 형식이 바뀌면 올린다 (렌더링 캐시 키에 포함)
+    dataset_repo: str
+    output_repo: str
+    # (episode 컬럼, turn 컬럼) — 설정된 태스크만 멀티턴 episode window 구성 가능
+    episode_columns: tuple[str, str] | None = None
+
+    def build_episode_messages(self, examples: list[dict]) -> list[dict]:
+        """같은 에피소드의 연속된 턴들을 하나의 멀티턴 대화로 변환 (system prompt는 첫 턴 것 1회)."""
+        messages = self.build_messages(examples[0])
+        for example in examples[1:]:
+            messages.extend(self.build_messages(example)[1:])
+        return messages
+
+
+TASKS: dict[str, TaskSpec] = {}
+
+
+def register(spec: TaskSpec) -> TaskSpec:
+    TASKS[spec.name] = spec
+    return spec
+
+
+def get_task(name: str) -> TaskSpec:
+    if name not in TASKS:
+        raise ValueError(f"알 수 없는 태스크: {name} (등록된 태스크: {', '.join(sorted(TASKS))})")
+    return TASKS[name]
+
+
+from tasks import emoji, safari  # noqa: E402,F401  (모듈 import 시 register)
@@ -0,0 +1,74 @@
+"""이모티콘 인식 태스크 — 뷰포트 스크린샷에서 동물 위치/색상/종류를 update_notepad로 기록."""
+
+import json
+
+from tasks import TaskSpec, register
+
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "update_notepad",
+            "description": "관찰 결과를 메모장에 기록합니다. 발견한 모든 동물의 위치, 색상, 종류를 기록하세요.",
+            "parameters": {
+                "type": "object",
+                "properties": {"content": {"type": "string", "description": "관찰 내용"}},
+                "required": ["content"],
+            },
+        },
+    },
+]
+
+
+def build_messages(example: dict) -> list[dict]:
+    """HF 데이터셋 row를 Qwen3-VL 메시지 리스트로 변환.
+
+    answer_text(프로그래밍적으로 생성된 정답)를 사용하여
+    update_notepad tool_call을 직접 구성한다.
+    """
+    messages = [
+        {"role": "system", "content": example["system_prompt"]},
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": example["image"]},  # PIL Image
+                {"type": "text", "text": example["context_text"]},
+            ],
+        },
+    ]
+
+    # Ground truth 기반 tool_call 생성
+    answer_text = example.get("answer_text") or ""
+    answer_lines = [f"- {line}" for line in answer_text.strip().split("\n") if line.strip()]
+    notepad_content = "[관찰]\n" + "\n".join(answer_lines)
+
+    assistant_msg = {
+        "role": "assistant",
+        "content": example.get("thought_text") or "",
+        "tool_calls": [{
+            "type": "function",
+            "function": {
+                "name": "update_notepad",
+                "arguments": json.dumps({"content": notepad_content}, ensure_ascii=False),
+            },
+        }],
+    }
+    messages.append(assistant_msg)
+    messages.append({
+        "role": "tool",
+        "name": "update_notepad",
+        "content": json.dumps({"status": "updated"}, ensure_ascii=False),
+    })
+
+    return messages
+
+
+EMOJI = register(TaskSpec(
+    name="emoji",
+    label="이모티콘",
+    tools=TOOLS,
+    build_messages=build_messages,
+    build_messages_version=1,
+    dataset_repo="adwel94/vision-emoji-recognition-v1",
+    output_repo="adwel94/vision-emoji-recognition-lora",
+))
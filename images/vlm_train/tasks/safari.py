@@ -0,0 +1,140 @@
+"""사파리 에이전트 태스크 — 멀티턴 도구 호출(이동/포획/메모/선언)."""
+
+import json
+
+from tasks import TaskSpec, register
+
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "move",
+            "description": "플레이어를 이동시킨다. 최대 4개 행동을 순서대로 실행하며, 각 행동은 방향(UP/DOWN/LEFT/RIGHT)과 칸수(1~3)를 가진다. 나무와 동물 모두 이동을 막으며, 중간에 막히면 거기서 중단된다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "actions": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "direction": {"type": "string", "enum": ["UP", "DOWN", "LEFT", "RIGHT"]},
+                                "steps": {"type": "integer"},
+                            },
+                            "required": ["direction", "steps"],
+                        },
+                    }
+                },
+                "required": ["actions"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "update_notepad",
+            "description": "메모장 전체를 덮어쓴다. 유지할 내용도 포함해서 작성해야 한다. 최대 2000자.",
+            "parameters": {
+                "type": "object",
+                "properties": {"content": {"type": "string"}},
+                "required": ["content"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "catch",
+            "description": "인접 타일(상하좌우)의 동물을 포획한다. 동물이 있는 방향을 지정하면 해당 동물을 잡아서 맵에서 제거한다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "direction": {"type": "string", "enum": ["UP", "DOWN", "LEFT", "RIGHT"]},
+                },
+                "required": ["direction"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "declare_found",
+            "description": "특정 타겟을 찾아서 도달했음을 선언한다.",
+            "parameters": {
+                "type": "object",
+                "properties": {"target": {"type": "string"}},
+                "required": ["target"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "declare_done",
+            "description": "전체 미션이 완료되었음을 선언한다.",
+            "parameters": {
+                "type": "object",
+                "properties": {"reason": {"type": "string"}},
+                "required": [],
+            },
+        },
+    },
+]
+
+
+def build_messages(example: dict) -> list[dict]:
+    """HF 데이터셋 row를 Qwen3-VL 메시지 리스트로 변환."""
+    messages = [
+        {"role": "system", "content": example["system_prompt"]},
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": example["image"]},  # PIL Image
+                {"type": "text", "text": example["context_text"]},
+            ],
+        },
+    ]
+
+    # Assistant message: thought + tool_calls
+    tool_calls_raw = json.loads(example["tool_calls"]) if isinstance(example["tool_calls"], str) else example["tool_calls"]
+    # tool_result가 있는 tool_call만 포함 (결과 없는 호출은 템플릿 매핑 오류 유발)
+    tool_results_raw = json.loads(example["tool_results"]) if isinstance(example["tool_results"], str) else example["tool_results"]
+    result_names = {tr["name"] for tr in tool_results_raw}
+    assistant_msg = {
+        "role": "assistant",
+        "content": example.get("thought_text") or "",
+        "tool_calls": [
+            {
+                "type": "function",
+                "function": {
+                    "name": tc["name"],
+                    "arguments": json.dumps(tc["args"], ensure_ascii=False),
+                },
+            }
+            for tc in tool_calls_raw
+            if tc["name"] in result_names
+        ],
+    }
+    messages.append(assistant_msg)
+
+    # Tool results
+    for tr in tool_results_raw:
+        messages.append({
+            "role": "tool",
+            "name": tr["name"],
+            "content": json.dumps(tr["result"], ensure_ascii=False),
+        })
+
+    return messages
+
+
+SAFARI = register(TaskSpec(
+    name="safari",
+    label="사파리",
+    tools=TOOLS,
+    build_messages=build_messages,
+    build_messages_version=1,
+    dataset_repo="adwel94/vision-safari-dataset",
+    output_repo="adwel94/vision-safari-agent-lora",
+    episode_columns=("episode_id", "turn"),
+))
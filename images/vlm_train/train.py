@@ -0,0 +1,1037 @@
+"""Qwen3-VL bf16 LoRA 멀티태스크 학습 Prefect Flow.
+
+태스크(emoji, safari, ...)는 tasks 레지스트리에서 TOOLS/build_messages를 가져온다.
+- stages 모드: TASKS 순서대로 stage별 학습. 모델은 한 번만 로드하고, stage가 끝나면
+  LoRA를 병합한 모델 위에 다음 stage LoRA를 학습 (emoji 인식 → 병합 → safari 에이전트).
+- mix 모드: 태스크별 데이터셋을 TASK_WEIGHTS 비율로 interleave해 한 번에 학습.
+
+5단계 순차 실행. @flow/@task 데코레이터로 Prefect Cloud 모니터링.
+finally 블록에서 반드시 자가 종료 (과금 안전).
+
+GPU가 여러 개면 torchrun으로 GPU당 프로세스 하나를 띄워 DDP(FSDP=... 설정 시 FSDP)로 학습한다.
+데이터 준비는 rank 0이 먼저 해 캐시를 만들고, Prefect/Discord/Hub 업로드/자가 종료는 rank 0만 한다.
+
+[1/5] load_config       — FlowParameters.from_env()
+      fetch_model          — 모델 가중치 캐시 (network volume / 이미지 레이어, miss면 병렬 다운로드)
+                             + load_model까지 백그라운드 스레드에서 [2/5]와 동시에 진행
+[2/5] load_dataset       — 태스크별 HF Hub 데이터셋 로드 + chat template 렌더링
+      analyze_tokens       — 샘플별 토큰 예산 리포트, thought 예산(THOUGHT_POLICY) 리포트, over-length 처리
+      precompute_vision    — 이미지 전처리 결과(pixel_values) 캐시
+      mix_tasks            — (mix 모드) 태스크 데이터셋 interleave
+      pack_samples         — (선택) sequence packing
+[3/5] train              — bf16 LoRA + SFTTrainer (stage마다)
+[4/5] upload_to_hub      — LoRA 어댑터 HF Hub 업로드
+      merge_model          — (HF_MERGED_REPO 설정 시) 베이스 + stage 어댑터를 텐서 단위로 스트리밍 병합해 업로드
+      quantize_model       — (HF_QUANTIZED_REPO 설정 시) 병합 모델 FP8/INT8 export + calibration logit 오차 리포트
+[5/5] self_terminate     — RunPod REST DELETE (finally 블록)
+"""
+
+import time
+
+IMPORT_STARTED = time.time()  # startup 리포트 — 아래 무거운 import 시간 측정
+
+import contextvars
+import json
+import math
+import os
+import shutil
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import prefect
+import torch
+from datasets import (
+    Dataset,
+    Features,
+    Image as HFImage,
+    IterableDataset,
+    SplitDict,
+    SplitInfo,
+    Value,
+    concatenate_datasets,
+    interleave_datasets,
+    load_dataset,
+)
+from huggingface_hub import login
+from peft import LoraConfig, PeftModel, TaskType
+from PIL import Image
+from transformers import (
+    AutoProcessor,
+    Qwen3VLForConditionalGeneration,
+)
+from transformers.trainer_utils import get_last_checkpoint
+
+from trl import SFTConfig, SFTTrainer
+
+from options import FlowParameters
+from tasks import TaskSpec, get_task
+from utils.async_checkpoint import AsyncCheckpointWriter, snapshot_to_cpu
+from utils.checkpoint_sync import CheckpointSync
+from utils.dataset_cache import cache_key, hub_cache_repo, load_cached, resolve_revision, save_cached
+from utils.discord import flush_discord, send_discord
+from utils.distributed import (
+    barrier,
+    broadcast_object,
+    init_distributed,
+    is_distributed,
+    is_main_process,
+    launch,
+    launch_nproc,
+    local_rank,
+    main_process_first,
+    rank_zero_decorator,
+    world_size,
+)
+from utils.episodes import episode_windows, print_window_report
+from utils.hub_upload import upload_changed
+from utils.lora_merge import local_snapshot, merge_lora
+from utils.model_cache import resolve_model
+from utils.packing import PackedVisionCollator, pack_dataset
+from utils.quantize_export import logit_error_report, quantize_export
+from utils.resources import available_cpus
+from utils.runpod_client import terminate_self
+from utils.thought_budget import RAW_COLUMN as THOUGHT_RAW_COLUMN, ThoughtBudget, apply_thought_budget
+from utils.token_budget import TOKEN_COLUMNS, TokenCounter, apply_token_budget
+from utils.vision_cache import CachedVisionCollator, VisionCache, precompute_vision_inputs
+from utils.visual_tokens import apply_pixel_budget, vllm_mm_processor_kwargs
+from monitoring import log_metrics, log_summary, login_wandb
+from hooks import CheckpointSyncHook, DiscordHook, EpochCapHook, ThroughputHook
+
+IMPORT_SECONDS = time.time() - IMPORT_STARTED
+
+# 멀티 GPU(torchrun)에서는 rank 0만 Prefect flow/task로 실행하고, 나머지 rank는 같은 함수를 그대로 호출
+flow = rank_zero_decorator(prefect.flow)
+task = rank_zero_decorator(prefect.task)
+
+# 재개 시 Hub ckpt 브랜치에서 받은 체크포인트/어댑터 위치 (output_dir 밖 — 업로드 대상 아님)
+RESUME_DIR = "/workspace/resume"
+# HF_MERGED_REPO 병합 결과 위치 (어댑터 업로드 대상인 output_dir 밖)
+MERGED_DIR = "/workspace/merged"
+QUANTIZED_DIR = "/workspace/quantized"
+
+# ---------------------------------------------------------------------------
+# [1/5] load_config
+# ---------------------------------------------------------------------------
+
+@task(name="load_config", retries=0)
+def load_config() -> FlowParameters:
+    print("[1/5] load_config — 환경변수에서 설정 로드")
+    params = FlowParameters.from_env()
+    specs = [get_task(name) for name in params.task_names()]
+    print(f"  model_id       : {params.training.model_id}")
+    print(f"  tasks          : {', '.join(spec.name for spec in specs)} (mode={params.task_mode})")
+    if params.task_mode == "mix":
+        print(f"  task_weights   : {params.task_weight_list() or '데이터셋 크기 비례'}")
+    for spec in specs:
+        revision = params.dataset_revision(spec.name)
+        print(f"  hf_dataset_repo[{spec.name}]: {params.dataset_repo(spec.name, spec.dataset_repo)}"
+              + (f"@{revision}" if revision else ""))
+    print(f"  hf_output_repo : {params.output_repo(specs[-1].output_repo)}")
+    print(f"  lora_r={params.training.lora_r}, alpha={params.training.lora_alpha}, "
+          f"epochs={params.training.num_train_epochs}")
+    print(f"  batch_size={params.training.per_device_train_batch_size}, "
+          f"grad_accum={params.training.gradient_accumulation_steps}, "
+          f"lr={params.training.learning_rate}")
+    if is_distributed():
+        print(f"  distributed    : {world_size()} processes, {params.training.fsdp or 'DDP'}")
+        if params.training.fsdp and params.task_mode == "stages" and len(specs) > 1:
+            # FSDP는 파라미터가 shard된 상태라 stage 사이 merge_and_unload를 할 수 없다
+            raise ValueError("FSDP는 단일 stage(태스크 1개 또는 mix 모드)에서만 지원합니다")
+    return params
+
+
+# ---------------------------------------------------------------------------
+# [2/5] load_dataset
+# ---------------------------------------------------------------------------
+
+def _num_proc(t, n_rows: int) -> int:
+    """map 워커 수 — 설정값(0이면 할당된 CPU 수), batch 수보다 많이 띄우지 않는다."""
+    return min(t.dataset_num_proc or available_cpus(), max(1, n_rows // t.dataset_map_batch_size))
+
+
+def build_messages_batch(batch: dict[str, list], build_messages) -> list[list[dict]]:
+    """batched map용 — 컬럼 단위 batch를 row별 메시지 리스트로 변환."""
+    n = len(next(iter(batch.values())))
+    return [build_messages({k: v[i] for k, v in batch.items()}) for i in range(n)]
+
+
+@task(name="prepare_dataset", retries=2, retry_delay_seconds=10)
+def prepare_dataset(params: FlowParameters, spec: TaskSpec, processor):
+    dataset_repo = params.dataset_repo(spec.name, spec.dataset_repo)
+    print(f"[2/5] load_dataset — HF Hub에서 데이터셋 로드 (task={spec.name}, repo={dataset_repo})")
+    t = params.training
+    use_windows = t.episode_windows and spec.episode_columns is not None
+    if t.episode_windows and not use_windows:
+        print(f"  episode_windows: {spec.name} 태스크는 턴 단위 샘플이라 적용하지 않음")
+
+    dataset_revision = resolve_revision(dataset_repo, "dataset", token=params.hf_token,
+                                        revision=params.dataset_revision(spec.name))
+    rendered_features = Features({
+        "text": Value("string"),
+        "images": [HFImage()],
+        **{column: Value("int32") for column in [*TOKEN_COLUMNS, THOUGHT_RAW_COLUMN]},
+    })
+    counter = TokenCounter(processor, spec.tools)
+    if t.thought_policy == "filter" and use_windows:
+        raise ValueError("thought_policy=filter는 episode_windows와 함께 쓸 수 없습니다 (cap/compress 사용)")
+    thought_budget = ThoughtBudget(processor.tokenizer, t.thought_policy, t.thought_max_tokens)
+
+    def render_batch(batch):
+        batch = thought_budget.apply(batch)
+        conversations = build_messages_batch(batch, spec.build_messages)
+        texts = processor.apply_chat_template(
+            conversations, tools=spec.tools, tokenize=False, add_generation_prompt=False,
+        )
+        return {
+            "text": texts,
+            "images": [[image] for image in batch["image"]],
+            **counter.count(conversations, texts),
+            THOUGHT_RAW_COLUMN: batch[THOUGHT_RAW_COLUMN],
+        }
+
+    if t.streaming:
+        if use_windows:
+            raise ValueError("episode_windows는 에피소드 단위 그룹핑이 필요해 streaming 모드와 함께 쓸 수 없습니다")
+        # 전체 다운로드 없이 샤드 단위로 읽으며 렌더링 — 메모리는 shuffle buffer 크기로 고정
+        ds = load_dataset(dataset_repo, split="train", revision=dataset_revision, streaming=True)
+        ds = ds.cast_column("image", HFImage(decode=False))
+        ds = ds.shuffle(seed=t.seed, buffer_size=t.shuffle_buffer_size)
+        ds = ds.map(
+            render_batch,
+            batched=True,
+            batch_size=t.dataset_map_batch_size,
+            remove_columns=ds.column_names,
+        ).cast(rendered_features)
+        if t.thought_policy == "filter":
+            ds = ds.filter(
+                lambda batch: [n <= t.thought_max_tokens for n in batch[THOUGHT_RAW_COLUMN]], batched=True,
+            )
+        if t.overlength_policy == "drop":
+            ds = ds.filter(
+                lambda batch: [n <= t.max_seq_length for n in batch["tokens_total"]], batched=True,
+            )
+        print(f"  streaming mode (revision={dataset_revision}, shuffle_buffer={t.shuffle_buffer_size})")
+        return ds
+
+    key = None
+    if t.dataset_cache_dir:
+        key = cache_key(
+            dataset=dataset_repo,
+            dataset_revision=dataset_revision,
+            model_id=t.model_id,
+            processor_revision=resolve_revision(t.model_id, "model", token=params.hf_token,
+                                                revision=t.model_revision),
+            tools=spec.tools,
+            build_messages_version=spec.build_messages_version,
+            pixel_budget=[t.min_pixels, t.max_pixels],  # tokens_image 컬럼이 해상도에 따라 달라진다
+            episode_windows=use_windows,
+            window_budget=t.max_seq_length if use_windows else None,
+            thought_budget=[t.thought_policy, t.thought_max_tokens],
+        )
+    cache_repo = hub_cache_repo(dataset_repo) if t.dataset_cache_hub else ""
+    if key:
+        ds = load_cached(t.dataset_cache_dir, key, hub_repo=cache_repo, token=params.hf_token)
+        if ds is not None:
+            return ds
+
+    ds = load_dataset(dataset_repo, split="train", revision=dataset_revision)
+    print(f"  loaded {len(ds)} examples (revision={dataset_revision})")
+
+    # 이미지는 디코딩/재인코딩 없이 PNG 바이트 그대로 넘긴다 (chat template에는 placeholder만 필요)
+    ds = ds.cast_column("image", HFImage(decode=False))
+
+    raw = ds
+    batch_size = t.dataset_map_batch_size
+    num_proc = _num_proc(t, len(ds))
+    started = time.time()
+    ds = ds.map(
+        render_batch,
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc if num_proc > 1 else None,
+        remove_columns=ds.column_names,
+        features=rendered_features,
+        desc="Converting to text+images format",
+    )
+    elapsed = max(time.time() - started, 1e-6)
+    print(f"  rendered {len(ds)} rows in {elapsed:.1f}s "
+          f"({len(ds) / elapsed:.1f} rows/s, num_proc={num_proc}, batch_size={batch_size})")
+    if use_windows:
+        ds = _render_episode_windows(spec, raw, ds, processor, counter, thought_budget, t)
+    ds.info.description = f"thought_policy={t.thought_policy}, thought_max_tokens={t.thought_max_tokens}"
+    print(f"  mapped dataset columns: {ds.column_names}")
+    if key:
+        ds = save_cached(ds, t.dataset_cache_dir, key, hub_repo=cache_repo, token=params.hf_token)
+    return ds
+
+
+def _render_episode_windows(spec: TaskSpec, raw, turns_ds, processor, counter, thought_budget, t):
+    """턴 단위 렌더링 결과의 토큰 수로 window를 나누고, window별 멀티턴 샘플을 렌더링."""
+    episode_column, turn_column = spec.episode_columns
+    windows = episode_windows(
+        raw[episode_column], raw[turn_column],
+        turns_ds["tokens_total"], turns_ds["tokens_system_tools"],
+        budget=t.max_seq_length,
+    )
+
+    def render_windows(batch):
+        conversations, images, thought_raw = [], [], []
+        for indices in batch["rows"]:
+            rows = thought_budget.apply(raw[indices])
+            examples = [{k: v[j] for k, v in rows.items()} for j in range(len(indices))]
+            conversations.append(spec.build_episode_messages(examples))
+            images.append(rows["image"])
+            thought_raw.append(rows[THOUGHT_RAW_COLUMN])
+        texts = processor.apply_chat_template(
+            conversations, tools=spec.tools, tokenize=False, add_generation_prompt=False,
+        )
+        return {"text": texts, "images": images, **counter.count(conversations, texts),
+                THOUGHT_RAW_COLUMN: [sum(counts) for counts in thought_raw]}
+
+    windows_ds = Dataset.from_dict({"rows": windows})
+    num_proc = _num_proc(t, len(windows_ds))
+    ds = windows_ds.map(
+        render_windows,
+        batched=True,
+        batch_size=t.dataset_map_batch_size,
+        num_proc=num_proc if num_proc > 1 else None,
+        remove_columns=["rows"],
+        features=turns_ds.features,
+        desc="Rendering episode windows",
+    )
+    print_window_report(
+        turns_ds["tokens_total"], ds["tokens_total"], n_episodes=len(set(raw[episode_column])),
+    )
+    return ds
+
+
+@task(name="analyze_tokens", retries=0)
+def analyze_tokens(params: FlowParameters, spec: TaskSpec, ds):
+    print(f"[2/5] analyze_tokens — 토큰 예산 분석 (task={spec.name})")
+    t = params.training
+    ds = apply_thought_budget(
+        ds, t.thought_policy, t.thought_max_tokens,
+        report_path=os.path.join(t.output_dir, f"thought_budget_{spec.name}.json") if is_main_process() else "",
+    )
+    return apply_token_budget(
+        ds, t.max_seq_length,
+        policy=t.overlength_policy,
+        report_path=os.path.join(t.output_dir, f"token_budget_{spec.name}.json") if is_main_process() else "",
+    )
+
+
+@task(name="precompute_vision", retries=0)
+def precompute_vision(params: FlowParameters, ds, processor):
+    print("[2/5] precompute_vision — 이미지 전처리 결과 캐시")
+    t = params.training
+    return precompute_vision_inputs(
+        ds, processor, t.vision_cache_dir,
+        num_proc=_num_proc(t, len(ds)), batch_size=t.dataset_map_batch_size,
+    )
+
+
+def _mixed_rows(t, datasets: dict, weights: list[float] | None) -> int:
+    """streaming mix 한 바퀴의 row 수 추정 — all_exhausted는 모든 태스크가 한 번씩 소진될 때까지 뽑는다.
+
+    가중치 없음: round-robin이라 (태스크 수 × 가장 큰 태스크). 가중치: 태스크 i는 평균 n_i / w_i번 뽑은 뒤 소진.
+    """
+    counts = []
+    for name, ds in datasets.items():
+        split = (ds.info.splits or {}).get("train")
+        if not split or not split.num_examples:
+            if t.max_steps > 0:
+                return 0
+            raise ValueError(f"streaming mix: {name} 데이터셋 메타데이터에 row 수가 없어 섞은 길이를 계산할 수 없습니다 "
+                             "— MAX_STEPS 지정이 필요합니다")
+        counts.append(split.num_examples)
+    if weights is None:
+        return len(counts) * max(counts)
+    return math.ceil(max(n / w for n, w in zip(counts, weights) if w > 0))
+
+
+@task(name="mix_tasks", retries=0)
+def mix_tasks(params: FlowParameters, datasets: dict):
+    """태스크별 데이터셋을 샘플링 가중치로 섞는다. 가중치가 없으면 합친 뒤 shuffle (크기 비례)."""
+    print("[2/5] mix_tasks — 태스크 데이터셋 interleave")
+    t = params.training
+    names = list(datasets)
+    weights = params.task_weight_list()
+    parts = list(datasets.values())
+    streaming = isinstance(parts[0], IterableDataset)
+    if not streaming:
+        print("  " + ", ".join(f"{name}={len(ds)}" for name, ds in datasets.items()))
+    mixed_rows = _mixed_rows(t, datasets, weights) if streaming else 0
+
+    if weights is None and not streaming:
+        mixed = concatenate_datasets(parts).shuffle(seed=t.seed)
+    else:
+        # all_exhausted: 모든 태스크를 한 바퀴 이상 보도록 작은 데이터셋을 가중치만큼 oversample
+        mixed = interleave_datasets(
+            parts, probabilities=weights, seed=t.seed, stopping_strategy="all_exhausted",
+        )
+    if weights:
+        print("  weights: " + ", ".join(f"{name}={w:.2f}" for name, w in zip(names, weights)))
+    if not streaming:
+        print(f"  mixed dataset: {len(mixed)} rows")
+    elif mixed_rows:
+        # interleave_datasets(DatasetInfo.from_merge)는 splits를 버린다 — _resolve_max_steps가 읽도록 채운다
+        mixed.info.splits = SplitDict({"train": SplitInfo(name="train", num_examples=mixed_rows)})
+        print(f"  mixed stream: ~{mixed_rows} rows per pass (all_exhausted oversampling 포함)")
+    return mixed
+
+
+@task(name="pack_samples", retries=0)
+def pack_samples(params: FlowParameters, ds, processor):
+    print("[2/5] pack_samples — sequence packing")
+    t = params.training
+    packed, _ = pack_dataset(
+        ds, processor,
+        budget=t.max_seq_length,
+        batch_size=t.per_device_train_batch_size,
+        seed=t.seed,
+        num_proc=_num_proc(t, len(ds)),
+    )
+    return packed
+
+
+# ---------------------------------------------------------------------------
+# [3/5] train
+# ---------------------------------------------------------------------------
+
+def _resolve_max_steps(t, ds) -> int:
+    """streaming(IterableDataset)은 길이를 모르므로 데이터셋 메타데이터로 max_steps를 계산."""
+    if t.max_steps > 0 or not isinstance(ds, IterableDataset):
+        return t.max_steps
+    split = (ds.info.splits or {}).get("train")
+    if not split or not split.num_examples:
+        raise ValueError("streaming 모드: 데이터셋 메타데이터에 row 수가 없어 MAX_STEPS 지정이 필요합니다")
+    # accelerate는 micro-step마다 batch_size × world_size row를 나눠 준다 (IterableDataset dispatch)
+    steps_per_epoch = math.ceil(
+        split.num_examples / (t.per_device_train_batch_size * t.gradient_accumulation_steps * world_size())
+    )
+    filtered = t.thought_policy == "filter" or t.overlength_policy == "drop"
+    note = " (필터 전 row 수 기준 추정 — pass 수는 epoch 수로 제한)" if filtered else ""
+    print(f"  streaming: {split.num_examples} examples{note}, world_size={world_size()} → "
+          f"max_steps={steps_per_epoch * t.num_train_epochs}")
+    return steps_per_epoch * t.num_train_epochs
+
+
+@task(name="fetch_model", retries=2, retry_delay_seconds=10)
+def fetch_model(params: FlowParameters) -> tuple[str, dict]:
+    """베이스 모델 snapshot을 가중치 캐시(볼륨/이미지 레이어)에서 찾고, 없으면 병렬 다운로드로 채운다."""
+    print(f"[1/5] fetch_model — 모델 가중치 캐시 확인 (cache_dir={params.training.model_cache_dir or 'HF 기본'})")
+    t = params.training
+    path, info = resolve_model(
+        t.model_id, t.model_cache_dir, revision=t.model_revision, token=params.hf_token,
+        max_workers=t.model_download_workers,
+    )
+    return path, info
+
+
+@task(name="load_model", retries=0)
+def load_model(params: FlowParameters, model_path: str):
+    """베이스 모델 로드 — stage가 여러 개여도 한 번만 로드한다."""
+    t = params.training
+    if not is_distributed():
+        device_map = "auto"
+    elif t.fsdp or not torch.cuda.is_available():
+        device_map = None  # FSDP는 CPU에 로드 후 Trainer가 shard, gloo(CPU) 테스트도 CPU
+    else:
+        device_map = {"": local_rank()}  # DDP: rank마다 전체 모델 사본을 자기 GPU에
+    print(f"  loading model... (device_map={device_map})")
+    return Qwen3VLForConditionalGeneration.from_pretrained(
+        model_path,
+        # 캐시 snapshot이 아니면(캐시 비활성 등) Hub repo id — MODEL_REVISION을 직접 지정
+        revision=None if os.path.isdir(model_path) else t.model_revision or None,
+        torch_dtype=torch.bfloat16,
+        device_map=device_map,
+        attn_implementation=t.attn_implementation,
+    )
+
+
+def _push_checkpoint(sync, stage_key: str, checkpoint_dir: str):
+    try:
+        sync.push_checkpoint(stage_key, checkpoint_dir)
+    except Exception as e:
+        # 동기화 실패로 학습을 멈추지는 않는다 — 다음 저장 시 다시 시도
+        print(f"  [ckpt] push 실패 ({checkpoint_dir}): {e}")
+
+
+def _resume_checkpoint(output_dir: str, stage_key: str, sync) -> str | None:
+    """재개할 체크포인트 — 같은 볼륨에 남은 로컬 체크포인트 → Hub ckpt 브랜치 순. run_id 없으면 항상 새로 학습."""
+    if sync is None:
+        return None
+    local = get_last_checkpoint(output_dir) if os.path.isdir(output_dir) else None
+    if local:
+        print(f"  resume from local {local}")
+        return local
+    return sync.latest_checkpoint(stage_key, RESUME_DIR)
+
+
+class AsyncCheckpointSFTTrainer(SFTTrainer):
+    """체크포인트를 host 메모리 snapshot만 뜨고, 파일 쓰기/Hub push는 백그라운드 writer에 맡기는 SFTTrainer.
+
+    LoRA 어댑터·optimizer 상태만 CPU로 복사하므로 학습 정지 시간은 GPU→CPU 복사 시간뿐이다.
+    Trainer._save_checkpoint의 파일 구성(어댑터, processor, optimizer/scheduler/scaler, rng_state, trainer_state)을
+    Trainer 내부 구현에 기대어 재현하므로, requirements.txt의 transformers 버전 범위에서 검증한 대로만 쓴다.
+    """
+
+    checkpoint_writer: AsyncCheckpointWriter | None = None
+
+    def _save_checkpoint(self, model, trial):
+        # 분산 학습(rank별 rng_state_<n>.pth)은 기본 동기 저장을 쓴다
+        if self.checkpoint_writer is None or self.args.world_size > 1:
+            return super()._save_checkpoint(model, trial)
+
+        import copy
+        import random
+
+        import numpy as np
+        from peft import get_peft_model_state_dict
+        from transformers.trainer_callback import ExportableState
+
+        self.store_flos()
+        peft_model = self.accelerator.unwrap_model(model)
+        for cb in [cb for cb in self.callback_handler.callbacks + [self.control] if isinstance(cb, ExportableState)]:
+            cb_name = cb.__class__.__name__
+            if isinstance(self.state.stateful_callbacks[cb_name], list):
+                self.state.stateful_callbacks[cb_name].append(cb.state())
+            else:
+                self.state.stateful_callbacks[cb_name] = cb.state()
+        scaler = getattr(self.accelerator, "scaler", None)
+        rng_state = {"python": random.getstate(), "numpy": np.random.get_state(), "cpu": torch.random.get_rng_state()}
+        if torch.cuda.is_available():
+            rng_state["cuda"] = torch.cuda.random.get_rng_state()
+
+        t0 = time.time()
+        snapshot = {
+            "adapter": snapshot_to_cpu(get_peft_model_state_dict(peft_model)),
+            "peft_config": peft_model.peft_config["default"],
+            "optimizer": snapshot_to_cpu(self.optimizer.state_dict()),
+            "scheduler": copy.deepcopy(self.lr_scheduler.state_dict()),
+            "scaler": copy.deepcopy(scaler.state_dict()) if scaler is not None else None,
+            "rng_state": rng_state,
+            "trainer_state": copy.deepcopy(self.state),
+            "args": self.args,
+            "processing_class": self.processing_class,
+        }
+        print(f"  [ckpt] step {self.state.global_step} snapshot to host memory ({time.time() - t0:.1f}s)")
+        self.checkpoint_writer.submit(
+            self._get_output_dir(trial=trial), f"checkpoint-{self.state.global_step}",
+            snapshot, _write_checkpoint, save_total_limit=self.args.save_total_limit,
+        )
+
+
+def _write_checkpoint(output_dir: str, snapshot: dict):
+    """AsyncCheckpointSFTTrainer snapshot → Trainer 체크포인트 파일 (백그라운드 스레드에서 실행)."""
+    from safetensors.torch import save_file
+
+    save_file(snapshot["adapter"], os.path.join(output_dir, "adapter_model.safetensors"), metadata={"format": "pt"})
+    snapshot["peft_config"].save_pretrained(output_dir)
+    if snapshot["processing_class"] is not None:
+        snapshot["processing_class"].save_pretrained(output_dir)
+    torch.save(snapshot["optimizer"], os.path.join(output_dir, "optimizer.pt"))
+    torch.save(snapshot["scheduler"], os.path.join(output_dir, "scheduler.pt"))
+    if snapshot["scaler"] is not None:
+        torch.save(snapshot["scaler"], os.path.join(output_dir, "scaler.pt"))
+    torch.save(snapshot["rng_state"], os.path.join(output_dir, "rng_state.pth"))
+    torch.save(snapshot["args"], os.path.join(output_dir, "training_args.bin"))
+    snapshot["trainer_state"].save_to_json(os.path.join(output_dir, "trainer_state.json"))
+
+
+@task(name="train", retries=0)
+def train(params: FlowParameters, stage: str, ds, processor, model, output_dir: str, packed=None,
+          stage_key: str = "", sync=None):
+    """model 위에 새 LoRA를 학습하고 (LoRA가 적용된 PeftModel, 처리량 요약)을 반환.
+
+    sync(CheckpointSync)가 있으면 저장되는 체크포인트를 Hub로 동기화하고, 남아 있는 체크포인트에서 재개한다.
+    async_checkpoint면 체크포인트 쓰기/동기화는 백그라운드에서 진행되고 학습 종료 시 모두 끝날 때까지 기다린다.
+    """
+    print(f"[3/5] train — bf16 LoRA + SFTTrainer (stage={stage})")
+    t = params.training
+
+    # WandB
+    run_name = f"{_run_name(params)}-{stage}"
+    use_wandb = is_main_process() and login_wandb(params.wandb_project, run_name=run_name)
+
+    # LoRA config
+    target_modules = [m.strip() for m in t.lora_target_modules.split(",")]
+    lora_config = LoraConfig(
+        r=t.lora_r,
+        lora_alpha=t.lora_alpha,
+        lora_dropout=t.lora_dropout,
+        target_modules=target_modules,
+        task_type=TaskType.CAUSAL_LM,
+        bias="none",
+    )
+
+    # 비전 입력이 캐시되어 있으면 collator가 캐시에서 pixel_values를 읽는다
+    train_dataset = ds
+    data_collator = None
+    dataset_kwargs = None
+    if packed is not None:
+        train_dataset = packed
+        data_collator = PackedVisionCollator(
+            processor, VisionCache(t.vision_cache_dir, processor.image_processor), ds,
+            get_rope_index=model.model.get_rope_index, max_length=t.max_seq_length,
+        )
+        dataset_kwargs = {"skip_prepare_dataset": True}
+    elif "image_keys" in (ds.column_names or []):
+        data_collator = CachedVisionCollator(
+            processor, VisionCache(t.vision_cache_dir, processor.image_processor), max_length=t.max_seq_length,
+        )
+        dataset_kwargs = {"skip_prepare_dataset": True}
+
+    # SFT config
+    sft_config = SFTConfig(
+        output_dir=output_dir,
+        per_device_train_batch_size=t.per_device_train_batch_size,
+        gradient_accumulation_steps=t.gradient_accumulation_steps,
+        learning_rate=t.learning_rate,
+        num_train_epochs=t.num_train_epochs,
+        max_steps=_resolve_max_steps(t, train_dataset),
+        seed=t.seed,
+        bf16=t.bf16,
+        max_length=t.max_seq_length,
+        gradient_checkpointing=True,
+        logging_steps=1,
+        save_strategy="steps" if t.save_steps > 0 else "epoch",
+        save_steps=t.save_steps if t.save_steps > 0 else 500,
+        save_total_limit=t.save_total_limit,
+        dataset_text_field="text",
+        remove_unused_columns=False,
+        dataset_kwargs=dataset_kwargs,
+        report_to="wandb" if use_wandb else "none",
+        # 멀티 GPU: LoRA라 학습 안 되는 파라미터가 대부분 — unused 탐색 생략, reentrant checkpointing은 DDP와 충돌
+        ddp_find_unused_parameters=False if is_distributed() else None,
+        gradient_checkpointing_kwargs={"use_reentrant": False} if is_distributed() else None,
+        fsdp=t.fsdp if is_distributed() else "",
+        use_cpu=not torch.cuda.is_available(),  # GPU 없이 gloo로 분산 테스트할 때 accelerate가 MULTI_CPU로 인식
+    )
+
+    trainer = AsyncCheckpointSFTTrainer(
+        model=model,
+        args=sft_config,
+        train_dataset=train_dataset,
+        data_collator=data_collator,
+        peft_config=lora_config,
+        processing_class=processor,
+    )
+
+    # DiscordHook 콜백 등록
+    trainer.add_callback(DiscordHook(
+        run_name=run_name,
+        hook_steps=sft_config.logging_steps,
+    ))
+    if isinstance(train_dataset, IterableDataset) and t.max_steps <= 0:
+        # 추정 max_steps가 필터로 줄어든 스트림보다 길면 마지막 epoch 뒤 새 pass를 시작하지 않도록
+        trainer.add_callback(EpochCapHook(t.num_train_epochs))
+    # 처리량 측정 — collator를 감싸 batch별 토큰/이미지 토큰/샘플 수를 센다
+    throughput = ThroughputHook(
+        run_name=run_name,
+        image_token_id=processor.tokenizer.convert_tokens_to_ids(getattr(processor, "image_token", "<|image_pad|>")),
+        log_fn=log_metrics if use_wandb else None,
+    )
+    trainer.data_collator = throughput.wrap_collator(trainer.data_collator)
+    trainer.add_callback(throughput)
+    writer = None
+    if t.async_checkpoint and not is_distributed():
+        on_saved = (lambda path: _push_checkpoint(sync, stage_key, path)) if sync is not None else None
+        writer = AsyncCheckpointWriter(max_pending=t.checkpoint_max_pending, on_saved=on_saved)
+        trainer.checkpoint_writer = writer
+    elif sync is not None:
+        trainer.add_callback(CheckpointSyncHook(sync, stage_key))
+
+    # optimizer/scheduler/rng 상태와 데이터 위치(이미 본 batch skip)까지 Trainer가 복원
+    # sync는 rank 0에만 있다 — rank 0이 받은 체크포인트 경로를 공유 (같은 Pod 볼륨)
+    checkpoint = broadcast_object(_resume_checkpoint(output_dir, stage_key, sync))
+    print("  starting training..." if checkpoint is None else f"  resuming training from {checkpoint}...")
+    try:
+        trainer.train(resume_from_checkpoint=checkpoint)
+    finally:
+        if writer is not None:
+            writer.close()
+    print("  training complete")
+    if writer is not None and writer.errors:
+        print(f"  [ckpt] background save 실패 {len(writer.errors)}건: {writer.errors}")
+
+    # Save adapter
+    trainer.save_model(output_dir)
+    if is_main_process():
+        processor.save_pretrained(output_dir)
+        print(f"  saved adapter to {output_dir}")
+    barrier()
+
+    if use_wandb:
+        import wandb
+        log_summary(throughput.summary)
+        wandb.finish()
+
+    return trainer.model, throughput.summary
+
+
+# ---------------------------------------------------------------------------
+# [4/5] upload_to_hub
+# ---------------------------------------------------------------------------
+
+@task(name="upload_to_hub", retries=2, retry_delay_seconds=10)
+def upload_to_hub(params: FlowParameters, output_repo: str):
+    branch = params.hf_output_branch
+    print(f"[4/5] upload_to_hub — LoRA 어댑터 HF Hub 업로드 (branch={branch})")
+    from huggingface_hub import HfApi
+
+    api = HfApi(token=params.hf_token)
+    api.create_repo(output_repo, exist_ok=True)
+    if branch != "main":
+        api.create_branch(repo_id=output_repo, branch=branch, exist_ok=True)
+    # 원격과 같은 파일(재실행, 복원된 stage 어댑터 등)은 건너뛰고 바뀐 파일만 커밋
+    upload_changed(
+        api,
+        params.training.output_dir,
+        output_repo,
+        revision=branch,
+        ignore_patterns=["checkpoint-*", "*/checkpoint-*"],  # 학습 중간 체크포인트는 올리지 않는다
+        commit_message=f"Upload LoRA adapter (tasks={params.tasks}, mode={params.task_mode}, "
+                       f"r={params.training.lora_r}, epochs={params.training.num_train_epochs})",
+    )
+    print(f"  uploaded to https://huggingface.co/{output_repo}/tree/{branch}")
+
+
+@task(name="merge_model", retries=1, retry_delay_seconds=10)
+def merge_model(params: FlowParameters, model_path: str, manifest: list[dict], processor) -> str:
+    """베이스 가중치 + stage 어댑터들(학습 순서)을 병합해 MERGED_DIR에 저장, hf_merged_repo가 있으면 업로드.
+
+    GPU 위 모델을 merge_and_unload해 저장하지 않고, 캐시된 베이스 safetensors를 mmap으로 텐서 하나씩
+    읽어 병합한다 — 피크 메모리 ≈ 출력 shard 하나.
+    """
+    repo = params.hf_merged_repo
+    print(f"      merge_model — 베이스 + LoRA 스트리밍 병합 → {repo or MERGED_DIR}")
+    from huggingface_hub import HfApi
+
+    t = params.training
+    adapter_dirs = [os.path.normpath(os.path.join(t.output_dir, m["adapter"])) for m in manifest]
+    # 모델 캐시를 못 쓴 경우(MODEL_CACHE_DIR="", revision 조회 실패 등) model_path는 repo id — 가중치를 받아 둔다
+    base_dir = local_snapshot(model_path, params.hf_token, revision=t.model_revision)
+    merge_lora(base_dir, adapter_dirs, MERGED_DIR, max_shard_size=t.merge_max_shard_size_mb * 1024**2)
+    processor.save_pretrained(MERGED_DIR)  # 학습 시 pixel budget이 반영된 processor 설정
+    if not repo:
+        return ""
+    api = HfApi(token=params.hf_token)
+    api.create_repo(repo, exist_ok=True)
+    upload_changed(
+        api,
+        MERGED_DIR,
+        repo,
+        commit_message=f"Merge {' → '.join(m['stage'] for m in manifest)} LoRA into {t.model_id}",
+    )
+    print(f"  uploaded to https://huggingface.co/{repo}")
+    return repo
+
+
+def calibration_batches(params: FlowParameters, specs: list[TaskSpec], processor) -> list[dict]:
+    """학습 데이터셋 앞부분에서 태스크별로 고르게 뽑은 calibration 샘플 (processor 입력).
+
+    vision cache를 쓰면 렌더링된 데이터셋에 이미지가 없으므로 원본 row를 다시 렌더링한다.
+    """
+    n = max(1, params.training.quant_calibration_samples // len(specs))
+    batches = []
+    for spec in specs:
+        repo = params.dataset_repo(spec.name, spec.dataset_repo)
+        revision = resolve_revision(repo, "dataset", token=params.hf_token, revision=params.dataset_revision(spec.name))
+        for row in load_dataset(repo, split=f"train[:{n}]", revision=revision):
+            text = processor.apply_chat_template(
+                [spec.build_messages(row)], tools=spec.tools, tokenize=False, add_generation_prompt=False,
+            )[0]
+            batches.append(processor(text=[text], images=[row["image"].convert("RGB")], return_tensors="pt"))
+    return batches
+
+
+@task(name="quantize_model", retries=1, retry_delay_seconds=10)
+def quantize_model(params: FlowParameters, specs: list[TaskSpec], processor) -> dict:
+    """MERGED_DIR → QUANTIZED_DIR (FP8/INT8 per-channel, compressed-tensors) + logit 오차 리포트 → hf_quantized_repo.
+
+    export는 텐서 단위 스트리밍(CPU). 리포트는 같은 calibration 샘플에 대해 bf16 병합 모델과, 대상 Linear만
+    export된 가중치(quantize → dequantize)와 동적 per-token activation 양자화로 바꾼 forward의 logits를 비교한다.
+    """
+    repo = params.hf_quantized_repo
+    t = params.training
+    print(f"      quantize_model — {t.quant_scheme} export → {repo}")
+    from huggingface_hub import HfApi
+
+    export = quantize_export(MERGED_DIR, QUANTIZED_DIR, t.quant_scheme,
+                             max_shard_size=t.merge_max_shard_size_mb * 1024**2)
+    processor.save_pretrained(QUANTIZED_DIR)
+    report = {"scheme": t.quant_scheme, "export": export}
+    if t.quant_calibration_samples > 0:
+        model = Qwen3VLForConditionalGeneration.from_pretrained(
+            MERGED_DIR, dtype=torch.bfloat16, device_map="cuda" if torch.cuda.is_available() else "cpu",
+        )
+        report["logit_error"] = logit_error_report(model, calibration_batches(params, specs, processor), t.quant_scheme)
+        del model
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    with open(os.path.join(QUANTIZED_DIR, "quant_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    api = HfApi(token=params.hf_token)
+    api.create_repo(repo, exist_ok=True)
+    upload_changed(
+        api,
+        QUANTIZED_DIR,
+        repo,
+        commit_message=f"{t.quant_scheme.upper()} export of {params.hf_merged_repo or t.model_id} + LoRA",
+    )
+    print(f"  uploaded to https://huggingface.co/{repo}")
+    return report
+
+
+# ---------------------------------------------------------------------------
+# [5/5] self_terminate
+# ---------------------------------------------------------------------------
+
+@task(name="self_terminate", retries=0)
+def self_terminate(params: FlowParameters):
+    pod_id = params.runpod_pod_id
+    api_key = params.runpod_api_key
+    print(f"[5/5] self_terminate — Pod 자가 종료 (pod_id={pod_id})")
+    # 백그라운드 큐의 진행률 메시지를 먼저 내보낸다 (Pod 삭제 후에는 보낼 수 없음)
+    flush_discord()
+    if not pod_id or not api_key:
+        print("  RUNPOD_POD_ID or RUNPOD_API_KEY not set, skipping self-terminate")
+        return
+    terminate_self(pod_id, api_key, notify=send_discord)
+
+
+# ---------------------------------------------------------------------------
+# main
+# ---------------------------------------------------------------------------
+
+def _run_name(params: FlowParameters) -> str:
+    pod_id = params.runpod_pod_id or "local"
+    return f"vlm-train-{'-'.join(params.task_names())}-{pod_id}"
+
+
+def _flow_run_name() -> str:
+    pod_id = os.environ.get("RUNPOD_POD_ID", "local")
+    tasks = os.environ.get("TASKS", FlowParameters.model_fields["tasks"].default).replace(",", "-")
+    return f"vlm-train-{tasks}-{pod_id}"
+
+
+def build_stages(params: FlowParameters, specs: list[TaskSpec], processor) -> list[tuple[str, object]]:
+    """태스크별 데이터셋을 준비하고 (stage 이름, 데이터셋) 목록을 만든다."""
+    t = params.training
+    datasets = {}
+    for spec in specs:
+        ds = prepare_dataset(params, spec, processor)
+        if not t.streaming:
+            ds = analyze_tokens(params, spec, ds)
+        if t.vision_cache_dir and not t.streaming:
+            ds = precompute_vision(params, ds, processor)
+        datasets[spec.name] = ds
+
+    if params.task_mode == "mix" and len(datasets) > 1:
+        return [("mix", mix_tasks(params, datasets))]
+    return list(datasets.items())
+
+
+def load_processor(params: FlowParameters, model_path: str):
+    """processor 로드 + 이미지 해상도 예산 적용 (렌더링/토큰 집계/vision cache/학습 모두 같은 설정).
+
+    processor 파일(설정/토크나이저)만 받으므로 가중치 캐시를 기다리지 않고 model_id로 바로 로드할 수 있다.
+    """
+    t = params.training
+    processor = AutoProcessor.from_pretrained(model_path, revision=t.model_revision or None)
+    budget = apply_pixel_budget(processor, t.min_pixels, t.max_pixels)
+    print(f"  pixel budget: min_pixels={budget['min_pixels']}, max_pixels={budget['max_pixels']}")
+    return processor, budget
+
+
+def _prefetch_model(params: FlowParameters, fetched: tuple[str, dict] | None = None):
+    started = time.time()
+    model_path, model_cache = fetched or fetch_model(params)
+    model = load_model(params, model_path)
+    return model_path, model_cache, model, time.time() - started
+
+
+def start_model_prefetch(params: FlowParameters) -> Future:
+    """가중치 캐시 확인/다운로드 + 모델 로드를 백그라운드 스레드에서 시작.
+
+    Future.result() → (model_path, model_cache, model, 소요 시간). Prefect flow context를 복사해 넘기므로
+    fetch_model/load_model은 스레드 안에서도 flow의 task run으로 기록된다.
+    분산 학습에서는 캐시 채우기(rank 0 먼저, barrier)를 메인 스레드에서 끝낸 뒤 로드만 백그라운드로 —
+    스레드의 collective가 build_stages의 barrier와 순서가 엇갈리지 않도록.
+    """
+    fetched = None
+    if is_distributed():
+        with main_process_first():
+            fetched = fetch_model(params)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-prefetch")
+    future = executor.submit(contextvars.copy_context().run, _prefetch_model, params, fetched)
+    executor.shutdown(wait=False)
+    return future
+
+
+def format_startup(timings: dict, model_cache: dict) -> str:
+    """phase별 startup 시간 한 줄 요약. model은 processor/dataset과 병렬로 진행된다."""
+    cache = {True: "cache hit", False: "cache miss"}.get(model_cache.get("hit"), "no cache")
+    phases = " · ".join(
+        f"{name} {timings[name]:.0f}s" for name in ("preflight", "imports", "login", "processor", "dataset")
+    )
+    return f"{phases} · model {timings['model']:.0f}s ({cache}, 병렬) → total {timings['total']:.0f}s"
+
+
+def write_stage_manifest(params: FlowParameters, stages: list[dict], pixel_budget: dict, model_cache: dict):
+    """stage 순서와 어댑터 위치 기록 — 최종 어댑터는 이전 stage 어댑터들을 순서대로 병합한 모델 기준."""
+    path = os.path.join(params.training.output_dir, "stages.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "base_model": params.training.model_id,
+            "base_model_revision": model_cache.get("sha"),
+            "task_mode": params.task_mode,
+            "task_weights": params.task_weight_list(),
+            "stages": stages,
+            "pixel_budget": pixel_budget,
+            # 학습 타겟 thought 예산 — 태스크별 분포/제거 수는 thought_budget_<task>.json
+            "thought_budget": {"policy": params.training.thought_policy,
+                               "max_tokens": params.training.thought_max_tokens},
+            # 평가 서버도 학습과 같은 해상도로: vllm serve ... --mm-processor-kwargs '<값>'
+            "vllm_mm_processor_kwargs": vllm_mm_processor_kwargs(pixel_budget),
+        }, f, ensure_ascii=False, indent=2)
+    print(f"  stage manifest: {path}")
+
+
+@flow(name="vlm-train", flow_run_name=_flow_run_name, log_prints=True)
+def train_flow():
+    params = None
+    try:
+        params = load_config()
+        specs = [get_task(name) for name in params.task_names()]
+        output_repo = params.output_repo(specs[-1].output_repo)
+        timings = {"preflight": float(os.environ.get("PREFLIGHT_SECONDS", 0)), "imports": IMPORT_SECONDS}
+        started = time.time()
+        if params.hf_token:
+            login(token=params.hf_token)
+        timings["login"] = time.time() - started
+        t = params.training
+        labels = " → ".join(spec.label for spec in specs)
+        datasets = ", ".join(params.dataset_repo(spec.name, spec.dataset_repo) for spec in specs)
+
+        # run_id가 있으면 Hub ckpt 브랜치로 체크포인트 동기화 + 이전 실행에서 이어서 학습
+        # Hub 쓰기는 rank 0만 — 다른 rank는 rank 0이 읽은 progress를 받는다
+        sync = CheckpointSync(output_repo, params.run_id, token=params.hf_token) \
+            if params.run_id and is_main_process() else None
+        progress = broadcast_object(sync.progress() if sync else {})
+        if progress.get("finished"):
+            print(f"  run {params.run_id}은(는) 이미 완료됨 — 학습 생략")
+            send_discord(f"ℹ️ run `{params.run_id}` 이미 완료됨, 학습 생략\npod: `{params.runpod_pod_id}`")
+            return
+        if progress.get("completed_stages"):
+            print(f"  resume run {params.run_id}: completed stages {progress['completed_stages']}")
+
+        # 모델 다운로드/로드(I/O)와 데이터셋 렌더링(CPU)은 서로 독립 — 동시에 진행해 첫 step까지 시간을 줄인다
+        started = time.time()
+        model_future = start_model_prefetch(params)
+        processor, pixel_budget = load_processor(params, t.model_id)
+        timings["processor"] = time.time() - started
+        with main_process_first():  # rank 0이 렌더링/vision 캐시를 만들고 나머지는 캐시를 읽는다
+            stages = build_stages(params, specs, processor)
+        timings["dataset"] = time.time() - started - timings["processor"]
+        model_path, model_cache, model, timings["model"] = model_future.result()
+        # 컨테이너 시작(preflight 시작) → 학습 직전까지
+        timings["total"] = time.time() - float(os.environ.get("PREFLIGHT_STARTED", IMPORT_STARTED))
+        startup_line = format_startup(timings, model_cache)
+        print(f"  startup: {startup_line}")
+        send_discord(f"🚀 *{labels} 학습 시작* ({params.task_mode})\nmodel: `{t.model_id}` | dataset: `{datasets}` | epochs: {t.num_train_epochs}\nstartup: {startup_line}\npod: `{params.runpod_pod_id}`")
+        manifest = []
+        for i, (stage, ds) in enumerate(stages, start=1):
+            last = i == len(stages)
+            stage_key = f"{i}-{stage}"
+            # 중간 stage 어댑터는 stages/ 아래에, 마지막 stage 어댑터는 output_dir 최상위에 저장
+            output_dir = t.output_dir if last else os.path.join(t.output_dir, "stages", stage_key)
+            if stage_key in progress.get("completed_stages", []):
+                # 이전 실행에서 끝난 stage — 어댑터만 받아 output에 두고, 다음 stage를 위해 병합
+                adapter_dir = broadcast_object(sync.download_adapter(stage_key, RESUME_DIR) if sync else None)
+                if is_main_process():
+                    shutil.copytree(adapter_dir, output_dir, dirs_exist_ok=True)
+                if not last:
+                    model = PeftModel.from_pretrained(model, adapter_dir).merge_and_unload()
+                print(f"  stage {stage_key}: 이전 실행에서 완료 — 어댑터 복원")
+                manifest.append({"stage": stage, "adapter": os.path.relpath(output_dir, t.output_dir),
+                                 "throughput": {}, "resumed": True})
+                continue
+            if len(stages) > 1:
+                send_discord(f"▶️ stage {i}/{len(stages)}: `{stage}`\npod: `{params.runpod_pod_id}`")
+            packed = pack_samples(params, ds, processor) if t.packing else None
+            model, throughput = train(params, stage, ds, processor, model, output_dir, packed,
+                                      stage_key=stage_key, sync=sync)
+            if sync:
+                progress = sync.complete_stage(stage_key, output_dir, progress)
+            manifest.append({
+                "stage": stage,
+                "adapter": os.path.relpath(output_dir, t.output_dir),
+                "throughput": throughput,
+            })
+            if not last:
+                # 다음 stage는 이번 LoRA를 병합한 모델을 새 베이스로 학습
+                model = model.merge_and_unload()
+                print(f"  merged {stage} LoRA into base model")
+        if not is_main_process():
+            return
+        write_stage_manifest(params, manifest, pixel_budget, model_cache)
+        upload_to_hub(params, output_repo)
+        merged_repo = quant_report = None
+        if params.hf_merged_repo or params.hf_quantized_repo:
+            # 학습 모델은 더 쓰지 않는다 — 병합/calibration 전에 GPU 메모리 반환
+            model = None
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            merged_repo = merge_model(params, model_path, manifest, processor)
+        if params.hf_quantized_repo:
+            quant_report = quantize_model(params, specs, processor)
+        if sync:
+            sync.finish(progress)
+
+        throughput_lines = "\n".join(
+            f"`{m['stage']}`: {m['throughput'].get('samples_per_sec', 0):.2f} samples/s, "
+            f"{m['throughput'].get('tokens_per_sec', 0):.0f} tokens/s, "
+            f"data wait {m['throughput'].get('data_wait_ratio', 0):.0%}, "
+            f"peak {m['throughput'].get('peak_memory_gb', 0):.1f}GB"
+            + (f" ({m['throughput']['world_size']} GPUs, {m['throughput']['samples_per_sec_per_gpu']:.2f} samples/s/GPU)"
+               if m["throughput"].get("world_size", 1) > 1 else "")
+            for m in manifest
+        )
+        merged_line = f"merged: https://huggingface.co/{merged_repo}\n" if merged_repo else ""
+        if quant_report:
+            error = quant_report.get("logit_error", {})
+            merged_line += (f"{quant_report['scheme']}: https://huggingface.co/{params.hf_quantized_repo}"
+                            + (f" (top-1 {error['top1_agreement']:.1%}, KL {error['kl_mean']:.4f})" if error else "")
+                            + "\n")
+        send_discord(f"✅ *{labels} 학습 완료*\nhttps://huggingface.co/{output_repo}\n{merged_line}{throughput_lines}\npod: `{params.runpod_pod_id}`")
+        print("ALL DONE")
+    except Exception as e:
+        traceback.print_exc()
+        send_discord(f"❌ *학습 실패*\npod: `{params.runpod_pod_id if params else ''}`\n```{e}```")
+        raise
+    finally:
+        if params and is_main_process():
+            self_terminate(params)
+
+
+def main():
+    nproc = launch_nproc(FlowParameters.from_env().training.nproc_per_node)
+    if nproc <= 1:
+        init_distributed()
+        train_flow()
+        return
+    # 멀티 GPU: 이 프로세스는 torchrun만 띄우고 기다린다. 학습/업로드/자가 종료는 rank 0 담당
+    code = launch(os.path.abspath(__file__), nproc)
+    if code != 0:
+        # rank가 죽어 torchrun이 전체를 내린 경우 rank 0의 finally가 돌지 못했을 수 있다 — 과금 안전
+        params = FlowParameters.from_env()
+        send_discord(f"❌ *분산 학습 실패* (torchrun exit {code})\npod: `{params.runpod_pod_id}`")
+        self_terminate.fn(params)
+    raise SystemExit(code)
+
+
+if __name__ == "__main__":
+    main()
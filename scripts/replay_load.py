@@ -0,0 +1,102 @@
+"""
+수집된 safari 요청(data/safari-dataset/dataset.jsonl)을 OpenAI 호환 엔드포인트에 재생해
+latency/TTFT 분위수, 처리량, 에러율을 측정한다 — vLLM/RunPod 용량 산정용.
+
+    # 로컬 stub 서버로 생성기 자체 확인
+    python scripts/replay_load.py stub --port 8001 --ttft 0.3 --tokens 128
+    python scripts/replay_load.py run --base-url http://localhost:8001/v1 --mode open --qps 5 --duration 60
+
+    # 실제 엔드포인트: QPS 단계별 (open loop) / 동시성 단계별 (closed loop)
+    python scripts/replay_load.py run --base-url http://192.168.50.32:8000/v1 --model safari-lora --qps 1,2,4
+    python scripts/replay_load.py run --base-url ... --mode closed --concurrency 1,4,16 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# 태스크 TOOLS (학습 이미지와 같은 safari 도구 스키마)
+sys.path.insert(0, os.path.join(project_root, 'images', 'vlm_train'))
+
+from utils.replay_load import load_requests, print_summary, replay, results_to_json, serve_stub, summarize
+
+DEFAULT_DATASET = os.path.join(project_root, 'data', 'safari-dataset', 'dataset.jsonl')
+
+
+def _tools(task: str) -> list[dict]:
+    from tasks import get_task
+
+    return get_task(task).tools
+
+
+def run(args):
+    requests = load_requests(args.dataset, _tools(args.task), limit=args.limit)
+    if not requests:
+        raise SystemExit(f"재생할 요청이 없습니다: {args.dataset}")
+    # 단계별 부하: open loop는 --qps 목록, closed loop는 --concurrency 목록
+    levels = [float(v) for v in args.qps.split(",")] if args.mode == "open" else \
+        [int(v) for v in args.concurrency.split(",")]
+    report = []
+    for level in levels:
+        label = f"[{args.mode} {'qps' if args.mode == 'open' else 'concurrency'}={level}]"
+        print(f"\n{label} {args.base_url} model={args.model}")
+        results, elapsed = asyncio.run(replay(
+            requests, args.base_url, args.model, api_key=args.api_key, mode=args.mode,
+            qps=level if args.mode == "open" else 1.0,
+            concurrency=int(level) if args.mode == "closed" else int(args.concurrency.split(",")[0]),
+            num_requests=args.requests, duration=args.duration, arrival=args.arrival,
+            max_tokens=args.max_tokens, timeout=args.timeout, seed=args.seed,
+        ))
+        summary = summarize(results, elapsed)
+        print_summary(summary, label)
+        report.append({"mode": args.mode, "level": level, "summary": summary, "results": results_to_json(results)})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="safari 요청 재생 부하 생성기")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="엔드포인트에 요청 재생")
+    p.add_argument("--dataset", default=DEFAULT_DATASET)
+    p.add_argument("--task", default="safari", help="tools를 가져올 태스크 (Gemini 원본 요청이면 그 안의 tools 사용)")
+    p.add_argument("--base-url", required=True)
+    p.add_argument("--model", default="safari-lora")
+    p.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", "EMPTY"))
+    p.add_argument("--mode", choices=["open", "closed"], default="open")
+    p.add_argument("--qps", default="1", help="open loop 목표 QPS (쉼표로 여러 단계)")
+    p.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    p.add_argument("--concurrency", default="8", help="closed loop worker 수 (쉼표로 여러 단계)")
+    p.add_argument("--requests", type=int, default=0, help="단계별 요청 수 (0이면 --duration 또는 데이터셋 1회)")
+    p.add_argument("--duration", type=float, default=0, help="단계별 최대 시간 (초)")
+    p.add_argument("--limit", type=int, default=0, help="데이터셋에서 읽을 최대 요청 수")
+    p.add_argument("--max-tokens", type=int, default=1024)
+    p.add_argument("--timeout", type=float, default=300)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", default="")
+
+    s = sub.add_parser("stub", help="로컬 OpenAI 호환 stub 서버")
+    s.add_argument("--port", type=int, default=8001)
+    s.add_argument("--ttft", type=float, default=0.2)
+    s.add_argument("--tokens", type=int, default=64)
+    s.add_argument("--tokens-per-sec", type=float, default=100.0)
+    s.add_argument("--error-rate", type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.command == "stub":
+        serve_stub(args.port, args.ttft, args.tokens, args.tokens_per_sec, args.error_rate)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+사파리 tool calling 테스트(노트북 Level 1~6 / Set A)를 OpenAI 호환 엔드포인트에 동시 실행하고
+모델 설정별 pass rate, latency p50/p95, completion tokens, tokens/s를 리포트한다.
+
+    python scripts/run_tool_eval.py --config local --config local-safari --suite diag --repeat 5 --concurrency 16
+    python scripts/run_tool_eval.py --base-url http://localhost:8000/v1 --model safari-lora --output eval.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dataclasses import asdict
+
+# Add the project root to the Python path to allow for absolute imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.tool_eval import LLM_CONFIGS, SUITES, print_summary, run_eval, summarize
+
+
+def _resolve_configs(args) -> dict:
+    configs = {}
+    for name in args.config:
+        if name not in LLM_CONFIGS:
+            raise SystemExit(f"알 수 없는 config: {name} (사용 가능: {', '.join(LLM_CONFIGS)})")
+        config = dict(LLM_CONFIGS[name])
+        config["api_key"] = os.environ.get(config.pop("api_key_env", ""), "") or "EMPTY"
+        configs[name] = config
+    if args.base_url:
+        if not args.model:
+            raise SystemExit("--base-url에는 --model이 필요합니다")
+        configs[args.model] = {"base_url": args.base_url, "model": args.model, "api_key": args.api_key}
+    if not configs:
+        raise SystemExit("--config 또는 --base-url/--model을 지정하세요")
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사파리 tool calling 동시 평가")
+    parser.add_argument("--config", action="append", default=[], help=f"모델 설정 (반복 가능): {', '.join(LLM_CONFIGS)}")
+    parser.add_argument("--base-url", default="", help="임의 엔드포인트 (--model과 함께)")
+    parser.add_argument("--model", default="")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", "EMPTY"))
+    parser.add_argument("--suite", choices=[*SUITES, "all"], default="all")
+    parser.add_argument("--case", action="append", default=[], help="특정 케이스만 (예: A3, L6)")
+    parser.add_argument("--repeat", type=int, default=3, help="케이스별 반복 횟수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--max-tokens", type=int, default=10000)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", default="", help="결과 JSON 저장 경로")
+    parser.add_argument("--verbose", action="store_true", help="실행별 결과 출력")
+    args = parser.parse_args()
+
+    configs = _resolve_configs(args)
+    suites = list(SUITES) if args.suite == "all" else [args.suite]
+    cases = [case for suite in suites for case in SUITES[suite]()]
+    if args.case:
+        cases = [case for case in cases if case.case_id in args.case]
+
+    print(f"configs: {', '.join(configs)} | cases: {len(cases)} × repeat {args.repeat} | concurrency {args.concurrency}")
+
+    def on_result(r):
+        if args.verbose:
+            print(f"  {'✅' if r.passed else '❌'} [{r.config}] {r.case_id}#{r.repeat} "
+                  f"{r.latency:.1f}s {r.completion_tokens}tok — {r.reason}")
+
+    results = asyncio.run(run_eval(configs, cases, repeat=args.repeat, concurrency=args.concurrency,
+                                   max_tokens=args.max_tokens, timeout=args.timeout, on_result=on_result))
+    summary = summarize(results)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": [asdict(r) for r in results]}, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""비동기 체크포인트 저장.
+
+학습 스레드는 GPU 텐서를 host 메모리로 복사(snapshot)만 하고 바로 학습을 이어가며,
+파일 쓰기와 Hub 업로드는 백그라운드 worker가 처리한다. 대기 중인 snapshot 수를 max_pending으로
+제한해(초과 시 학습 스레드가 대기) host 메모리 사용량을 고정한다.
+
+체크포인트는 <name>.tmp에 쓴 뒤 rename하므로 디렉터리가 보이면 항상 완전한 상태다.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_CHECKPOINT_DIR_RE = re.compile(r"^checkpoint-(\d+)$")
+
+
+def snapshot_to_cpu(obj):
+    """state_dict 류 중첩 구조의 텐서를 모두 CPU 사본으로 (GPU 텐서 참조를 남기지 않는다)."""
+    import torch
+
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: snapshot_to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot_to_cpu(v) for v in obj)
+    return obj
+
+
+def rotate_checkpoints(run_dir: str, save_total_limit: int | None):
+    """step이 큰 순으로 save_total_limit개만 남기고 삭제."""
+    if not save_total_limit or not os.path.isdir(run_dir):
+        return
+    steps = sorted(
+        (int(m.group(1)), name)
+        for name in os.listdir(run_dir)
+        if (m := _CHECKPOINT_DIR_RE.match(name))
+    )
+    for _, name in steps[:-save_total_limit]:
+        shutil.rmtree(os.path.join(run_dir, name), ignore_errors=True)
+
+
+class AsyncCheckpointWriter:
+    """snapshot → (백그라운드) write_fn으로 파일 쓰기 → rename → rotate → on_saved 콜백(업로드 등)."""
+
+    def __init__(self, max_pending: int = 2, on_saved=None):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+        self.on_saved = on_saved
+        self.errors: list[str] = []
+
+    def submit(self, run_dir: str, name: str, snapshot, write_fn, save_total_limit: int | None = None):
+        t0 = time.time()
+        self._slots.acquire()  # max_pending개가 밀려 있으면 여기서 학습이 대기
+        waited = time.time() - t0
+        if waited > 1:
+            print(f"  [ckpt] writer backlog — {waited:.1f}s 대기")
+        self._futures.append(self._executor.submit(self._write, run_dir, name, snapshot, write_fn, save_total_limit))
+
+    def _write(self, run_dir, name, snapshot, write_fn, save_total_limit):
+        try:
+            t0 = time.time()
+            final = os.path.join(run_dir, name)
+            tmp = final + ".tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            write_fn(tmp, snapshot)
+            shutil.rmtree(final, ignore_errors=True)
+            os.replace(tmp, final)
+            rotate_checkpoints(run_dir, save_total_limit)
+            print(f"  [ckpt] wrote {final} in background ({time.time() - t0:.1f}s)")
+            if self.on_saved:
+                self.on_saved(final)
+        except Exception as e:
+            self.errors.append(f"{name}: {e}")
+            print(f"  [ckpt] background save 실패 ({name}): {e}")
+        finally:
+            self._slots.release()
+
+    def wait(self):
+        """대기 중인 저장/업로드가 모두 끝날 때까지 블록."""
+        for future in self._futures:
+            future.result()
+        self._futures.clear()
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,144 @@
+"""학습 체크포인트 Hub 동기화 (interruptible/spot Pod 재개용).
+
+run_id마다 output repo의 `ckpt-<run_id>` 브랜치에 저장한다:
+
+    progress.json                        — 완료된 stage 목록, run 완료 여부
+    <stage_key>/checkpoint-<step>/       — 최신 Trainer 체크포인트 1개 (optimizer/scheduler/rng 포함)
+    <stage_key>/adapter/                 — 완료된 stage의 LoRA 어댑터
+
+매 push는 한 커밋(추가 + 이전 체크포인트 삭제)이라 Pod이 업로드 중에 회수돼도 브랜치는 항상
+완전한 체크포인트 하나를 가리킨다. 같은 run_id로 다시 띄우면 완료된 stage는 어댑터만 받아
+병합하고, 진행 중이던 stage는 최신 체크포인트에서 resume_from_checkpoint로 이어간다.
+"""
+
+import json
+import os
+import re
+import time
+
+_CHECKPOINT_RE = re.compile(r"^(?P<stage>[^/]+)/checkpoint-(?P<step>\d+)/trainer_state\.json$")
+
+
+class CheckpointSync:
+    def __init__(self, repo_id: str, run_id: str, token: str = ""):
+        from huggingface_hub import HfApi
+
+        self.repo_id = repo_id
+        self.run_id = run_id
+        self.branch = f"ckpt-{run_id}"
+        self.token = token or None
+        self.api = HfApi(token=self.token)
+        self.api.create_repo(repo_id, exist_ok=True)
+        self.api.create_branch(repo_id=repo_id, branch=self.branch, exist_ok=True)
+
+    def _files(self) -> list[str]:
+        return self.api.list_repo_files(self.repo_id, revision=self.branch)
+
+    def progress(self) -> dict:
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+
+        try:
+            path = hf_hub_download(self.repo_id, "progress.json", revision=self.branch, token=self.token)
+        except EntryNotFoundError:
+            return {"completed_stages": [], "finished": False}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _progress_op(self, progress: dict):
+        from huggingface_hub import CommitOperationAdd
+
+        data = json.dumps(progress, ensure_ascii=False, indent=2).encode("utf-8")
+        return CommitOperationAdd(path_in_repo="progress.json", path_or_fileobj=data)
+
+    @staticmethod
+    def _folder_ops(local_dir: str, path_in_repo: str, top_level_only: bool = False) -> list:
+        from huggingface_hub import CommitOperationAdd
+
+        ops = []
+        for root, dirs, files in os.walk(local_dir):
+            if top_level_only:
+                dirs.clear()
+            for name in files:
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, local_dir).replace(os.sep, "/")
+                ops.append(CommitOperationAdd(path_in_repo=f"{path_in_repo}/{rel}", path_or_fileobj=path))
+        return ops
+
+    def push_checkpoint(self, stage_key: str, checkpoint_dir: str):
+        """체크포인트를 올리고 같은 stage의 이전 체크포인트는 같은 커밋에서 삭제."""
+        from huggingface_hub import CommitOperationDelete
+
+        name = os.path.basename(checkpoint_dir.rstrip("/"))
+        stale = {
+            f"{stage_key}/checkpoint-{m['step']}/"
+            for m in (_CHECKPOINT_RE.match(f) for f in self._files())
+            if m and m["stage"] == stage_key and f"checkpoint-{m['step']}" != name
+        }
+        t0 = time.time()
+        self.api.create_commit(
+            repo_id=self.repo_id,
+            revision=self.branch,
+            operations=self._folder_ops(checkpoint_dir, f"{stage_key}/{name}")
+            + [CommitOperationDelete(path_in_repo=path, is_folder=True) for path in sorted(stale)],
+            commit_message=f"{stage_key} {name}",
+        )
+        print(f"  [ckpt] pushed {stage_key}/{name} → {self.repo_id}@{self.branch} ({time.time() - t0:.1f}s)")
+
+    def latest_checkpoint(self, stage_key: str, local_root: str) -> str | None:
+        """stage의 최신 원격 체크포인트를 받아 로컬 경로 반환. 없으면 None."""
+        from huggingface_hub import snapshot_download
+
+        steps = [
+            int(m["step"])
+            for m in (_CHECKPOINT_RE.match(f) for f in self._files())
+            if m and m["stage"] == stage_key
+        ]
+        if not steps:
+            return None
+        name = f"checkpoint-{max(steps)}"
+        snapshot_download(
+            self.repo_id, revision=self.branch, token=self.token,
+            allow_patterns=[f"{stage_key}/{name}/*"], local_dir=local_root,
+        )
+        print(f"  [ckpt] resume from {self.repo_id}@{self.branch}/{stage_key}/{name}")
+        return os.path.join(local_root, stage_key, name)
+
+    def complete_stage(self, stage_key: str, adapter_dir: str, progress: dict):
+        """stage 어댑터 업로드 + progress.json 갱신 + 해당 stage 체크포인트 삭제 (한 커밋)."""
+        from huggingface_hub import CommitOperationDelete
+
+        progress = {**progress, "completed_stages": [*progress.get("completed_stages", []), stage_key]}
+        stale = sorted({
+            f"{stage_key}/checkpoint-{m['step']}/"
+            for m in (_CHECKPOINT_RE.match(f) for f in self._files())
+            if m and m["stage"] == stage_key
+        })
+        self.api.create_commit(
+            repo_id=self.repo_id,
+            revision=self.branch,
+            # 어댑터 디렉터리 최상위 파일만 (하위의 checkpoint-*/stages/는 제외)
+            operations=self._folder_ops(adapter_dir, f"{stage_key}/adapter", top_level_only=True)
+            + [CommitOperationDelete(path_in_repo=path, is_folder=True) for path in stale]
+            + [self._progress_op(progress)],
+            commit_message=f"{stage_key} complete",
+        )
+        print(f"  [ckpt] stage {stage_key} complete → {self.repo_id}@{self.branch}")
+        return progress
+
+    def download_adapter(self, stage_key: str, local_root: str) -> str:
+        from huggingface_hub import snapshot_download
+
+        snapshot_download(
+            self.repo_id, revision=self.branch, token=self.token,
+            allow_patterns=[f"{stage_key}/adapter/*"], local_dir=local_root,
+        )
+        return os.path.join(local_root, stage_key, "adapter")
+
+    def finish(self, progress: dict) -> dict:
+        progress = {**progress, "finished": True}
+        self.api.create_commit(
+            repo_id=self.repo_id, revision=self.branch,
+            operations=[self._progress_op(progress)], commit_message="run finished",
+        )
+        return progress
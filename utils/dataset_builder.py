@@ -0,0 +1,431 @@
+"""수집 dataset.jsonl → 이미지를 포함한 Parquet shard 스트리밍 빌드 + 병렬 Hub 업로드.
+
+notebook/upload_*_dataset.ipynb는 JSONL 전체를 리스트로 읽고 모든 PNG를 올린 뒤 Dataset을 만들어
+메모리와 시간이 데이터셋 크기에 비례한다. 여기서는:
+    1. JSONL을 generator로 한 줄씩 읽어 batch_size 행씩 처리하고
+    2. 이미지 PNG 읽기 + 디코딩 검증은 worker pool에서 병렬로 하고
+    3. batch마다 row group으로 써서 shard가 max_shard_size를 넘으면 닫고
+    4. 닫힌 shard는 바로 업로드 pool에서 LFS preupload — 빌드와 업로드가 겹친다
+마지막에 한 커밋으로 새 shard 추가 + README(configs) + watermark.json 갱신.
+피크 메모리 ≈ batch 하나 (이미지 바이트 포함), 데이터셋 크기와 무관.
+
+DataCollector는 dataset.jsonl에 append만 하므로 watermark(이미 올린 byte offset + 에피소드 id)
+이후의 새 에피소드만 변환해 같은 데이터셋에 shard를 추가한다 (delta) — publish 비용이 새 데이터에
+비례. 파일 끝 에피소드는 아직 수집 중일 수 있어 다음 실행으로 보류한다 (--include-trailing으로 포함).
+--full이면 전체를 다시 빌드하고 이전 shard(push_to_hub 결과 포함)를 삭제한다.
+커밋 sha(또는 --tag)를 학습의 HF_DATASET_REVISION에 넣으면 그 시점 데이터로 고정된다.
+
+출력 컬럼은 노트북 업로드와 같다 (image는 HF Image feature, 바이트 내장).
+
+    python -m utils.dataset_builder --kind safari --push      # 기본 repo (adwel94/vision-safari-dataset-v2)
+    python -m utils.dataset_builder --kind safari --push --tag v3   # 새 에피소드만 추가 + 태그
+    python -m utils.dataset_builder --kind emoji --output /tmp/emoji-parquet   # 로컬 빌드만
+"""
+
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.resources import available_cpus
+
+DATA_PREFIX = "data"
+SPLIT = "train"
+WATERMARK = "watermark.json"
+_TAIL_BYTES = 4096  # watermark offset 직전 구간 해시 — 파일이 append-only로 유지됐는지 확인
+
+
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _safari_record(r: dict) -> dict:
+    return {
+        "episode_id": r["episode_id"],
+        "mission": r["mission"],
+        "turn": r["turn"],
+        "system_prompt": r["system_prompt"],
+        "context_text": r["context_text"],
+        "image": r.get("image_file"),
+        "tool_calls": _json(r.get("tool_calls", [])),
+        "tool_results": _json(r.get("tool_results", [])),
+        "thought_text": r.get("thought_text", ""),
+        "has_raw": r.get("raw_request") is not None,
+    }
+
+
+def _emoji_record(r: dict) -> dict:
+    return {
+        "episode_id": r["episode_id"],
+        "round": r["round"],
+        "system_prompt": r["system_prompt"],
+        "context_text": r["context_text"],
+        "image": r.get("image_file"),
+        "tool_calls": _json(r.get("tool_calls", [])),
+        "tool_results": _json(r.get("tool_results", [])),
+        "thought_text": r.get("thought_text", ""),
+        "answer_text": r.get("answer_text", ""),
+        "visible_animals": _json(r.get("visible_animals", [])),
+        "is_correct": r["is_correct"],
+    }
+
+
+# kind → (JSONL 디렉터리, 기본 Hub repo, record 변환, 컬럼 dtype — record 키 순서와 같게)
+KINDS = {
+    "safari": ("data/safari-dataset", "adwel94/vision-safari-dataset-v2", _safari_record, {
+        "episode_id": "string", "mission": "string", "turn": "int64", "system_prompt": "string",
+        "context_text": "string", "image": "image", "tool_calls": "string", "tool_results": "string",
+        "thought_text": "string", "has_raw": "bool",
+    }),
+    "emoji": ("data/emoji-recognition", "adwel94/vision-emoji-recognition-v1", _emoji_record, {
+        "episode_id": "string", "round": "int64", "system_prompt": "string", "context_text": "string",
+        "image": "image", "tool_calls": "string", "tool_results": "string", "thought_text": "string",
+        "answer_text": "string", "visible_animals": "string", "is_correct": "bool",
+    }),
+}
+
+
+def features(kind: str):
+    """HF Features — arrow_schema 메타데이터로 load_dataset이 image 컬럼을 Image feature로 읽는다."""
+    from datasets import Features, Image, Value
+
+    return Features({name: Image() if dtype == "image" else Value(dtype)
+                     for name, dtype in KINDS[kind][3].items()})
+
+
+def iter_jsonl(path: str, offset: int = 0):
+    """offset부터 (row, 줄 시작 offset, 줄 끝 offset). 개행 없는 마지막 줄(쓰는 중)은 건너뛴다."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            start, offset = offset, offset + len(line)
+            if not line.endswith(b"\n"):
+                break
+            if line.strip():
+                yield json.loads(line), start, offset
+
+
+def tail_hash(path: str, offset: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - _TAIL_BYTES))
+        return hashlib.sha256(f.read(offset - max(0, offset - _TAIL_BYTES))).hexdigest()
+
+
+class EpisodeDelta:
+    """watermark 이후의 완결된 에피소드 row를 순서대로 — 다 읽고 나면 offset/episodes가 새 watermark.
+
+    연속한 같은 episode_id 줄을 한 묶음으로 본다. 이전 실행에서 올린 에피소드에 뒤늦게 붙은 줄은
+    기존 shard를 고치지 않으면 반영할 수 없어 건너뛰고 세기만 한다 (late_rows).
+    """
+
+    def __init__(self, path: str, watermark: dict | None = None, include_trailing: bool = False):
+        watermark = watermark or {}
+        self.path = path
+        self.offset = watermark.get("offset", 0)
+        self.published = set(watermark.get("episodes", []))
+        self.episodes = set(self.published)
+        self.include_trailing = include_trailing
+        self.new_episodes: list[str] = []
+        self.late_rows = 0
+        self.held_back: str | None = None
+        if self.offset:
+            if os.path.getsize(path) < self.offset or tail_hash(path, self.offset) != watermark.get("tail_sha256"):
+                raise ValueError(f"{path}가 watermark 이후 append-only로 유지되지 않았습니다 — --full로 다시 빌드하세요")
+
+    def _publish(self, rows: list[dict], episode: str, end: int):
+        if episode in self.published:
+            self.late_rows += len(rows)
+        else:
+            yield from rows
+            if episode not in self.episodes:
+                self.episodes.add(episode)
+                self.new_episodes.append(episode)
+        self.offset = end
+
+    def __iter__(self):
+        rows, episode, end = [], None, self.offset
+        for row, start, line_end in iter_jsonl(self.path, self.offset):
+            if rows and row["episode_id"] != episode:
+                yield from self._publish(rows, episode, start)
+                rows = []
+            episode, end = row["episode_id"], line_end
+            rows.append(row)
+        if rows and self.include_trailing:
+            yield from self._publish(rows, episode, end)
+        elif rows:
+            self.held_back = episode
+
+    def watermark(self, previous: dict | None = None, shards: list[str] = (), rows: int = 0) -> dict:
+        previous = previous or {}
+        return {
+            "offset": self.offset,
+            "tail_sha256": tail_hash(self.path, self.offset),
+            "episodes": sorted(self.episodes),
+            "rows": previous.get("rows", 0) + rows,
+            "shards": [*previous.get("shards", []), *shards],
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+
+def _embed_image(record: dict, data_dir: str) -> tuple[dict, str]:
+    """image 상대 경로 → {"bytes", "path"} (PNG 원본 바이트). 상태: ok | missing | invalid."""
+    from PIL import Image
+
+    rel = record["image"]
+    path = os.path.join(data_dir, rel) if rel else ""
+    if not path or not os.path.isfile(path):
+        record["image"] = None
+        return record, "missing"
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+    except Exception:
+        record["image"] = None
+        return record, "invalid"
+    record["image"] = {"bytes": data, "path": os.path.basename(rel)}
+    return record, "ok"
+
+
+class ShardWriter:
+    """batch마다 row group으로 쓰고, 파일이 max_shard_size를 넘으면 닫고 on_close(path) 호출."""
+
+    def __init__(self, output_dir: str, schema, max_shard_size: int, on_close=None, prefix: str = SPLIT):
+        self.output_dir = output_dir
+        self.schema = schema
+        self.max_shard_size = max_shard_size
+        self.on_close = on_close
+        self.prefix = prefix
+        self.paths: list[str] = []
+        self._writer = None
+
+    def write(self, table) -> None:
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            path = os.path.join(self.output_dir, f"{self.prefix}-{len(self.paths):05d}.parquet")
+            self._writer = pq.ParquetWriter(path, self.schema)
+            self.paths.append(path)
+        self._writer.write_table(table)
+        if os.path.getsize(self.paths[-1]) >= self.max_shard_size:
+            self.close()
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        print(f"  [build] shard {os.path.basename(self.paths[-1])} "
+              f"({os.path.getsize(self.paths[-1]) / 1024**2:.1f}MB)")
+        if self.on_close:
+            self.on_close(self.paths[-1])
+
+
+def build_shards(rows, kind: str, data_dir: str, output_dir: str, max_shard_size: int = 500 * 1024**2,
+                 batch_size: int = 128, workers: int = 0, on_shard=None, prefix: str = SPLIT) -> dict:
+    """rows(JSONL dict iterator) → output_dir/<prefix>-00000.parquet ...
+
+    Returns: {"rows", "shards", "missing_images", "invalid_images", "bytes", "seconds"}
+    """
+    import pyarrow as pa
+
+    started = time.time()
+    schema = features(kind).arrow_schema
+    to_record = KINDS[kind][2]
+    os.makedirs(output_dir, exist_ok=True)
+    writer = ShardWriter(output_dir, schema, max_shard_size, on_close=on_shard, prefix=prefix)
+    counts = {"ok": 0, "missing": 0, "invalid": 0}
+    n_rows = 0
+    rows = iter(rows)
+    with ThreadPoolExecutor(max_workers=workers or available_cpus()) as pool:
+        while batch := list(itertools.islice(rows, batch_size)):
+            records = []
+            for record, status in pool.map(lambda r: _embed_image(to_record(r), data_dir), batch):
+                records.append(record)
+                counts[status] += 1
+            writer.write(pa.Table.from_pylist(records, schema=schema))
+            n_rows += len(records)
+        writer.close()
+
+    result = {
+        "rows": n_rows,
+        "shards": writer.paths,
+        "missing_images": counts["missing"],
+        "invalid_images": counts["invalid"],
+        "bytes": sum(os.path.getsize(p) for p in writer.paths),
+        "seconds": time.time() - started,
+    }
+    print(f"  [build] {n_rows} rows → {len(writer.paths)} shards ({result['bytes'] / 1024**2:.1f}MB) "
+          f"in {result['seconds']:.1f}s — images missing {counts['missing']}, invalid {counts['invalid']}")
+    return result
+
+
+class ShardUploader:
+    """닫힌 shard를 upload pool에서 LFS preupload, commit()에서 한 커밋으로 반영."""
+
+    def __init__(self, api, repo_id: str, workers: int = 4, revision: str = "main"):
+        self.api = api
+        self.repo_id = repo_id
+        self.revision = revision
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.operations, self.futures = [], []
+
+    def submit(self, local_path: str, path_in_repo: str = "") -> None:
+        from huggingface_hub import CommitOperationAdd
+
+        op = CommitOperationAdd(path_in_repo=path_in_repo or f"{DATA_PREFIX}/{os.path.basename(local_path)}",
+                                path_or_fileobj=local_path)
+        self.operations.append(op)
+        self.futures.append(self.pool.submit(
+            self.api.preupload_lfs_files, self.repo_id, [op], repo_type="dataset", revision=self.revision,
+        ))
+
+    def commit(self, message: str, extra_operations: list | None = None):
+        """preupload 완료를 기다린 뒤 추가/삭제 operation을 한 커밋으로."""
+        started = time.time()
+        for future in self.futures:
+            future.result()
+        self.pool.shutdown()
+        operations = self.operations + (extra_operations or [])
+        info = self.api.create_commit(self.repo_id, operations, commit_message=message,
+                                      repo_type="dataset", revision=self.revision)
+        print(f"  [upload] {len(self.operations)} shards committed (빌드 후 대기+커밋 {time.time() - started:.1f}s)")
+        return info
+
+
+def dataset_card(kind: str, rows: int, shards: int) -> str:
+    """configs만 둔 README — data/train-*.parquet을 train split으로 (이전 dataset_info 크기 검증 방지)."""
+    return (
+        "---\n"
+        "configs:\n"
+        "- config_name: default\n"
+        "  data_files:\n"
+        f"  - split: {SPLIT}\n"
+        f"    path: {DATA_PREFIX}/{SPLIT}-*\n"
+        "---\n\n"
+        f"# {kind} dataset\n\n"
+        f"{rows} rows, {shards} Parquet shards (images embedded). "
+        "Built with `python -m utils.dataset_builder`.\n"
+    )
+
+
+def remote_shards(api, repo_id: str, revision: str = "main") -> list[str]:
+    """원격 data/ 아래 parquet 경로 (repo가 없거나 비었으면 [])."""
+    try:
+        files = api.list_repo_files(repo_id, repo_type="dataset", revision=revision)
+    except Exception:
+        return []
+    return [f for f in files if f.startswith(f"{DATA_PREFIX}/") and f.endswith(".parquet")]
+
+
+def load_watermark(output_dir: str, api=None, repo_id: str = "") -> dict | None:
+    """Hub repo(업로드 시) 또는 로컬 출력 디렉터리의 watermark. 없으면 None."""
+    path = os.path.join(output_dir, WATERMARK)
+    if api is not None:
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.errors import EntryNotFoundError, RepositoryNotFoundError
+
+        try:
+            path = hf_hub_download(repo_id, WATERMARK, repo_type="dataset", token=api.token)
+        except (EntryNotFoundError, RepositoryNotFoundError):
+            return None
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dataset.jsonl → Parquet shard 스트리밍 빌드/업로드")
+    parser.add_argument("--kind", choices=sorted(KINDS), required=True)
+    parser.add_argument("--data-dir", default="", help="dataset.jsonl + images/ 디렉터리 (기본: kind별 data/ 경로)")
+    parser.add_argument("--output", default="", help="shard 출력 디렉터리 (기본: <data-dir>/parquet)")
+    parser.add_argument("--max-shard-size-mb", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=128, help="row group 크기 (피크 메모리 ≈ batch 하나)")
+    parser.add_argument("--workers", type=int, default=0, help="이미지 읽기/검증 worker 수 (0이면 CPU 수)")
+    parser.add_argument("--push", nargs="?", const="", default=None,
+                        help="HF dataset repo에 업로드 (repo 생략 시 kind별 기본 repo)")
+    parser.add_argument("--upload-workers", type=int, default=4)
+    parser.add_argument("--private", action="store_true")
+    parser.add_argument("--full", action="store_true", help="watermark를 무시하고 전체 재빌드 (이전 shard 삭제)")
+    parser.add_argument("--include-trailing", action="store_true", help="파일 끝 에피소드도 포함 (수집 종료 후)")
+    parser.add_argument("--tag", default="", help="업로드 커밋에 붙일 태그 (학습 HF_DATASET_REVISION에 사용)")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or KINDS[args.kind][0]
+    output_dir = args.output or os.path.join(data_dir, "parquet")
+    repo_id = None if args.push is None else args.push or KINDS[args.kind][1]
+    os.makedirs(output_dir, exist_ok=True)
+
+    api = uploader = None
+    if repo_id:
+        from huggingface_hub import HfApi
+
+        api = HfApi(token=os.environ.get("HF_TOKEN") or None)
+    previous = None if args.full else load_watermark(output_dir, api, repo_id)
+    if previous and previous.get("kind", args.kind) != args.kind:
+        raise SystemExit(f"watermark kind({previous['kind']})가 --kind({args.kind})와 다릅니다")
+    delta = EpisodeDelta(os.path.join(data_dir, "dataset.jsonl"), previous, include_trailing=args.include_trailing)
+    if previous:
+        print(f"  [delta] watermark: offset {previous['offset']}, {len(previous['episodes'])} episodes, "
+              f"{previous['rows']} rows")
+    else:
+        # 전체 빌드 — 이전 로컬 shard 정리
+        for name in os.listdir(output_dir):
+            if name.startswith(f"{SPLIT}-") and name.endswith(".parquet"):
+                os.remove(os.path.join(output_dir, name))
+    if api is not None:
+        api.create_repo(repo_id, repo_type="dataset", private=args.private, exist_ok=True)
+        uploader = ShardUploader(api, repo_id, workers=args.upload_workers)
+
+    # delta shard는 실행 시각으로 이름을 구분 (data/train-* 패턴은 그대로)
+    prefix = f"{SPLIT}-{time.strftime('%Y%m%d%H%M%S')}" if previous else SPLIT
+    result = build_shards(
+        delta, args.kind, data_dir, output_dir,
+        max_shard_size=args.max_shard_size_mb * 1024**2, batch_size=args.batch_size, workers=args.workers,
+        on_shard=uploader.submit if uploader else None, prefix=prefix,
+    )
+    print(f"  [delta] {len(delta.new_episodes)} new episodes"
+          + (f", held back {delta.held_back} (수집 중일 수 있음)" if delta.held_back else "")
+          + (f", late rows skipped {delta.late_rows}" if delta.late_rows else ""))
+    shards = [f"{DATA_PREFIX}/{os.path.basename(path)}" for path in result["shards"]]
+    watermark = {"kind": args.kind, **delta.watermark(previous, shards, result["rows"])}
+    if not result["rows"]:
+        print("  새 에피소드 없음 — 업로드 생략")
+        return
+    if not uploader:
+        with open(os.path.join(output_dir, WATERMARK), "w", encoding="utf-8") as f:
+            json.dump(watermark, f, ensure_ascii=False, indent=2)
+        return
+
+    from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+
+    # 전체 빌드는 로컬 JSONL이 데이터셋 전체 — 새 shard에 없는 이전 shard(push_to_hub 결과 포함)는 삭제
+    stale = [] if previous else [path for path in remote_shards(api, repo_id) if path not in shards]
+    operations = [
+        CommitOperationAdd("README.md", dataset_card(args.kind, watermark["rows"], len(watermark["shards"])).encode()),
+        CommitOperationAdd(WATERMARK, json.dumps(watermark, ensure_ascii=False, indent=2).encode()),
+        *(CommitOperationDelete(path) for path in stale),
+    ]
+    info = uploader.commit(
+        f"{'Append' if previous else 'Build'} {result['rows']} rows "
+        f"({len(delta.new_episodes)} episodes) in {len(shards)} Parquet shards", operations,
+    )
+    with open(os.path.join(output_dir, WATERMARK), "w", encoding="utf-8") as f:
+        json.dump(watermark, f, ensure_ascii=False, indent=2)
+    revision = info.oid
+    if args.tag:
+        api.create_tag(repo_id, tag=args.tag, revision=revision, repo_type="dataset")
+        revision = args.tag
+    print(f"업로드 완료: https://huggingface.co/datasets/{repo_id}"
+          + (f" (이전 shard {len(stale)}개 삭제)" if stale else ""))
+    print(f"  학습 고정: HF_DATASET_REVISION={revision}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""렌더링된 학습 데이터셋 캐시.
+
+prepare_dataset 결과(text + images)를 Arrow 샤드로 저장해 두고, 같은 입력으로
+다시 실행하면 다운로드/chat template 렌더링 없이 memory-map으로 바로 로드한다.
+
+캐시 키 = 데이터셋 revision + 모델(processor) revision + TOOLS + build_messages 버전.
+로컬(/workspace 볼륨)이 1차 캐시, Hub 캐시 repo(<dataset>-render-cache)의 render-cache-<key> 브랜치가 2차 캐시.
+캐시 repo는 데이터셋 repo와 분리한다 — 데이터셋 main에서 브랜치를 만들면 원본 parquet/이미지 shard가
+같이 딸려 와 캐시 hit마다 원본 전체를 내려받게 된다.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# 저장 포맷이 바뀌면 올린다 (기존 캐시 전부 무효화)
+CACHE_FORMAT_VERSION = 2
+# save_to_disk 결과물 — Hub 캐시에서 이 파일만 받는다
+CACHE_FILES = ["dataset_info.json", "state.json", "data-*.arrow"]
+
+
+def resolve_revision(repo_id: str, repo_type: str = "model", token: str = "", revision: str = "") -> str | None:
+    """Hub repo의 커밋 sha를 반환 (revision: 브랜치/태그/커밋, 비우면 main).
+
+    로컬 경로이거나 조회 실패 시 None — 고정한 revision이 있으면 조회 실패해도 그 값을 그대로 쓴다.
+    """
+    if os.path.isdir(repo_id):
+        return None
+    from huggingface_hub import HfApi
+
+    try:
+        return HfApi(token=token or None).repo_info(repo_id, repo_type=repo_type, revision=revision or None).sha
+    except Exception as e:
+        print(f"  [cache] revision 조회 실패 ({repo_type}: {repo_id}{'@' + revision if revision else ''}): {e}")
+        return revision or None
+
+
+def cache_key(**parts) -> str | None:
+    """캐시 키 생성. 값 중 하나라도 None이면 키를 만들 수 없으므로 None (캐시 비활성)."""
+    if any(v is None for v in parts.values()):
+        return None
+    payload = json.dumps(
+        {"format": CACHE_FORMAT_VERSION, **parts},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _hub_branch(key: str) -> str:
+    return f"render-cache-{key}"
+
+
+def hub_cache_repo(dataset_repo: str) -> str:
+    """데이터셋 repo별 렌더링 캐시 전용 dataset repo."""
+    return f"{dataset_repo}-render-cache"
+
+
+def _fetch_from_hub(path: str, hub_repo: str, key: str, token: str) -> bool:
+    from huggingface_hub import HfApi, snapshot_download
+
+    api = HfApi(token=token or None)
+    try:
+        refs = api.list_repo_refs(hub_repo, repo_type="dataset")
+    except Exception as e:
+        print(f"  [cache] Hub refs 조회 실패: {e}")
+        return False
+    branch = _hub_branch(key)
+    if branch not in {b.name for b in refs.branches}:
+        return False
+
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    snapshot_download(hub_repo, repo_type="dataset", revision=branch, local_dir=tmp, token=token or None,
+                      allow_patterns=CACHE_FILES)
+    shutil.rmtree(os.path.join(tmp, ".cache"), ignore_errors=True)
+    os.replace(tmp, path)
+    return True
+
+
+def load_cached(cache_dir: str, key: str, hub_repo: str = "", token: str = ""):
+    """캐시된 데이터셋을 memory-map으로 로드. 로컬 → Hub 브랜치 순으로 찾고, 없으면 None."""
+    from datasets import load_from_disk
+
+    path = os.path.join(cache_dir, key)
+    t0 = time.time()
+    source = "local"
+    if not os.path.isfile(os.path.join(path, "dataset_info.json")):
+        if not hub_repo:
+            print(f"  [cache] miss: {key}")
+            return None
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            if not _fetch_from_hub(path, hub_repo, key, token):
+                print(f"  [cache] miss: {key}")
+                return None
+        except Exception as e:
+            print(f"  [cache] Hub 캐시 다운로드 실패: {e}")
+            return None
+        source = f"hub:{hub_repo}@{_hub_branch(key)}"
+
+    ds = load_from_disk(path)
+    print(f"  [cache] hit ({source}): {key} — {len(ds)} rows, {time.time() - t0:.1f}s")
+    return ds
+
+
+def save_cached(ds, cache_dir: str, key: str, hub_repo: str = "", token: str = "",
+                max_shard_size: str = "500MB"):
+    """데이터셋을 Arrow 샤드로 저장하고 memory-map된 사본을 반환. 실패해도 원본으로 계속 진행."""
+    from datasets import load_from_disk
+
+    path = os.path.join(cache_dir, key)
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        shutil.rmtree(tmp, ignore_errors=True)
+        t0 = time.time()
+        ds.save_to_disk(tmp, max_shard_size=max_shard_size)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        print(f"  [cache] saved: {path} ({time.time() - t0:.1f}s)")
+    except Exception as e:
+        print(f"  [cache] 저장 실패, 캐시 없이 진행: {e}")
+        return ds
+
+    if hub_repo:
+        from huggingface_hub import HfApi
+
+        branch = _hub_branch(key)
+        try:
+            api = HfApi(token=token or None)
+            api.create_repo(hub_repo, repo_type="dataset", private=True, exist_ok=True)
+            api.create_branch(repo_id=hub_repo, repo_type="dataset", branch=branch, exist_ok=True)
+            api.upload_folder(
+                folder_path=path,
+                repo_id=hub_repo,
+                repo_type="dataset",
+                revision=branch,
+                allow_patterns=CACHE_FILES,
+                commit_message=f"Render cache {key}",
+            )
+            print(f"  [cache] pushed: {hub_repo}@{branch}")
+        except Exception as e:
+            print(f"  [cache] Hub 업로드 실패: {e}")
+
+    return load_from_disk(path)
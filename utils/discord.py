@@ -1,7 +1,16 @@
-"""Discord Webhook 유틸."""
+"""Discord Webhook 유틸.
 
+send_discord는 동기 전송(요청이 끝날 때까지 대기). 학습 루프처럼 지연이 곧 GPU 유휴인 곳에서는
+DiscordNotifier(백그라운드 스레드 + bounded queue)를 쓴다 — 진행률처럼 key가 같은 메시지는
+최신 것만 보내고(coalescing), 429는 retry_after만큼 기다렸다 재시도하며, 종료 시 flush한다.
+"""
+
+import atexit
 import os
+import threading
 import time
+from collections import OrderedDict, deque
+
 import requests
 
 from enum import Enum
@@ -20,42 +29,155 @@ DISCORD_CHANNELS = {
     DiscordChannel.ALERT: "ALERT_WEBHOOK_URL",
 }
 
-def send_discord(text: str, channel: Union[DiscordChannel, str] = DiscordChannel.SAFARI, components: list = None):
-    """
-    Discord Webhook으로 메시지 전송.
-    :param text: 전송할 메시지
-    :param channel: DiscordChannel Enum 멤버 또는 등록된 키값 (기본값: DiscordChannel.SAFARI)
-    :param components: Discord 메시지 컴포넌트 (버튼 등)
-    """
+def _resolve_url(channel: Union[DiscordChannel, str]) -> str | None:
+    # 멀티 GPU(torchrun) 학습에서는 rank 0만 보낸다 — 같은 메시지가 GPU 수만큼 가지 않도록
+    if os.environ.get("RANK", "0") != "0":
+        return None
     # Enum이 아닌 문자열로 들어온 경우 Enum으로 변환 시도
     if isinstance(channel, str):
         try:
             channel = DiscordChannel(channel)
         except ValueError:
             print(f"  [discord] error: '{channel}'은(는) 등록되지 않은 채널입니다.")
-            return
+            return None
 
     env_var = DISCORD_CHANNELS.get(channel)
     if not env_var:
-        return
+        return None
+    # URL이 설정되지 않은 경우 조용히 넘어감 (개발 환경 등)
+    return os.getenv(env_var) or None
 
-    url = os.getenv(env_var)
-    if not url:
-        # URL이 설정되지 않은 경우 조용히 넘어감 (개발 환경 등)
-        return
 
+def _payload(text: str, components: list = None) -> dict:
     # Discord 메시지 2000자 제한
     if len(text) > 2000:
         text = text[:1997] + "..."
-
     payload = {"content": text}
     if components:
         payload["components"] = components
+    return payload
+
+
+def _post(url: str, payload: dict, channel, max_retries: int = 3, timeout: float = 10):
+    """webhook POST. 429면 Discord가 알려준 retry_after(초)만큼 기다렸다 재시도."""
+    for attempt in range(max_retries + 1):
+        try:
+            resp = requests.post(url, json=payload, timeout=timeout)
+        except Exception as e:
+            print(f"  [discord:{channel}] error: {e}")
+            return
+        if resp.status_code != 429:
+            return
+        try:
+            retry_after = float(resp.json().get("retry_after", 1))
+        except ValueError:
+            retry_after = float(resp.headers.get("Retry-After", 1))
+        if attempt < max_retries:
+            time.sleep(min(retry_after, 60))
+    print(f"  [discord:{channel}] rate limited, {max_retries}회 재시도 후 포기")
+
+
+def send_discord(text: str, channel: Union[DiscordChannel, str] = DiscordChannel.SAFARI, components: list = None):
+    """
+    Discord Webhook으로 메시지 전송.
+    :param text: 전송할 메시지
+    :param channel: DiscordChannel Enum 멤버 또는 등록된 키값 (기본값: DiscordChannel.SAFARI)
+    :param components: Discord 메시지 컴포넌트 (버튼 등)
+    """
+    url = _resolve_url(channel)
+    if not url:
+        return
+    _post(url, _payload(text, components), channel)
+
+
+class DiscordNotifier:
+    """백그라운드 스레드로 Discord 메시지를 보내는 non-blocking sender.
+
+    - notify()는 큐에 넣고 바로 반환. 큐가 가득 차면 가장 오래된 메시지를 버린다.
+    - key를 주면 같은 key의 대기 중 메시지를 최신 것으로 교체 (진행률 coalescing).
+    - flush()는 큐가 빌 때까지 대기. 프로세스 종료 시 atexit으로 자동 flush.
+    """
 
-    try:
-        requests.post(url, json=payload, timeout=10)
-    except Exception as e:
-        print(f"  [discord:{channel}] error: {e}")
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._queue = deque()  # (key, channel, url, payload)
+        self._latest = OrderedDict()  # key → (channel, url, payload), 큐에는 key 자리만 둔다
+        self._cond = threading.Condition()
+        self._in_flight = False
+        self._thread = None
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="discord-notifier", daemon=True)
+            self._thread.start()
+
+    def notify(self, text: str, channel: Union[DiscordChannel, str] = DiscordChannel.SAFARI,
+               components: list = None, key: str = None):
+        url = _resolve_url(channel)
+        if not url:
+            return
+        payload = _payload(text, components)
+        with self._cond:
+            if key is not None and key in self._latest:
+                self._latest[key] = (channel, url, payload)
+                return
+            if len(self._queue) >= self.max_queue:
+                dropped = self._queue.popleft()
+                if dropped[0] is not None:
+                    self._latest.pop(dropped[0], None)
+                print("  [discord] queue full, 가장 오래된 메시지 drop")
+            if key is not None:
+                self._latest[key] = (channel, url, payload)
+                self._queue.append((key, None, None, None))
+            else:
+                self._queue.append((None, channel, url, payload))
+            self._ensure_thread()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key, channel, url, payload = self._queue.popleft()
+                if key is not None:
+                    channel, url, payload = self._latest.pop(key)
+                self._in_flight = True
+            try:
+                _post(url, payload, channel)
+            finally:
+                with self._cond:
+                    self._in_flight = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float = 30) -> bool:
+        """대기 중인 메시지를 모두 보낼 때까지 최대 timeout초 대기. 다 보냈으면 True."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    print(f"  [discord] flush timeout — 미전송 {len(self._queue)}건")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+_notifier = None
+
+
+def get_notifier() -> DiscordNotifier:
+    """프로세스 공용 DiscordNotifier (첫 호출 시 생성)."""
+    global _notifier
+    if _notifier is None:
+        _notifier = DiscordNotifier()
+    return _notifier
+
+
+def flush_discord(timeout: float = 30) -> bool:
+    """백그라운드로 보낸 메시지를 모두 전송할 때까지 대기 (Pod 종료 직전 등)."""
+    return _notifier.flush(timeout) if _notifier is not None else True
 
 
 def _format_duration(seconds: float) -> str:
@@ -67,8 +189,11 @@ def _format_duration(seconds: float) -> str:
     return f"{m:02d}:{s:02d}"
 
 
-def send_progress_notification(title: str, current_step: int, total_steps: int, start_time: float, channel: Union[DiscordChannel, str] = DiscordChannel.SAFARI):
-    """tqdm 스타일 진행률 메시지 생성 및 Discord 전송."""
+def send_progress_notification(title: str, current_step: int, total_steps: int, start_time: float, channel: Union[DiscordChannel, str] = DiscordChannel.SAFARI, background: bool = False):
+    """tqdm 스타일 진행률 메시지 생성 및 Discord 전송.
+
+    background=True면 DiscordNotifier로 보내고 바로 반환 — 같은 title의 미전송 진행률은 최신 것만 전송.
+    """
     progress_ratio = current_step / total_steps
     percentage = int(progress_ratio * 100)
 
@@ -84,4 +209,7 @@ def send_progress_notification(title: str, current_step: int, total_steps: int,
     else:
         msg = f"{percentage:3d}%|{bar}| {current_step}/{total_steps}"
 
-    send_discord(f"🔔 {title}\n{msg}", channel=channel)
+    if background:
+        get_notifier().notify(f"🔔 {title}\n{msg}", channel=channel, key=f"progress:{title}")
+    else:
+        send_discord(f"🔔 {title}\n{msg}", channel=channel)
@@ -0,0 +1,125 @@
+"""멀티 GPU data-parallel 학습 유틸 (torchrun).
+
+GPU가 여러 개 보이면 launch()가 같은 스크립트를 torchrun으로 GPU 수만큼 다시 실행한다. 각 rank는
+RANK/LOCAL_RANK/WORLD_SIZE 환경변수로 자신을 식별하고, Trainer(accelerate)가 DDP(또는 FSDP)로 감싼다.
+Prefect/Discord/Hub 업로드처럼 외부로 나가는 일은 rank 0만 한다 — 나머지 rank는 rank_zero_decorator로
+Prefect 데코레이터를 건너뛴 순수 함수로 같은 흐름을 따라간다.
+
+CUDA가 없으면 gloo backend로 동작하므로 CPU에서 NPROC_PER_NODE=2로 테스트할 수 있다.
+"""
+
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+
+
+def rank() -> int:
+    return int(os.environ.get("RANK", "0"))
+
+
+def local_rank() -> int:
+    return int(os.environ.get("LOCAL_RANK", "0"))
+
+
+def world_size() -> int:
+    return int(os.environ.get("WORLD_SIZE", "1"))
+
+
+def is_distributed() -> bool:
+    return world_size() > 1
+
+
+def is_main_process() -> bool:
+    return rank() == 0
+
+
+def launch_nproc(nproc_per_node: int = 0) -> int:
+    """torchrun으로 띄울 프로세스 수. 이미 torchrun 하위 프로세스면 1 (다시 띄우지 않음)."""
+    if "LOCAL_RANK" in os.environ:
+        return 1
+    if nproc_per_node:
+        return nproc_per_node
+    import torch
+
+    return torch.cuda.device_count() if torch.cuda.is_available() else 1
+
+
+def launch(script: str, nproc: int) -> int:
+    """script를 torchrun --standalone으로 nproc개 실행하고 종료 코드 반환."""
+    cmd = [sys.executable, "-m", "torch.distributed.run", "--standalone", f"--nproc_per_node={nproc}", script]
+    print(f"  [dist] launching {nproc} processes: {' '.join(cmd)}", flush=True)
+    return subprocess.call(cmd, env={**os.environ, "PYTHONUNBUFFERED": "1"})  # rank 로그가 바로 보이도록
+
+
+def init_distributed():
+    """torchrun 하위 프로세스면 process group 초기화 (Trainer보다 먼저 — rank 간 broadcast에 사용)."""
+    if not is_distributed():
+        return
+    import torch
+    import torch.distributed as dist
+
+    if dist.is_initialized():
+        return
+    if torch.cuda.is_available():
+        torch.cuda.set_device(local_rank())
+        dist.init_process_group("nccl")
+    else:
+        dist.init_process_group("gloo")
+    print(f"  [dist] rank {rank()}/{world_size()} ready (backend={dist.get_backend()})", flush=True)
+
+
+def barrier():
+    if is_distributed():
+        import torch.distributed as dist
+
+        dist.barrier()
+
+
+def broadcast_object(obj):
+    """rank 0의 obj를 모든 rank에 전달 (rank 0에서만 Hub를 조회한 결과 공유 등)."""
+    if not is_distributed():
+        return obj
+    import torch.distributed as dist
+
+    holder = [obj if is_main_process() else None]
+    dist.broadcast_object_list(holder, src=0)
+    return holder[0]
+
+
+def all_reduce(values: list[float], op: str = "sum") -> list[float]:
+    """rank별 값 목록을 합(sum) 또는 최댓값(max)으로 모은다."""
+    if not is_distributed():
+        return values
+    import torch
+    import torch.distributed as dist
+
+    device = torch.device("cuda", local_rank()) if torch.cuda.is_available() else torch.device("cpu")
+    tensor = torch.tensor(values, dtype=torch.float64, device=device)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM if op == "sum" else dist.ReduceOp.MAX)
+    return tensor.tolist()
+
+
+@contextmanager
+def main_process_first():
+    """rank 0이 먼저 실행(캐시 생성)하고, 나머지 rank는 그 뒤에 실행(캐시 사용)."""
+    if not is_main_process():
+        barrier()
+    yield
+    if is_main_process():
+        barrier()
+
+
+def rank_zero_decorator(decorator):
+    """rank 0에서는 decorator 그대로, 그 외 rank에서는 함수를 그대로 반환하는 데코레이터 팩토리.
+
+    예: task = rank_zero_decorator(prefect.task) → @task(name=...)가 rank 0에서만 Prefect task가 된다.
+    """
+    if is_main_process():
+        return decorator
+
+    def passthrough(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+    return passthrough
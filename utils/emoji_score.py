@@ -0,0 +1,240 @@
+"""이모티콘 인식 출력 채점 — update_notepad 내용을 ground truth와 대량 매칭 (NumPy 벡터화).
+
+웹 게임(web/server/routes/_ws/emoji-recognition.ts)의 parseNotepadResponse/validateAnswer 규칙을 따른다:
+    - 파싱: "(x,y) 색상 동물(이모지)" 줄
+    - 정답: 이모지(문자열 그대로) + 색상 일치, 위치는 ±1 허용
+    - --lenient: 이모지 variation selector(U+FE0F) 무시 + 동물 이름 fallback 정확도를 별도로 리포트
+
+라운드마다 Python 루프를 도는 대신, 모든 라운드의 예측/정답을 평탄한 배열로 만들고
+(라운드, x, y) 격자 lookup으로 한 번에 매칭한다. 10k 라운드 기준 수 초 이내.
+
+    python -m utils.emoji_score dataset.jsonl                 # 수집기 dataset.jsonl (tool_calls + visible_animals)
+    python -m utils.emoji_score preds.jsonl --pred-field prediction --output score.json
+    python -m utils.emoji_score dataset.jsonl --lenient       # 웹 규칙 정확도 + 느슨한 매칭 정확도
+"""
+
+import argparse
+import json
+import re
+
+import numpy as np
+
+# web/server/utils/emoji-recognition/constants.ts와 동일 순서
+ANIMAL_EMOJIS = ["🐯", "🐘", "🦒", "🐒", "🦓", "🦁", "🐷", "🐨"]
+ANIMAL_NAMES = ["호랑이", "코끼리", "기린", "원숭이", "얼룩말", "사자", "돼지", "코알라"]
+BG_COLORS = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", "#FFA500", "#800080"]
+COLOR_NAMES = ["빨간색", "초록색", "파란색", "노란색", "자주색", "청록색", "주황색", "보라색"]
+
+UNKNOWN = len(ANIMAL_EMOJIS)  # 파싱은 됐지만 알 수 없는 동물/색상 → confusion matrix의 마지막 열
+MISSED = UNKNOWN + 1          # 해당 위치(±1)에 예측 없음
+LENIENT_KEYS = ("accuracy", "precision", "detection", "round_accuracy", "exact_rounds")
+
+NOTEPAD_PATTERN = re.compile(r"\((\d+)\s*,\s*(\d+)\)\s*(\S+)\s+(\S+)\s*\(([^)]+)\)")
+
+_EMOJI_INDEX = {e: i for i, e in enumerate(ANIMAL_EMOJIS)}
+_NAME_INDEX = {n: i for i, n in enumerate(ANIMAL_NAMES)}
+_COLOR_INDEX = {**{c: i for i, c in enumerate(BG_COLORS)}, **{n: i for i, n in enumerate(COLOR_NAMES)}}
+# 3x3 이웃 — 정확한 위치를 먼저, 그다음 상하좌우, 대각선 순으로 매칭
+_OFFSETS = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _animal(emoji: str, name: str = "", lenient: bool = False) -> int:
+    """이모지 → 동물 index. 웹 validateAnswer처럼 이모지 문자열이 정확히 같아야 한다.
+
+    lenient면 U+FE0F를 무시하고, 이모지가 틀려도 동물 이름이 맞으면 인정 (웹 게임보다 후함).
+    """
+    if not lenient:
+        return _EMOJI_INDEX.get(emoji, UNKNOWN)
+    return _EMOJI_INDEX.get(emoji.strip().replace("\ufe0f", ""), _NAME_INDEX.get(name, UNKNOWN))
+
+
+def parse_notepads(texts: list[str], lenient: bool = False) -> dict[str, np.ndarray]:
+    """notepad 텍스트 목록 → 평탄한 예측 배열 (round, x, y, animal, color)."""
+    rows = []
+    for i, text in enumerate(texts):
+        for x, y, color, name, emoji in NOTEPAD_PATTERN.findall(text or ""):
+            rows.append((i, int(x), int(y), _animal(emoji, name, lenient), _COLOR_INDEX.get(color, UNKNOWN)))
+    return _columns(rows)
+
+
+def ground_truth_arrays(visible: list[list[dict]]) -> dict[str, np.ndarray]:
+    """라운드별 visible_animals (emoji, bgColor, viewportX, viewportY) → 평탄한 정답 배열."""
+    rows = [
+        (i, a["viewportX"], a["viewportY"], _animal(a["emoji"]), _COLOR_INDEX.get(a["bgColor"], UNKNOWN))
+        for i, animals in enumerate(visible) for a in animals
+    ]
+    return _columns(rows)
+
+
+def _columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+    data = np.array(rows, dtype=np.int64).reshape(-1, 5)
+    return {key: data[:, j] for j, key in enumerate(("round", "x", "y", "animal", "color"))}
+
+
+def match_by_position(gt: dict, pred: dict, n_rounds: int, same_label: bool = False,
+                      matched: np.ndarray | None = None) -> np.ndarray:
+    """정답마다 같은 라운드에서 위치(±1)가 맞는 예측 index를 찾는다 (없으면 -1). 예측은 한 번만 매칭.
+
+    same_label이면 동물·색상까지 같은 예측만 매칭 (웹 validateAnswer 규칙). matched를 넘기면
+    이미 매칭된 정답/예측은 건너뛰고 나머지만 이어서 매칭한다.
+    """
+    size = int(max(gt["x"].max(initial=0), gt["y"].max(initial=0), 0)) + 2
+    idx = np.flatnonzero((pred["x"] < size) & (pred["y"] < size))
+    # 같은 칸에 예측이 여럿이면 층(layer)으로 쌓는다: 칸 내 순번 = layer
+    cell = (pred["round"][idx] * size + pred["x"][idx]) * size + pred["y"][idx]
+    order = np.argsort(cell, kind="stable")
+    idx, cell = idx[order], cell[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(cell)) + 1] if len(cell) else np.zeros(0, dtype=np.int64)
+    layer = np.arange(len(cell)) - np.repeat(starts, np.diff(np.r_[starts, len(cell)]))
+    # +1: 음수 offset은 마지막 칸(-1)으로 감싸져 항상 비어 있음
+    grid = np.full((int(layer.max(initial=0)) + 1, n_rounds, size + 1, size + 1), -1, dtype=np.int64)
+    grid[layer, pred["round"][idx], pred["x"][idx], pred["y"][idx]] = idx
+
+    matched = np.full(len(gt["round"]), -1, dtype=np.int64) if matched is None else matched.copy()
+    used = np.zeros(len(pred["round"]), dtype=bool)
+    used[matched[matched >= 0]] = True
+    for (dx, dy), layer_grid in ((offset, g) for offset in _OFFSETS for g in grid):
+        todo = np.flatnonzero(matched < 0)
+        if not len(todo):
+            break
+        cand = layer_grid[gt["round"][todo], gt["x"][todo] + dx, gt["y"][todo] + dy]
+        ok = cand >= 0
+        ok[ok] = ~used[cand[ok]]
+        if same_label:
+            ok[ok] = (pred["animal"][cand[ok]] == gt["animal"][todo[ok]]) & (pred["color"][cand[ok]] == gt["color"][todo[ok]])
+        todo, cand = todo[ok], cand[ok]
+        cand, first = np.unique(cand, return_index=True)  # 한 예측에 정답 여럿 → 먼저 온 정답만
+        matched[todo[first]] = cand
+        used[cand] = True
+    return matched
+
+
+def _confusion(true: np.ndarray, predicted: np.ndarray, n: int) -> np.ndarray:
+    return np.bincount(true * (n + 2) + predicted, minlength=n * (n + 2)).reshape(n, n + 2)
+
+
+def _rate(hits: np.ndarray, groups: np.ndarray, n: int) -> np.ndarray:
+    total = np.bincount(groups, minlength=n)
+    return np.divide(np.bincount(groups, weights=hits, minlength=n), total,
+                     out=np.full(n, np.nan), where=total > 0)
+
+
+def score(predictions: list[str], visible: list[list[dict]], lenient: bool = False) -> dict:
+    """예측 notepad 텍스트와 라운드별 정답을 채점 (웹 validateAnswer 규칙).
+
+    Returns: 전체/라운드 정확도, 동물·색상·위치별 정확도, 동물·색상 confusion matrix
+    (행: 정답, 열: 예측 8종 + unknown + missed). lenient면 느슨한 동물 매칭 결과를 "lenient"에 따로 담는다.
+    """
+    gt = ground_truth_arrays(visible)
+    result = _score(parse_notepads(predictions), gt, len(predictions))
+    if lenient:
+        loose = _score(parse_notepads(predictions, lenient=True), gt, len(predictions))
+        result["lenient"] = {key: loose[key] for key in LENIENT_KEYS}
+    return result
+
+
+def _score(pred: dict, gt: dict, n_rounds: int) -> dict:
+    # 1차: 동물·색상·위치(±1) 모두 일치 → 정답. 2차: 남은 정답을 위치만으로 매칭 → confusion matrix용
+    strict = match_by_position(gt, pred, n_rounds, same_label=True)
+    correct = strict >= 0
+    matched = match_by_position(gt, pred, n_rounds, matched=strict)
+    found = matched >= 0
+    safe = np.where(found, matched, 0)
+    pred_animal = np.where(found, pred["animal"][safe] if len(pred["round"]) else 0, MISSED)
+    pred_color = np.where(found, pred["color"][safe] if len(pred["round"]) else 0, MISSED)
+
+    n_gt = np.bincount(gt["round"], minlength=n_rounds)
+    n_pred = np.bincount(pred["round"], minlength=n_rounds)
+    n_correct = np.bincount(gt["round"], weights=correct, minlength=n_rounds)
+    round_acc = np.divide(n_correct, n_gt, out=np.ones(n_rounds), where=n_gt > 0)  # 동물 없는 라운드 = 1 (웹과 동일)
+    exact = (n_correct == n_gt) & (n_pred == n_gt)
+
+    size = int(max(gt["x"].max(initial=0), gt["y"].max(initial=0))) + 1
+    position_total = np.zeros((size, size))
+    position_hits = np.zeros((size, size))
+    np.add.at(position_total, (gt["y"], gt["x"]), 1)
+    np.add.at(position_hits, (gt["y"], gt["x"]), correct)
+
+    n = len(ANIMAL_EMOJIS)
+    return {
+        "rounds": n_rounds,
+        "animals": int(len(gt["round"])),
+        "predictions": int(len(pred["round"])),
+        "accuracy": float(correct.mean()) if len(correct) else 1.0,
+        "precision": float(correct.sum() / max(len(pred["round"]), 1)),
+        "detection": float(found.mean()) if len(found) else 1.0,
+        "round_accuracy": float(round_acc.mean()) if n_rounds else 1.0,
+        "exact_rounds": float(exact.mean()) if n_rounds else 1.0,
+        "per_animal": dict(zip(ANIMAL_NAMES, _rate(correct, gt["animal"], n).tolist())),
+        "per_color": dict(zip(COLOR_NAMES, _rate(correct, gt["color"], n).tolist())),
+        "per_position": np.divide(position_hits, position_total, out=np.full((size, size), np.nan),
+                                  where=position_total > 0).tolist(),  # [y][x]
+        "animal_confusion": _confusion(gt["animal"], pred_animal, n).tolist(),
+        "color_confusion": _confusion(gt["color"], pred_color, n).tolist(),
+    }
+
+
+def load_rounds(path: str, pred_field: str = "") -> tuple[list[str], list[list[dict]]]:
+    """JSONL → (notepad 텍스트, visible_animals). pred_field가 없으면 tool_calls의 update_notepad content 사용."""
+    predictions, visible = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if pred_field:
+                text = row.get(pred_field) or ""
+            else:
+                text = next((tc["args"].get("content", "") for tc in row.get("tool_calls") or []
+                             if tc.get("name") == "update_notepad"), "")
+            predictions.append(text)
+            visible.append(row["visible_animals"])
+    return predictions, visible
+
+
+def _print_confusion(title: str, labels: list[str], matrix: list[list[int]]):
+    cols = [label[:3] for label in labels] + ["unk", "miss"]
+    print(f"\n  {title} (행: 정답, 열: 예측)")
+    print("  " + " " * 7 + "".join(f"{c:>6}" for c in cols))
+    for label, row in zip(labels, matrix):
+        print(f"  {label:<6} " + "".join(f"{v:>6}" for v in row))
+
+
+def print_report(result: dict):
+    print(f"  rounds={result['rounds']}  animals={result['animals']}  predictions={result['predictions']}")
+    print(f"  accuracy {result['accuracy']:.1%} | precision {result['precision']:.1%} | detection {result['detection']:.1%}"
+          f" | round acc {result['round_accuracy']:.1%} | exact rounds {result['exact_rounds']:.1%}")
+    print("\n  동물별: " + ", ".join(f"{k} {v:.0%}" for k, v in result["per_animal"].items() if v == v))
+    print("  색상별: " + ", ".join(f"{k} {v:.0%}" for k, v in result["per_color"].items() if v == v))
+    print("\n  위치별 정확도 (행: y, 열: x)")
+    for y, row in enumerate(result["per_position"]):
+        print(f"  {y:>2} " + " ".join("  . " if v != v else f"{v:>4.0%}" for v in row))
+    if "lenient" in result:
+        loose = result["lenient"]
+        print(f"  lenient (U+FE0F 무시 + 이름 fallback, 웹 게임과 다름): accuracy {loose['accuracy']:.1%}"
+              f" | precision {loose['precision']:.1%} | round acc {loose['round_accuracy']:.1%}"
+              f" | exact rounds {loose['exact_rounds']:.1%}")
+    _print_confusion("동물 confusion", ANIMAL_NAMES, result["animal_confusion"])
+    _print_confusion("색상 confusion", COLOR_NAMES, result["color_confusion"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이모티콘 인식 notepad 출력 채점")
+    parser.add_argument("path", help="JSONL (visible_animals + tool_calls 또는 --pred-field)")
+    parser.add_argument("--pred-field", default="", help="예측 notepad 텍스트 필드 (기본: tool_calls의 update_notepad)")
+    parser.add_argument("--output", default="", help="결과 JSON 저장 경로")
+    parser.add_argument("--lenient", action="store_true",
+                        help="U+FE0F 무시 + 동물 이름 fallback 정확도를 별도로 리포트 (기본 정확도는 웹 규칙 그대로)")
+    args = parser.parse_args()
+
+    predictions, visible = load_rounds(args.path, args.pred_field)
+    result = score(predictions, visible, lenient=args.lenient)
+    print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""에피소드 단위 멀티턴 샘플 구성.
+
+턴별 row(episode_id, turn)를 에피소드로 묶고, 토큰 예산 안에서 연속된 턴들을 하나의
+window로 자른다. window마다 system prompt + TOOLS prefix를 한 번만 인코딩하므로
+턴마다 prefix를 반복하던 만큼 학습 토큰이 줄어든다.
+"""
+
+import numpy as np
+
+
+def episode_windows(episode_ids, turns, row_tokens, prefix_tokens, budget: int) -> list[list[int]]:
+    """에피소드별로 턴 순서대로 row index를 모아 budget 이하 window로 분할.
+
+    window 토큰 수 ≈ prefix + Σ(row 토큰 - row prefix). 턴 하나가 예산을 넘으면 단독 window.
+    """
+    episode_codes = np.unique(np.asarray(episode_ids), return_inverse=True)[1]
+    row_tokens = np.asarray(row_tokens, dtype=np.int64)
+    prefix_tokens = np.asarray(prefix_tokens, dtype=np.int64)
+    order = np.lexsort((np.asarray(turns), episode_codes))
+
+    windows: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    current_episode = None
+    for i in order:
+        body = int(row_tokens[i] - prefix_tokens[i])
+        if current and (episode_codes[i] != current_episode or current_tokens + body > budget):
+            windows.append(current)
+            current = []
+        if not current:
+            current_tokens = int(prefix_tokens[i])
+            current_episode = episode_codes[i]
+        current.append(int(i))
+        current_tokens += body
+    if current:
+        windows.append(current)
+    return windows
+
+
+def print_window_report(turn_tokens, window_tokens, n_episodes: int) -> dict:
+    """턴 단위 대비 window 단위 총 학습 토큰 감소량."""
+    before = int(np.sum(turn_tokens))
+    after = int(np.sum(window_tokens))
+    report = {
+        "episodes": n_episodes,
+        "turns": len(turn_tokens),
+        "windows": len(window_tokens),
+        "tokens_before": before,
+        "tokens_after": after,
+        "reduction": 1 - after / before if before else 0.0,
+    }
+    print(f"  episode windows: {report['episodes']} episodes, {report['turns']} turns → "
+          f"{report['windows']} windows")
+    print(f"  training tokens: {before:,} → {after:,} ({report['reduction']:.1%} 감소)")
+    return report
@@ -0,0 +1,82 @@
+"""Hub 폴더 업로드 — 원격과 내용이 같은 파일은 건너뛰고 바뀐 파일만 커밋.
+
+원격 파일 해시(LFS는 sha256, 일반 파일은 git blob sha1)를 로컬 파일과 비교한다.
+체크포인트 동기화나 재실행으로 이미 올라간 파일은 다시 전송하지 않는다.
+"""
+
+import fnmatch
+import hashlib
+import os
+
+
+def _git_blob_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    h.update(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _remote_hashes(api, repo_id: str, revision: str, repo_type: str) -> dict[str, tuple[str, str]]:
+    """path → ("sha256" | "sha1", hash)."""
+    from huggingface_hub.hf_api import RepoFile
+
+    hashes = {}
+    try:
+        entries = api.list_repo_tree(repo_id, revision=revision, repo_type=repo_type, recursive=True)
+        for entry in entries:
+            if not isinstance(entry, RepoFile):
+                continue
+            if entry.lfs is not None:
+                hashes[entry.path] = ("sha256", entry.lfs.sha256)
+            else:
+                hashes[entry.path] = ("sha1", entry.blob_id)
+    except Exception as e:
+        print(f"  [upload] 원격 파일 목록 조회 실패, 전체 업로드: {e}")
+    return hashes
+
+
+def changed_files(api, folder: str, repo_id: str, revision: str = "main", repo_type: str = "model",
+                  ignore_patterns: list[str] | None = None) -> tuple[list[str], int]:
+    """(원격과 다른 로컬 파일 상대경로 목록, 변경 없는 파일 수)."""
+    remote = _remote_hashes(api, repo_id, revision, repo_type)
+    changed, unchanged = [], 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, folder).replace(os.sep, "/")
+            if any(fnmatch.fnmatch(rel, p) for p in ignore_patterns or []):
+                continue
+            kind, expected = remote.get(rel, (None, None))
+            actual = _sha256(path) if kind == "sha256" else _git_blob_sha1(path) if kind == "sha1" else None
+            if expected is not None and actual == expected:
+                unchanged += 1
+            else:
+                changed.append(rel)
+    return changed, unchanged
+
+
+def upload_changed(api, folder: str, repo_id: str, revision: str = "main", repo_type: str = "model",
+                   ignore_patterns: list[str] | None = None, commit_message: str = "Upload folder"):
+    """바뀐 파일만 한 커밋으로 업로드. 바뀐 파일이 없으면 커밋하지 않는다."""
+    changed, unchanged = changed_files(api, folder, repo_id, revision, repo_type, ignore_patterns)
+    print(f"  [upload] {len(changed)} changed, {unchanged} unchanged files")
+    if not changed:
+        return None
+    return api.upload_folder(
+        folder_path=folder,
+        repo_id=repo_id,
+        repo_type=repo_type,
+        revision=revision,
+        allow_patterns=changed,
+        commit_message=commit_message,
+    )
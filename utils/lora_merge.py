@@ -0,0 +1,168 @@
+"""LoRA 어댑터를 베이스 가중치에 스트리밍 병합 — 전체 모델을 메모리에 올리지 않는다.
+
+notebook/merge_emoji_lora.ipynb는 베이스 모델 전체를 CPU RAM에 올리고 PeftModel.merge_and_unload()
+후 저장하기 때문에 모델 크기의 몇 배 메모리가 필요하다. 여기서는:
+    1. 베이스 safetensors 헤더(shape/dtype)만 읽어 출력 shard 구성을 먼저 정하고
+    2. safe_open(mmap)으로 텐서를 하나씩 읽어, 어댑터가 타겟한 가중치에만 W += scale · B @ A를 적용
+    3. 출력 shard가 차면 바로 쓰고 메모리에서 내린다
+피크 메모리 ≈ 출력 shard 하나 (max_shard_size).
+
+어댑터를 여러 개 주면 순서대로 누적한다 (stages 모드: stage 1 어댑터 병합 모델 위에서 stage 2를 학습).
+
+    python -m utils.lora_merge --base Qwen/Qwen3-VL-2B-Thinking \\
+        --adapter adwel94/vision-emoji-recognition-lora --output ./merged_model \\
+        --push adwel94/Qwen3-VL-2B-Emoji-Base
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import time
+
+from utils.shard_stream import copy_model_files, tensor_index, write_shards
+
+ADAPTER_CONFIG = "adapter_config.json"
+ADAPTER_WEIGHTS = "adapter_model.safetensors"
+_PEFT_PREFIX = "base_model.model."
+
+
+def _scale(config: dict, module: str) -> float:
+    """PEFT LoraLayer와 같은 scaling — rank_pattern/alpha_pattern은 모듈 이름 끝부분 매칭."""
+    def pattern_value(patterns: dict, default):
+        for key, value in (patterns or {}).items():
+            if re.match(rf"(.*\.)?{key}$", module):
+                return value
+        return default
+
+    r = pattern_value(config.get("rank_pattern"), config["r"])
+    alpha = pattern_value(config.get("alpha_pattern"), config["lora_alpha"])
+    return alpha / math.sqrt(r) if config.get("use_rslora") else alpha / r
+
+
+class _Adapter:
+    """어댑터 하나: 모듈별 (lora_A, lora_B 키, scale) + 통째로 교체할 텐서 (modules_to_save 등)."""
+
+    def __init__(self, path: str):
+        from safetensors import safe_open
+
+        with open(os.path.join(path, ADAPTER_CONFIG), encoding="utf-8") as f:
+            self.config = json.load(f)
+        if self.config.get("use_dora"):
+            raise ValueError(f"DoRA 어댑터는 스트리밍 병합을 지원하지 않습니다: {path}")
+        self.path = path
+        self.file = safe_open(os.path.join(path, ADAPTER_WEIGHTS), framework="pt")
+        self.lora, self.replace = {}, {}
+        for key in self.file.keys():
+            name = key.removeprefix(_PEFT_PREFIX)
+            match = re.match(r"(.+)\.lora_(A|B)\.weight$", name)
+            if match:
+                module, part = match.groups()
+                self.lora.setdefault(module, {})[part] = key
+            elif "lora_embedding" in name or "lora_magnitude" in name:
+                raise ValueError(f"지원하지 않는 어댑터 텐서: {key}")
+            else:
+                self.replace[name] = key
+        for module, parts in self.lora.items():
+            if set(parts) != {"A", "B"}:
+                raise ValueError(f"{path}: {module}의 lora_A/lora_B 쌍이 맞지 않습니다")
+
+
+def _resolve_key(name: str, base_keys: set[str]) -> str:
+    """어댑터 모듈 이름 → 베이스 체크포인트 키. 체크포인트 prefix 차이(model. 유무)는 접미사 일치로 흡수."""
+    for candidate in (name, name.removeprefix("model."), f"model.{name}"):
+        if candidate in base_keys:
+            return candidate
+    tail = name.split(".", 1)[-1]
+    matches = [key for key in base_keys if key == tail or key.endswith(f".{tail}")]
+    if len(matches) == 1:
+        return matches[0]
+    raise KeyError(f"베이스 체크포인트에서 {name}을(를) 찾을 수 없습니다 (후보 {len(matches)}개)")
+
+
+def merge_lora(base_dir: str, adapter_dirs: list[str], output_dir: str, max_shard_size: int = 2 * 1024**3) -> dict:
+    """base_dir(safetensors) + 어댑터들(순서대로) → output_dir에 병합 가중치 + 베이스 설정 파일.
+
+    Returns: {"merged", "replaced", "shards", "total_size", "seconds"}
+    """
+    started = time.time()
+    adapters = [_Adapter(path) for path in adapter_dirs]
+    tensors = tensor_index(base_dir)
+    base_keys = set(tensors)
+
+    # 베이스 키 → 적용할 (어댑터, lora_A 키, lora_B 키, scale, fan_in_fan_out) / 교체 텐서
+    deltas, replace = {}, {}
+    for adapter in adapters:
+        fan_in_fan_out = adapter.config.get("fan_in_fan_out", False)
+        for module, parts in adapter.lora.items():
+            key = _resolve_key(f"{module}.weight", base_keys)
+            deltas.setdefault(key, []).append(
+                (adapter, parts["A"], parts["B"], _scale(adapter.config, module), fan_in_fan_out))
+        for name, adapter_key in adapter.replace.items():
+            replace[_resolve_key(name, base_keys)] = (adapter, adapter_key)
+
+    def transform(key, weight):
+        if key in replace:
+            adapter, adapter_key = replace[key]
+            weight = adapter.file.get_tensor(adapter_key).to(weight.dtype)
+        if key in deltas:
+            merged = weight.float()
+            for adapter, a_key, b_key, scale, fan_in_fan_out in deltas[key]:
+                delta = adapter.file.get_tensor(b_key).float() @ adapter.file.get_tensor(a_key).float()
+                merged += (delta.T if fan_in_fan_out else delta) * scale
+            weight = merged.to(weight.dtype)
+        return {key: weight}
+
+    # 병합해도 shape/dtype은 그대로 — 출력 크기 = 입력 크기
+    written = write_shards(base_dir, output_dir, tensors, transform,
+                           {key: info["nbytes"] for key, info in tensors.items()}, max_shard_size, label="merge")
+    copy_model_files(base_dir, output_dir)
+
+    result = {
+        "merged": sum(len(v) for v in deltas.values()),
+        "replaced": len(replace),
+        **written,
+        "seconds": time.time() - started,
+    }
+    print(f"  [merge] {result['merged']} LoRA deltas, {result['replaced']} replaced tensors → "
+          f"{result['shards']} shards ({result['total_size'] / 1024**3:.2f}GB) in {result['seconds']:.1f}s")
+    return result
+
+
+def local_snapshot(path_or_repo: str, token: str, allow_patterns: list[str] | None = None, revision: str = "") -> str:
+    """로컬 디렉터리면 그대로, HF repo id면 snapshot_download한 로컬 경로."""
+    if os.path.isdir(path_or_repo):
+        return path_or_repo
+    from huggingface_hub import snapshot_download
+
+    return snapshot_download(path_or_repo, revision=revision or None, token=token or None,
+                             allow_patterns=allow_patterns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LoRA 어댑터 스트리밍 병합")
+    parser.add_argument("--base", required=True, help="베이스 모델 경로 또는 HF repo")
+    parser.add_argument("--adapter", action="append", required=True, help="어댑터 경로 또는 HF repo (여러 개면 순서대로)")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--max-shard-size-mb", type=int, default=2048)
+    parser.add_argument("--push", default="", help="병합 결과를 올릴 HF repo")
+    args = parser.parse_args()
+
+    token = os.environ.get("HF_TOKEN", "")
+    base_dir = local_snapshot(args.base, token)
+    adapter_dirs = [local_snapshot(a, token, [ADAPTER_CONFIG, ADAPTER_WEIGHTS]) for a in args.adapter]
+    merge_lora(base_dir, adapter_dirs, args.output, args.max_shard_size_mb * 1024**2)
+
+    if args.push:
+        from huggingface_hub import HfApi
+
+        api = HfApi(token=token or None)
+        api.create_repo(args.push, exist_ok=True)
+        api.upload_folder(folder_path=args.output, repo_id=args.push,
+                          commit_message=f"Merge {', '.join(args.adapter)} into {args.base}")
+        print(f"업로드 완료: https://huggingface.co/{args.push}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""모델 가중치 캐시.
+
+Pod마다 베이스 모델을 Hub에서 새로 받지 않도록 <cache_dir>/<model_id>/<sha>/에 snapshot을 보관한다.
+cache_dir을 RunPod network volume(/workspace)에 두면 Pod이 바뀌어도 재사용되고, 이미지 빌드 시
+BAKE_MODEL_ID로 받아 둔 레이어(/opt/models)는 읽기 전용 캐시로 먼저 확인한다.
+
+캐시 키 = model_id + 커밋 sha. 완료된 snapshot에는 .complete 마커(다운로드 소요 시간 기록)를 두고,
+hit이면 그 시간을 절약한 시간으로 보고한다. miss는 파일 병렬 + hf_xet chunk 병렬 다운로드로 채운다.
+
+사용 예 (이미지 빌드 시 미리 받기):
+    python -m utils.model_cache Qwen/Qwen3-VL-2B-Thinking /opt/models
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+BAKED_MODEL_DIR = "/opt/models"
+_MARKER = ".complete"
+
+
+def _model_dir(cache_dir: str, model_id: str) -> str:
+    return os.path.join(cache_dir, model_id.replace("/", "--"))
+
+
+def _resolve_sha(model_id: str, revision: str, token: str) -> str | None:
+    from huggingface_hub import HfApi
+
+    try:
+        return HfApi(token=token or None).model_info(model_id, revision=revision or None).sha
+    except Exception as e:
+        print(f"  [model-cache] revision 조회 실패 ({model_id}@{revision or 'main'}): {e}")
+        return None
+
+
+def _read_marker(path: str) -> dict | None:
+    try:
+        with open(os.path.join(path, _MARKER), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _latest_cached(cache_dirs: list[str], model_id: str, revision: str = "") -> str | None:
+    """revision 조회가 안 될 때(오프라인 등) 요청한 revision으로 받은 snapshot 중 가장 최근 것.
+
+    마커의 revision(브랜치/태그, 비우면 main) 또는 sha가 요청과 같아야 한다 — 다른 revision의
+    snapshot으로 학습하면 processor/stages.json 기록과 실제 베이스가 어긋난다.
+    """
+    requested = revision or "main"
+    candidates = []
+    for cache_dir in cache_dirs:
+        root = _model_dir(cache_dir, model_id)
+        if not os.path.isdir(root):
+            continue
+        for sha in os.listdir(root):
+            marker = _read_marker(os.path.join(root, sha))
+            if marker and requested in (marker.get("revision"), sha):
+                candidates.append((marker.get("completed_at", 0), os.path.join(root, sha)))
+    return max(candidates)[1] if candidates else None
+
+
+def _download(model_id: str, sha: str, path: str, token: str, max_workers: int, revision: str = "") -> dict:
+    from huggingface_hub import snapshot_download
+
+    os.environ.setdefault("HF_XET_HIGH_PERFORMANCE", "1")  # hf_xet: chunk 동시 다운로드 수 상향
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    started = time.time()
+    snapshot_download(model_id, revision=sha, local_dir=tmp, token=token or None, max_workers=max_workers)
+    shutil.rmtree(os.path.join(tmp, ".cache"), ignore_errors=True)
+    seconds = time.time() - started
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(tmp) for f in files)
+    marker = {"model_id": model_id, "sha": sha, "revision": revision or "main", "bytes": size,
+              "download_seconds": round(seconds, 1), "completed_at": time.time()}
+    with open(os.path.join(tmp, _MARKER), "w", encoding="utf-8") as f:
+        json.dump(marker, f)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # 같은 볼륨을 쓰는 다른 Pod이 먼저 채웠다 — 그쪽 snapshot 사용
+        shutil.rmtree(tmp, ignore_errors=True)
+    return marker
+
+
+def resolve_model(model_id: str, cache_dir: str, revision: str = "", token: str = "",
+                  max_workers: int = 16) -> tuple[str, dict]:
+    """model_id의 로컬 snapshot 경로와 캐시 정보(hit, seconds_saved 등)를 반환.
+
+    model_id가 로컬 디렉터리거나 cache_dir이 비어 있으면 from_pretrained에 그대로 넘길 값을 반환한다.
+    """
+    if os.path.isdir(model_id) or not cache_dir:
+        return model_id, {"hit": None}
+    cache_dirs = [d for d in (BAKED_MODEL_DIR, cache_dir) if d]
+
+    sha = _resolve_sha(model_id, revision, token)
+    if sha is None:
+        cached = _latest_cached(cache_dirs, model_id, revision)
+        if cached is None:
+            return model_id, {"hit": None}
+        print(f"  [model-cache] revision 미확인 — {revision or 'main'}의 최근 snapshot 사용: {cached}")
+        return cached, {"hit": True, "sha": os.path.basename(cached),
+                        "seconds_saved": _read_marker(cached).get("download_seconds", 0.0)}
+
+    for d in cache_dirs:
+        path = os.path.join(_model_dir(d, model_id), sha)
+        marker = _read_marker(path)
+        if marker:
+            saved = marker.get("download_seconds", 0.0)
+            print(f"  [model-cache] hit {model_id}@{sha[:8]} ({path}) — 다운로드 {saved:.0f}s 절약")
+            return path, {"hit": True, "sha": sha, "seconds_saved": saved, "path": path}
+
+    path = os.path.join(_model_dir(cache_dir, model_id), sha)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    print(f"  [model-cache] miss {model_id}@{sha[:8]} — downloading to {path} (max_workers={max_workers})")
+    marker = _download(model_id, sha, path, token, max_workers, revision)
+    print(f"  [model-cache] downloaded {marker['bytes'] / 1e9:.2f}GB in {marker['download_seconds']:.0f}s "
+          f"({marker['bytes'] / 1e6 / max(marker['download_seconds'], 1e-6):.0f}MB/s)")
+    return path, {"hit": False, "sha": sha, "download_seconds": marker["download_seconds"], "path": path}
+
+
+if __name__ == "__main__":
+    resolve_model(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else BAKED_MODEL_DIR,
+                  token=os.environ.get("HF_TOKEN", ""))
@@ -0,0 +1,162 @@
+"""이미지+텍스트 샘플 sequence packing.
+
+여러 샘플을 max_seq_length 토큰 예산 안에 bin-packing(best-fit decreasing)하고,
+collator는 한 batch의 bin들을 padding 없이 한 줄로 이어 붙인다.
+
+- attention 경계: 샘플마다 text position id를 0부터 다시 시작 → attention_mask 없이
+  position_ids로 packed sequence를 인식(flash-attention varlen / sdpa block-diagonal mask).
+- 이미지 위치: 샘플별로 get_rope_index로 M-RoPE(3D) position을 계산해 이어 붙이고,
+  pixel_values/image_grid_thw는 image token 순서와 같은 순서로 concat.
+- 샘플 경계를 넘는 next-token 예측은 각 샘플 첫 토큰 label을 -100으로 막는다.
+"""
+
+import bisect
+import inspect
+
+import numpy as np
+
+from utils.vision_cache import CachedVisionCollator
+
+
+def token_lengths(ds, processor, num_proc: int = 1, batch_size: int = 32) -> np.ndarray:
+    """vision cache가 적용된 데이터셋(text, image_grids)의 샘플별 토큰 수(이미지 토큰 포함)."""
+    tokenizer = processor.tokenizer
+    merge_length = processor.image_processor.merge_size ** 2
+
+    def count_batch(batch):
+        text_lengths = [len(ids) for ids in tokenizer(batch["text"], add_special_tokens=False)["input_ids"]]
+        # placeholder 1개가 grid 크기만큼 펼쳐지므로 (이미지 토큰 수 - 1)을 더한다
+        image_extra = [
+            sum(int(np.prod(grid)) // merge_length - 1 for grid in grids)
+            for grids in batch["image_grids"]
+        ]
+        return {"n_tokens": [t + i for t, i in zip(text_lengths, image_extra)]}
+
+    counted = ds.map(
+        count_batch,
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc if num_proc > 1 else None,
+        remove_columns=ds.column_names,
+        desc="Counting tokens",
+    )
+    return np.asarray(counted["n_tokens"], dtype=np.int64)
+
+
+def pack_bins(lengths: np.ndarray, budget: int) -> list[list[int]]:
+    """best-fit decreasing. 예산보다 긴 샘플은 단독 bin이 된다 (pack_dataset은 미리 제거)."""
+    bins: list[list[int]] = []
+    remaining: list[tuple[int, int]] = []  # (남은 용량, bin index) 오름차순
+    for i in np.argsort(-lengths, kind="stable"):
+        n = int(lengths[i])
+        pos = bisect.bisect_left(remaining, (n, -1))
+        if pos < len(remaining):
+            capacity, b = remaining.pop(pos)
+            bins[b].append(int(i))
+            capacity -= n
+        else:
+            b = len(bins)
+            bins.append([int(i)])
+            capacity = budget - n
+        if capacity > 0:
+            bisect.insort(remaining, (capacity, b))
+    return bins
+
+
+def padding_stats(lengths: np.ndarray, bins: list[list[int]], budget: int, batch_size: int, seed: int) -> dict:
+    """packing 전(랜덤 순서 batch를 최장 샘플에 맞춰 padding) / 후 padding 비율."""
+    clipped = np.minimum(lengths, budget)
+    order = np.random.default_rng(seed).permutation(len(clipped))
+    padded = 0
+    for start in range(0, len(order), batch_size):
+        batch = clipped[order[start:start + batch_size]]
+        padded += int(batch.max()) * len(batch)
+    real = int(clipped.sum())
+    return {
+        "samples": len(lengths),
+        "bins": len(bins),
+        "tokens": real,
+        "padding_ratio_before": 1 - real / padded if padded else 0.0,
+        # 한 batch의 bin들을 padding 없이 이어 붙이므로 packing 후 pad 토큰은 없다
+        "padding_ratio_after": 0.0,
+        "bin_fill": real / (len(bins) * budget) if bins else 0.0,
+        "steps_per_epoch_before": -(-len(lengths) // batch_size),
+        "steps_per_epoch_after": -(-len(bins) // batch_size),
+    }
+
+
+def pack_dataset(ds, processor, budget: int, batch_size: int, seed: int = 42, num_proc: int = 1):
+    """bin마다 원본 row index 목록을 담은 데이터셋과 통계를 반환."""
+    from datasets import Dataset
+
+    if "image_grids" not in ds.column_names:
+        raise ValueError("packing은 vision cache(VISION_CACHE_DIR)가 적용된 데이터셋이 필요합니다")
+
+    if "tokens_total" in ds.column_names:
+        lengths = np.asarray(ds["tokens_total"], dtype=np.int64)
+    else:
+        lengths = token_lengths(ds, processor, num_proc=num_proc)
+    # 예산 초과 샘플은 자르면 image token/pixel_values 개수가 어긋나므로 (OVERLENGTH_POLICY=flag) 제거
+    keep = np.flatnonzero(lengths <= budget)
+    if len(keep) < len(lengths):
+        print(f"  packing: dropped {len(lengths) - len(keep)} samples over budget ({budget} tokens)")
+    bins = [[int(keep[i]) for i in b] for b in pack_bins(lengths[keep], budget)]
+    lengths = lengths[keep]
+    np.random.default_rng(seed).shuffle(bins)
+    stats = padding_stats(lengths, bins, budget, batch_size, seed)
+    print(f"  packing: {stats['samples']} samples → {stats['bins']} bins (budget={budget}, "
+          f"fill {stats['bin_fill']:.1%})")
+    print(f"  padding ratio: {stats['padding_ratio_before']:.1%} → {stats['padding_ratio_after']:.1%}, "
+          f"steps/epoch: {stats['steps_per_epoch_before']} → {stats['steps_per_epoch_after']}")
+    return Dataset.from_dict({"indices": bins}), stats
+
+
+class PackedVisionCollator(CachedVisionCollator):
+    """bin(원본 row index 목록) batch를 padding 없는 한 줄의 packed sequence로 변환."""
+
+    def __init__(self, processor, cache, base_ds, get_rope_index, max_length: int | None = None):
+        super().__init__(processor, cache, max_length=max_length)
+        self.base_ds = base_ds
+        self.get_rope_index = get_rope_index
+        self._rope_takes_token_types = "mm_token_type_ids" in inspect.signature(get_rope_index).parameters
+
+    def _positions(self, input_ids, grid_thw):
+        import torch
+
+        kwargs = {"image_grid_thw": grid_thw, "attention_mask": torch.ones_like(input_ids)}
+        if self._rope_takes_token_types:
+            kwargs["mm_token_type_ids"] = self.token_type_ids(input_ids)
+        rope_positions, _ = self.get_rope_index(input_ids, **kwargs)  # (3, 1, L)
+        text_positions = torch.arange(input_ids.shape[1]).view(1, 1, -1)
+        return torch.cat([text_positions, rope_positions], dim=0)  # (4, 1, L) — 0번은 경계 인식용
+
+    def __call__(self, examples: list[dict]) -> dict:
+        import torch
+
+        input_ids, positions, labels, pixel_values, grids = [], [], [], [], []
+        for example in examples:
+            rows = self.base_ds[example["indices"]]
+            for text, keys, sample_grids in zip(rows["text"], rows["image_keys"], rows["image_grids"]):
+                ids = torch.tensor([self.truncate(self.tokenizer(
+                    self.expand_text(text, sample_grids), add_special_tokens=False,
+                )["input_ids"])])
+                grid_thw = torch.tensor(sample_grids, dtype=torch.long) if sample_grids else None
+                sample_labels = ids.clone()
+                sample_labels[0, 0] = -100
+                input_ids.append(ids)
+                positions.append(self._positions(ids, grid_thw))
+                labels.append(sample_labels)
+                pixel_values.extend(self.cache.load(key) for key in keys)
+                grids.extend(sample_grids)
+
+        batch = {
+            "input_ids": torch.cat(input_ids, dim=1),
+            "position_ids": torch.cat(positions, dim=2),
+            "labels": torch.cat(labels, dim=1),
+        }
+        if self.emit_token_types:
+            batch["mm_token_type_ids"] = self.token_type_ids(batch["input_ids"])
+        if pixel_values:
+            batch["pixel_values"] = torch.from_numpy(np.concatenate(pixel_values))
+            batch["image_grid_thw"] = torch.tensor(grids, dtype=torch.long)
+        return batch
@@ -0,0 +1,243 @@
+"""병합 모델 → FP8/INT8 per-channel 가중치 export (vLLM compressed-tensors 형식) + logit 오차 리포트.
+
+RunPod에서 서빙하는 qwen/qwen3-vl-4b-thinking-fp8과 같은 방식(W8A8, 가중치 per-channel 정적 scale,
+activation per-token 동적)으로 우리 fine-tune도 서빙할 수 있게 한다. lora_merge와 같이 safetensors를
+텐서 단위로 스트리밍 변환하므로 CPU에서 모델 전체를 올리지 않고 돌아간다.
+
+출력 레이아웃 (llm-compressor가 만드는 것과 동일):
+    <module>.weight        float8_e4m3fn | int8   [out, in]
+    <module>.weight_scale  float32                [out, 1]
+    config.json            quantization_config (quant_method=compressed-tensors)
+양자화 대상은 언어 모델의 Linear(*_proj) — lm_head, 비전 인코더, embedding, norm은 원래 dtype 유지.
+
+    python -m utils.quantize_export --model ./merged_model --output ./merged_model-fp8 --scheme fp8
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from utils.shard_stream import copy_model_files, tensor_index, write_shards
+
+SCHEMES = ("fp8", "int8")
+# vLLM/llm-compressor 모듈 이름 기준 (Qwen-VL 레시피와 같은 ignore)
+IGNORE = ["lm_head", "re:visual.*", "re:model.visual.*"]
+_LINEAR_WEIGHT = re.compile(r"_proj\.weight$")
+_FP8_MAX = 448.0  # float8_e4m3fn 최대값
+
+
+def is_target(name: str) -> bool:
+    """양자화 대상 Linear인지 (체크포인트 키 '<module>.weight' 또는 모듈 이름)."""
+    module = name.removesuffix(".weight")
+    for pattern in IGNORE:
+        if pattern.startswith("re:"):
+            if re.match(pattern[3:], module):
+                return False
+        elif module == pattern or module.endswith(f".{pattern}"):
+            return False
+    return bool(_LINEAR_WEIGHT.search(f"{module}.weight"))
+
+
+def quantize_weight(weight, scheme: str):
+    """[out, in] 가중치 → (양자화 가중치, per-channel scale [out, 1] float32). 대칭 양자화."""
+    import torch
+
+    w = weight.float()
+    amax = w.abs().amax(dim=1, keepdim=True).clamp(min=1e-12)
+    if scheme == "fp8":
+        scale = amax / _FP8_MAX
+        q = (w / scale).clamp(-_FP8_MAX, _FP8_MAX).to(torch.float8_e4m3fn)
+    else:
+        scale = amax / 127.0
+        q = (w / scale).round().clamp(-128, 127).to(torch.int8)
+    return q, scale
+
+
+def fake_quantize(weight, scheme: str):
+    """quantize → dequantize (원래 dtype). export된 가중치가 서빙 시 쓰는 값과 같다."""
+    q, scale = quantize_weight(weight, scheme)
+    return (q.float() * scale).to(weight.dtype)
+
+
+def fake_quantize_activation(x, scheme: str):
+    """서빙 시 activation 동적 per-token 양자화 흉내 (마지막 차원 기준)."""
+    import torch
+
+    xf = x.float()
+    amax = xf.abs().amax(dim=-1, keepdim=True).clamp(min=1e-12)
+    if scheme == "fp8":
+        scale = amax / _FP8_MAX
+        q = (xf / scale).clamp(-_FP8_MAX, _FP8_MAX).to(torch.float8_e4m3fn).float()
+    else:
+        scale = amax / 127.0
+        q = (xf / scale).round().clamp(-128, 127)
+    return (q * scale).to(x.dtype)
+
+
+def quantization_config(scheme: str) -> dict:
+    num_type = "float" if scheme == "fp8" else "int"
+    return {
+        "quant_method": "compressed-tensors",
+        "format": "float-quantized" if scheme == "fp8" else "int-quantized",
+        "quantization_status": "compressed",
+        "config_groups": {
+            "group_0": {
+                "targets": ["Linear"],
+                "weights": {"num_bits": 8, "type": num_type, "strategy": "channel",
+                            "symmetric": True, "dynamic": False},
+                "input_activations": {"num_bits": 8, "type": num_type, "strategy": "token",
+                                      "symmetric": True, "dynamic": True},
+                "output_activations": None,
+            },
+        },
+        "ignore": IGNORE,
+        "kv_cache_scheme": None,
+    }
+
+
+def quantize_export(model_dir: str, output_dir: str, scheme: str = "fp8", max_shard_size: int = 2 * 1024**3) -> dict:
+    """model_dir(bf16 safetensors) → output_dir에 양자화 shard + quantization_config를 넣은 config.json.
+
+    Returns: {"quantized", "shards", "total_size", "source_size", "seconds"}
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"scheme은 {SCHEMES} 중 하나여야 합니다: {scheme}")
+    started = time.time()
+    tensors = tensor_index(model_dir)
+    targets = {key for key, info in tensors.items() if len(info["shape"]) == 2 and is_target(key)}
+    if not targets:
+        raise ValueError(f"{model_dir}에서 양자화할 Linear 가중치를 찾지 못했습니다")
+
+    def transform(key, weight):
+        if key not in targets:
+            return {key: weight}
+        q, scale = quantize_weight(weight, scheme)
+        return {key: q, f"{key}_scale": scale}
+
+    # 대상 가중치: 원소당 1바이트 + scale (행당 float32)
+    out_sizes = {key: (info["nbytes"] if key not in targets else
+                       info["shape"][0] * info["shape"][1] + info["shape"][0] * 4)
+                 for key, info in tensors.items()}
+    written = write_shards(model_dir, output_dir, tensors, transform, out_sizes, max_shard_size, label="quant")
+    copy_model_files(model_dir, output_dir)
+
+    config_path = os.path.join(output_dir, "config.json")
+    with open(config_path, encoding="utf-8") as f:
+        config = json.load(f)
+    config["quantization_config"] = quantization_config(scheme)
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+    result = {
+        "quantized": len(targets),
+        **written,
+        "source_size": sum(info["nbytes"] for info in tensors.values()),
+        "seconds": time.time() - started,
+    }
+    print(f"  [quant] {scheme}: {result['quantized']} Linear weights → {result['shards']} shards "
+          f"({result['source_size'] / 1024**3:.2f}GB → {result['total_size'] / 1024**3:.2f}GB) in {result['seconds']:.1f}s")
+    return result
+
+
+class FakeQuantHooks:
+    """로드된 bf16 모델의 대상 Linear forward만 양자화 흉내 (with 블록 안에서).
+
+    가중치는 forward 직전에 fake-quant 값으로 바꿨다가 직후 되돌리므로 추가 메모리는 Linear 하나 분량.
+    """
+
+    def __init__(self, model, scheme: str):
+        import torch
+
+        self.modules = [m for name, m in model.named_modules()
+                        if isinstance(m, torch.nn.Linear) and is_target(name)]
+        self.scheme = scheme
+        self.handles = []
+
+    def _pre(self, module, args):
+        module._original_weight = module.weight.data
+        module.weight.data = fake_quantize(module.weight.data, self.scheme)
+        return (fake_quantize_activation(args[0], self.scheme), *args[1:])
+
+    @staticmethod
+    def _post(module, args, output):
+        module.weight.data = module._original_weight
+        del module._original_weight
+
+    def __enter__(self):
+        for m in self.modules:
+            self.handles += [m.register_forward_pre_hook(self._pre), m.register_forward_hook(self._post)]
+        return self
+
+    def __exit__(self, *exc):
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
+
+
+def logit_error_report(model, batches: list[dict], scheme: str) -> dict:
+    """calibration 배치마다 bf16 logits vs 양자화 흉내 logits 비교.
+
+    batches: processor 출력 dict (input_ids, attention_mask, pixel_values, ...)
+    Returns: KL(bf16 ‖ quant) 평균/최대, top-1 일치율, logit 절대 오차 평균/최대 (패딩 제외 토큰 기준)
+    """
+    import torch
+
+    hooks = FakeQuantHooks(model, scheme)
+    if not hooks.modules:
+        raise ValueError("모델에서 양자화 대상 Linear를 찾지 못했습니다")
+    device = next(model.parameters()).device
+    kl_sum = agree = tokens = abs_sum = 0.0
+    kl_max = abs_max = 0.0
+    started = time.time()
+    model.eval()
+    with torch.no_grad():
+        for batch in batches:
+            batch = {k: v.to(device) if hasattr(v, "to") else v for k, v in batch.items()}
+            ref = model(**batch).logits.float()
+            with hooks:
+                quant = model(**batch).logits.float()
+            mask = batch["attention_mask"].bool() if "attention_mask" in batch else torch.ones(ref.shape[:2], dtype=torch.bool, device=device)
+            ref, quant = ref[mask], quant[mask]
+            ref_logp, quant_logp = ref.log_softmax(-1), quant.log_softmax(-1)
+            kl = (ref_logp.exp() * (ref_logp - quant_logp)).sum(-1)
+            diff = (ref - quant).abs()
+            kl_sum += kl.sum().item()
+            kl_max = max(kl_max, kl.max().item())
+            agree += (ref.argmax(-1) == quant.argmax(-1)).sum().item()
+            abs_sum += diff.mean(-1).sum().item()
+            abs_max = max(abs_max, diff.max().item())
+            tokens += mask.sum().item()
+            del ref, quant, ref_logp, quant_logp
+    tokens = max(tokens, 1)
+    report = {
+        "scheme": scheme,
+        "samples": len(batches),
+        "tokens": int(tokens),
+        "quantized_linears": len(hooks.modules),
+        "kl_mean": kl_sum / tokens,
+        "kl_max": kl_max,
+        "top1_agreement": agree / tokens,
+        "logit_abs_error_mean": abs_sum / tokens,
+        "logit_abs_error_max": abs_max,
+        "seconds": time.time() - started,
+    }
+    print(f"  [quant] logit error ({scheme}, {report['samples']} samples / {report['tokens']} tokens): "
+          f"KL {report['kl_mean']:.4f} (max {report['kl_max']:.3f}), top-1 {report['top1_agreement']:.2%}, "
+          f"|Δlogit| {report['logit_abs_error_mean']:.3f} (max {report['logit_abs_error_max']:.2f})")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="병합 모델 FP8/INT8 export (compressed-tensors)")
+    parser.add_argument("--model", required=True, help="bf16 safetensors 모델 디렉터리")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--scheme", choices=SCHEMES, default="fp8")
+    parser.add_argument("--max-shard-size-mb", type=int, default=2048)
+    args = parser.parse_args()
+    quantize_export(args.model, args.output, args.scheme, args.max_shard_size_mb * 1024**2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""수집된 safari 턴 요청을 OpenAI 호환 엔드포인트에 재생하는 부하 생성기.
+
+DataCollector.saveTurn이 쓴 data/safari-dataset/dataset.jsonl row마다 모델에 보낸 요청(raw_request)이 있다.
+이미지는 raw_request에 '[multimodal]'로만 남으므로 system_prompt/context_text/image_file로 요청을 복원하고,
+예전 row의 Gemini 원본 요청(contents/systemInstruction/functionDeclarations)은 OpenAI chat 형식으로 바꾼다.
+
+스케줄:
+    open   — 목표 QPS로 도착 시각을 정해 (poisson 또는 균등 간격) 응답과 무관하게 보낸다 (실사용 트래픽)
+    closed — concurrency개 worker가 응답을 받자마자 다음 요청을 보낸다 (최대 처리량)
+stream=True로 보내 TTFT(첫 토큰까지 시간)를 재고, latency/TTFT 분위수, 처리량, 에러율을 리포트한다.
+
+CLI: scripts/replay_load.py (로컬 stub 서버 포함)
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+_ROLE = {"system": "system", "human": "user", "user": "user", "ai": "assistant", "model": "assistant",
+         "assistant": "assistant", "tool": "tool"}
+
+
+# ---------------------------------------------------------------------------
+# 요청 복원
+# ---------------------------------------------------------------------------
+
+
+def _image_url(dataset_dir: str, image_file: str) -> str | None:
+    path = os.path.join(dataset_dir, image_file or "")
+    if not image_file or not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f"data:image/png;base64,{base64.b64encode(f.read()).decode()}"
+
+
+def _gemini_schema(schema: dict) -> dict:
+    """Gemini OpenAPI subset (type: OBJECT/STRING ...) → JSON Schema (소문자 type)."""
+    out = {}
+    for key, value in schema.items():
+        if key == "type" and isinstance(value, str):
+            out[key] = value.lower()
+        elif isinstance(value, dict):
+            out[key] = {k: _gemini_schema(v) for k, v in value.items()} if key == "properties" else _gemini_schema(value)
+        else:
+            out[key] = value
+    return out
+
+
+def gemini_to_openai(raw: dict) -> tuple[list[dict], list[dict]]:
+    """Gemini generateContent 요청 → (OpenAI messages, tools)."""
+    messages = []
+    system = raw.get("systemInstruction") or raw.get("system_instruction")
+    if system:
+        messages.append({"role": "system", "content": "\n".join(p.get("text", "") for p in system.get("parts", []))})
+    for content in raw.get("contents", []):
+        parts = []
+        for part in content.get("parts", []):
+            if "text" in part and not part.get("thought"):
+                parts.append({"type": "text", "text": part["text"]})
+            elif "inlineData" in part or "inline_data" in part:
+                data = part.get("inlineData") or part.get("inline_data")
+                mime = data.get("mimeType") or data.get("mime_type", "image/png")
+                parts.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{data['data']}"}})
+        if parts:
+            messages.append({"role": _ROLE.get(content.get("role", "user"), "user"), "content": parts})
+    tools = [
+        {"type": "function", "function": {"name": d["name"], "description": d.get("description", ""),
+                                          "parameters": _gemini_schema(d.get("parameters", {"type": "OBJECT"}))}}
+        for group in raw.get("tools", []) for d in group.get("functionDeclarations", group.get("function_declarations", []))
+    ]
+    return messages, tools
+
+
+def build_request(row: dict, dataset_dir: str, tools: list[dict]) -> dict | None:
+    """dataset.jsonl row → {"messages", "tools"}. 복원할 수 없으면 None."""
+    raw = row.get("raw_request") or {}
+    if raw.get("contents"):
+        messages, raw_tools = gemini_to_openai(raw)
+        return {"messages": messages, "tools": raw_tools or tools} if messages else None
+
+    system = next((m["content"] for m in raw.get("messages", []) if m.get("type") == "system"
+                   and isinstance(m.get("content"), str)), None) or row.get("system_prompt")
+    content = [{"type": "text", "text": row.get("context_text") or ""}]
+    image = _image_url(dataset_dir, row.get("image_file"))
+    if image:
+        content.append({"type": "image_url", "image_url": {"url": image}})
+    if not system or not row.get("context_text"):
+        return None
+    return {"messages": [{"role": "system", "content": system}, {"role": "user", "content": content}], "tools": tools}
+
+
+def load_requests(path: str, tools: list[dict], limit: int = 0) -> list[dict]:
+    dataset_dir = os.path.dirname(os.path.abspath(path))
+    requests, skipped = [], 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            request = build_request(json.loads(line), dataset_dir, tools)
+            if request is None:
+                skipped += 1
+                continue
+            requests.append(request)
+            if limit and len(requests) >= limit:
+                break
+    print(f"  loaded {len(requests)} requests from {path} (skipped {skipped})")
+    return requests
+
+
+# ---------------------------------------------------------------------------
+# 재생
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class RequestResult:
+    index: int
+    scheduled: float  # 시작 기준 예정 송신 시각 (open loop), closed loop는 실제 송신 시각
+    sent: float
+    latency: float = 0.0
+    ttft: float | None = None
+    completion_tokens: int = 0
+    prompt_tokens: int = 0
+    status: int = 0
+    error: str = ""
+
+
+async def send(client, url: str, headers: dict, body: dict, result: RequestResult, timeout: float):
+    started = time.perf_counter()
+    chunks = 0
+    try:
+        async with client.stream("POST", url, json=body, headers=headers, timeout=timeout) as resp:
+            result.status = resp.status_code
+            if resp.status_code >= 400:
+                result.error = f"HTTP {resp.status_code}: {(await resp.aread())[:200].decode(errors='replace')}"
+                return
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if event.get("usage"):
+                    result.completion_tokens = event["usage"].get("completion_tokens", 0)
+                    result.prompt_tokens = event["usage"].get("prompt_tokens", 0)
+                for choice in event.get("choices", []):
+                    delta = choice.get("delta", {})
+                    if delta.get("content") or delta.get("reasoning_content") or delta.get("tool_calls"):
+                        chunks += 1
+                        if result.ttft is None:
+                            result.ttft = time.perf_counter() - started
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.latency = time.perf_counter() - started
+        if not result.completion_tokens:
+            result.completion_tokens = chunks  # usage 미지원 서버: chunk 수로 근사
+
+
+async def replay(requests: list[dict], base_url: str, model: str, api_key: str = "EMPTY", mode: str = "open",
+                 qps: float = 1.0, concurrency: int = 8, num_requests: int = 0, duration: float = 0,
+                 arrival: str = "poisson", max_tokens: int = 1024, timeout: float = 300, seed: int = 0) -> tuple[list[RequestResult], float]:
+    """requests를 순환하며 재생. num_requests/duration 중 먼저 닿는 쪽에서 멈춘다. Returns: (결과, 경과 시간)."""
+    import httpx
+
+    if mode not in ("open", "closed"):
+        raise ValueError(f"mode는 open|closed: {mode}")
+    if not num_requests and not duration:
+        num_requests = len(requests)
+    url = f"{base_url.rstrip('/')}/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key or 'EMPTY'}"}
+    rng = random.Random(seed)
+    results: list[RequestResult] = []
+
+    def body(i: int) -> dict:
+        return {"model": model, **requests[i % len(requests)], "max_tokens": max_tokens, "temperature": 0,
+                "stream": True, "stream_options": {"include_usage": True}}
+
+    def more(i: int, elapsed: float) -> bool:
+        return (not num_requests or i < num_requests) and (not duration or elapsed < duration)
+
+    # open loop는 동시 요청 수가 제한 없이 늘 수 있으므로 연결 풀도 넉넉히
+    pool = concurrency if mode == "closed" else max(concurrency, 1024)
+    limits = httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+    async with httpx.AsyncClient(limits=limits) as client:
+        started = time.perf_counter()
+        if mode == "open":
+            tasks, at, i = [], 0.0, 0
+            while more(i, at):
+                delay = at - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                result = RequestResult(i, at, time.perf_counter() - started)
+                results.append(result)
+                tasks.append(asyncio.create_task(send(client, url, headers, body(i), result, timeout)))
+                i += 1
+                at += rng.expovariate(qps) if arrival == "poisson" else 1 / qps
+            await asyncio.gather(*tasks)
+        else:
+            counter = iter(range(10**12))
+
+            async def worker():
+                while True:
+                    i = next(counter)
+                    elapsed = time.perf_counter() - started
+                    if not more(i, elapsed):
+                        return
+                    result = RequestResult(i, elapsed, elapsed)
+                    results.append(result)
+                    await send(client, url, headers, body(i), result, timeout)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return sorted(results, key=lambda r: r.index), elapsed
+
+
+def summarize(results: list[RequestResult], elapsed: float) -> dict:
+    ok = [r for r in results if not r.error]
+    latency = np.array([r.latency for r in ok]) if ok else np.zeros(1)
+    ttft = np.array([r.ttft for r in ok if r.ttft is not None]) if ok else np.zeros(1)
+    ttft = ttft if len(ttft) else np.zeros(1)
+    lag = np.array([r.sent - r.scheduled for r in results]) if results else np.zeros(1)
+
+    def pct(values: np.ndarray) -> dict:
+        return {f"p{q}": float(np.percentile(values, q)) for q in (50, 90, 95, 99)} | {"mean": float(values.mean())}
+
+    errors = {}
+    for r in results:
+        if r.error:
+            kind = r.error.split(":")[0]
+            errors[kind] = errors.get(kind, 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": (len(results) - len(ok)) / max(len(results), 1),
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput_rps": len(ok) / max(elapsed, 1e-9),
+        "output_tokens_per_sec": sum(r.completion_tokens for r in ok) / max(elapsed, 1e-9),
+        "completion_tokens_mean": float(np.mean([r.completion_tokens for r in ok])) if ok else 0.0,
+        "latency": pct(latency),
+        "ttft": pct(ttft),
+        "schedule_lag_p99": float(np.percentile(lag, 99)),  # open loop: 생성기가 예정 시각을 못 맞춘 정도
+    }
+
+
+def print_summary(summary: dict, label: str = ""):
+    print(f"\n  {label} requests={summary['requests']} ok={summary['ok']} error_rate={summary['error_rate']:.1%}"
+          + (f" {summary['errors']}" if summary["errors"] else ""))
+    print(f"  throughput {summary['throughput_rps']:.2f} req/s, {summary['output_tokens_per_sec']:.0f} output tok/s "
+          f"(mean {summary['completion_tokens_mean']:.0f} tok/req) over {summary['elapsed']:.1f}s")
+    for name in ("latency", "ttft"):
+        s = summary[name]
+        print(f"  {name:<8} p50 {s['p50']:.2f}s  p90 {s['p90']:.2f}s  p95 {s['p95']:.2f}s  p99 {s['p99']:.2f}s")
+    if summary["schedule_lag_p99"] > 0.1:
+        print(f"  ! schedule lag p99 {summary['schedule_lag_p99']:.2f}s — 생성기가 목표 QPS를 따라가지 못함")
+
+
+def results_to_json(results: list[RequestResult]) -> list[dict]:
+    return [asdict(r) for r in results]
+
+
+# ---------------------------------------------------------------------------
+# 로컬 stub 서버 (표준 라이브러리만)
+# ---------------------------------------------------------------------------
+
+
+def serve_stub(port: int = 8000, ttft: float = 0.2, tokens: int = 64, tokens_per_sec: float = 100.0,
+               error_rate: float = 0.0):
+    """/v1/chat/completions를 흉내 내는 SSE stub — ttft 후 tokens개 chunk를 tokens_per_sec 속도로 보낸다."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if random.random() < error_rate:
+                payload = b'{"error": "stub overloaded"}'
+                self.send_response(503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def event(data: dict | str):
+                line = f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n".encode()
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            n = min(tokens, body.get("max_tokens") or tokens)
+            time.sleep(ttft)
+            for _ in range(n):
+                event({"choices": [{"index": 0, "delta": {"content": "tok"}}]})
+                time.sleep(1 / tokens_per_sec)
+            event({"choices": [], "usage": {"prompt_tokens": 1, "completion_tokens": n}})
+            event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    print(f"stub OpenAI server on http://localhost:{port}/v1 (ttft={ttft}s, {tokens} tokens @ {tokens_per_sec}/s)")
+    server.serve_forever()
@@ -0,0 +1,42 @@
+"""Pod 리소스 조회 유틸."""
+
+import math
+import os
+
+
+def _cgroup_cpu_limit() -> float | None:
+    """cgroup CPU quota (v2 cpu.max / v1 cfs_quota_us). 제한이 없으면 None."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """컨테이너에서 실제로 쓸 수 있는 CPU 수.
+
+    os.cpu_count()는 호스트 전체 코어를 반환하므로 RunPod vCPU 할당(cgroup quota)과
+    affinity 중 작은 값을 사용한다.
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        count = min(count, max(1, math.floor(limit)))
+    return max(1, count)
@@ -6,6 +6,7 @@ dockerStartCmd, 데이터센터 가용성 배치 등 payload 전체를 제어한
 
 import json
 import os
+import time
 from enum import Enum
 
 import requests
@@ -127,11 +128,18 @@ def create(
     start_command: list[str] = [],
     ports: list[str] = ["8888/http,22/tcp"],
     template_id: str = "",
+    vcpu_count: int = 2,
+    interruptible: bool = False,
+    network_volume_id: str = "",
 ) -> str:
     """Pod을 생성하고 pod_id를 반환한다.
 
     26개 데이터센터 가용성 우선 배치, dockerStartCmd 지원.
     template_id가 주어지면 RunPod 템플릿 기반으로 생성한다.
+    interruptible=True면 spot 가격으로 생성 — 언제든 회수될 수 있으므로 체크포인트 재개가 필요하다.
+    network_volume_id가 주어지면 그 network volume을 /workspace에 마운트한다 (Pod 간 공유 캐시).
+    volume이 있는 데이터센터에만 배치할 수 있어 데이터센터 목록은 지정하지 않고,
+    network volume은 Secure Cloud에서만 제공되므로 cloudType도 SECURE로 바꾼다.
     """
     payload = {
         "cloudType": "COMMUNITY",
@@ -152,15 +160,19 @@ def create(
         "gpuTypeIds": [RUNPOD_GPU_MAP[gpu_id]],
         "gpuCount": gpu_count,
         "gpuTypePriority": "availability",
-        "interruptible": False,
+        "interruptible": interruptible,
         "locked": False,
         "name": name,
         "ports": ports,
-        "vcpuCount": 2,
+        "vcpuCount": vcpu_count,
         "volumeInGb": volume,
         "volumeMountPath": "/workspace",
     }
 
+    if network_volume_id:
+        payload["networkVolumeId"] = network_volume_id
+        payload["cloudType"] = "SECURE"
+        payload.pop("dataCenterIds")
     if template_id:
         payload["templateId"] = template_id
     if image_name:
@@ -193,6 +205,32 @@ def delete(pod_id: str) -> str:
     return response.text
 
 
+def terminate_self(pod_id: str, api_key: str, max_attempts: int = 100, interval: float = 30, notify=print) -> bool:
+    """Pod 안에서 자기 자신을 삭제 — 성공할 때까지 재시도 (과금 안전). notify(text)로 시도/결과를 알린다."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            notify(f"🗑️ Pod 삭제 시도 [{attempt}/{max_attempts}] — pod: `{pod_id}`")
+            resp = requests.delete(
+                f"{_BASE_URL}/{pod_id}",
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=30,
+            )
+            print(f"  [{attempt}] terminate response: {resp.status_code} {resp.text}")
+            resp.raise_for_status()
+            notify(f"✅ Pod 삭제 성공 [{attempt}/{max_attempts}] — pod: `{pod_id}`")
+            print(f"  Pod {pod_id} DELETE 요청 성공, {interval:.0f}초 대기 후 프로세스 종료")
+            time.sleep(interval)
+            return True
+        except Exception as e:
+            print(f"  [{attempt}] 삭제 실패: {e}")
+            if attempt < max_attempts:
+                time.sleep(interval)
+
+    notify(f"🚨 Pod 삭제 {max_attempts}회 모두 실패! 수동 확인 필요 — pod: `{pod_id}`")
+    print(f"  Pod {pod_id} 삭제 {max_attempts}회 실패")
+    return False
+
+
 def pods() -> list[dict]:
     """전체 Pod 목록을 반환한다."""
     response = requests.get(_BASE_URL, headers=_headers())
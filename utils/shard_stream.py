@@ -0,0 +1,108 @@
+"""safetensors 가중치를 텐서 단위로 스트리밍 변환 — LoRA 병합(lora_merge), 양자화 export(quantize_export) 공용.
+
+입력 shard는 safe_open(mmap)으로 텐서를 하나씩 읽고, 출력 shard는 헤더(shape/dtype)로 미리 구성을 정한 뒤
+차는 대로 바로 쓴다. 피크 메모리 ≈ 출력 shard 하나.
+"""
+
+import json
+import math
+import os
+import re
+from typing import Callable
+
+WEIGHTS_INDEX = "model.safetensors.index.json"
+DTYPE_BYTES = {"F64": 8, "F32": 4, "F16": 2, "BF16": 2, "I64": 8, "I32": 4, "I16": 2, "I8": 1, "U8": 1,
+               "BOOL": 1, "F8_E4M3": 1, "F8_E5M2": 1}
+# 변환 결과에 가져가지 않는 파일 (가중치는 새로 쓰고, 캐시 마커/다운로드 흔적은 제외)
+_SKIP_FILES = re.compile(r"(\.safetensors|\.bin|\.pt|\.pth|\.msgpack|\.h5|safetensors\.index\.json|^\..*)$")
+
+
+def tensor_index(model_dir: str) -> dict[str, dict]:
+    """텐서 키 → {"file", "shape", "dtype", "nbytes"}. 헤더만 읽는다."""
+    from safetensors import safe_open
+
+    index = os.path.join(model_dir, WEIGHTS_INDEX)
+    if os.path.exists(index):
+        with open(index, encoding="utf-8") as f:
+            files = sorted(set(json.load(f)["weight_map"].values()))
+    else:
+        files = sorted(name for name in os.listdir(model_dir) if name.endswith(".safetensors"))
+    if not files:
+        raise FileNotFoundError(f"{model_dir}에 safetensors 가중치가 없습니다")
+    tensors = {}
+    for name in files:
+        with safe_open(os.path.join(model_dir, name), framework="pt") as f:
+            for key in f.keys():
+                tensor = f.get_slice(key)
+                shape, dtype = tensor.get_shape(), tensor.get_dtype()
+                tensors[key] = {"file": name, "shape": shape, "dtype": dtype,
+                                "nbytes": math.prod(shape) * DTYPE_BYTES[dtype]}
+    return tensors
+
+
+def plan_shards(sizes: dict[str, int], max_shard_size: int) -> list[list[str]]:
+    """입력 키 순서대로 출력 바이트 수를 채워 max_shard_size 단위로 나눈다."""
+    shards, current, size = [], [], 0
+    for key, nbytes in sizes.items():
+        if current and size + nbytes > max_shard_size:
+            shards.append(current)
+            current, size = [], 0
+        current.append(key)
+        size += nbytes
+    if current:
+        shards.append(current)
+    return shards
+
+
+def write_shards(model_dir: str, output_dir: str, tensors: dict[str, dict],
+                 transform: Callable[[str, object], dict], out_sizes: dict[str, int],
+                 max_shard_size: int, label: str = "shard") -> dict:
+    """tensors의 각 텐서를 transform(key, tensor) → {출력 키: 텐서}로 바꿔 output_dir에 shard로 쓴다.
+
+    out_sizes: 입력 키별 출력 바이트 수 (shard 구성용). Returns: {"shards", "total_size"}
+    """
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+
+    if os.path.realpath(output_dir) == os.path.realpath(model_dir):
+        raise ValueError(f"output_dir가 입력 모델 디렉터리와 같습니다 — 기존 가중치를 지우게 됩니다: {output_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+    for name in os.listdir(output_dir):
+        if name.endswith(".safetensors") or name == WEIGHTS_INDEX:
+            os.remove(os.path.join(output_dir, name))
+
+    shards = plan_shards(out_sizes, max_shard_size)
+    names = ["model.safetensors"] if len(shards) == 1 else \
+        [f"model-{i:05d}-of-{len(shards):05d}.safetensors" for i in range(1, len(shards) + 1)]
+    handles, weight_map, total_size = {}, {}, 0
+    try:
+        for shard_name, keys in zip(names, shards):
+            out = {}
+            for key in keys:
+                file = tensors[key]["file"]
+                if file not in handles:
+                    handles[file] = safe_open(os.path.join(model_dir, file), framework="pt")
+                for out_key, tensor in transform(key, handles[file].get_tensor(key)).items():
+                    out[out_key] = tensor.contiguous()
+                    weight_map[out_key] = shard_name
+                    total_size += tensor.numel() * tensor.element_size()
+            save_file(out, os.path.join(output_dir, shard_name), metadata={"format": "pt"})
+            print(f"  [{label}] {shard_name}: {len(out)} tensors")
+            del out
+    finally:
+        handles.clear()
+
+    if len(shards) > 1:
+        with open(os.path.join(output_dir, WEIGHTS_INDEX), "w", encoding="utf-8") as f:
+            json.dump({"metadata": {"total_size": total_size}, "weight_map": weight_map}, f, indent=2)
+    return {"shards": len(shards), "total_size": total_size}
+
+
+def copy_model_files(model_dir: str, output_dir: str):
+    """가중치 외 파일(config, tokenizer, processor, chat template 등) 복사."""
+    import shutil
+
+    for name in os.listdir(model_dir):
+        src = os.path.join(model_dir, name)
+        if os.path.isfile(src) and not _SKIP_FILES.search(name):
+            shutil.copy2(src, os.path.join(output_dir, name))
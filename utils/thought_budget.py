@@ -0,0 +1,154 @@
+"""teacher thought_text 추론 길이 예산.
+
+docs/MODEL_IMPROVEMENT_PLAN.md의 'thinking trap' — 학습 타겟의 thought를 teacher 그대로 복사하면
+모델도 수천 토큰씩 추론하다 max_tokens에 걸려 tool call을 못 한다. 렌더링 직전에 샘플별 thought
+토큰 수를 tokens_thought_raw 컬럼으로 남기고, 정책에 따라 thought를 줄이거나 샘플을 걸러낸다:
+
+    keep      그대로 (측정만)
+    cap       max_tokens에서 자르고, 가능하면 마지막 문장 경계까지 되돌린다
+    compress  반복되는 문장/줄을 제거한 뒤 cap
+    filter    thought가 max_tokens를 넘는 샘플 제거 (analyze_tokens 단계)
+
+렌더링 후 tokens_thought(예산 적용 후)와 tokens_thought_raw(원본)로 리포트를 만든다.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+THOUGHT_POLICIES = ("keep", "cap", "compress", "filter")
+RAW_COLUMN = "tokens_thought_raw"
+
+_SENTENCE = re.compile(r"(?<=[.!?。])\s+")
+_BOUNDARY = re.compile(r"[.!?。](?=\s)|\n")
+
+
+def compress_thought(text: str) -> str:
+    """이미 나온 문장/줄(공백·대소문자 무시)을 다시 쓰는 부분을 제거. 빈 줄은 하나로."""
+    seen, lines = set(), []
+    for line in text.splitlines():
+        kept = []
+        for sentence in _SENTENCE.split(line.strip()):
+            normalized = " ".join(sentence.lower().split())
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                kept.append(sentence)
+        if kept:
+            lines.append(" ".join(kept))
+        elif lines and lines[-1]:
+            lines.append("")
+    return "\n".join(lines).strip()
+
+
+def _cut(text: str, end: int) -> str:
+    """text[:end]를 마지막 문장 경계까지 되돌린다 — 경계가 앞쪽 절반에만 있으면 그냥 자른다."""
+    head = text[:end]
+    boundaries = [m.end() for m in _BOUNDARY.finditer(head)]
+    if boundaries and boundaries[-1] >= end // 2:
+        head = head[:boundaries[-1]]
+    return head.rstrip()
+
+
+class ThoughtBudget:
+    """렌더링 batch(컬럼 dict)의 thought_text에 정책 적용 + 원본 토큰 수 컬럼 추가."""
+
+    def __init__(self, tokenizer, policy: str = "keep", max_tokens: int = 0):
+        if policy not in THOUGHT_POLICIES:
+            raise ValueError(f"thought_policy는 {THOUGHT_POLICIES} 중 하나여야 합니다: {policy}")
+        if policy in ("cap", "filter") and max_tokens <= 0:
+            raise ValueError(f"thought_policy={policy}에는 thought_max_tokens > 0이 필요합니다")
+        self.tokenizer = tokenizer
+        self.policy = policy
+        self.max_tokens = max_tokens
+
+    def _encode(self, texts: list[str]) -> dict:
+        return self.tokenizer(texts, add_special_tokens=False,
+                              return_offsets_mapping=getattr(self.tokenizer, "is_fast", False))
+
+    def _cap(self, texts: list[str]) -> list[str]:
+        encoded = self._encode(texts)
+        capped = []
+        for i, (text, ids) in enumerate(zip(texts, encoded["input_ids"])):
+            if len(ids) <= self.max_tokens:
+                capped.append(text)
+            elif "offset_mapping" in encoded:
+                capped.append(_cut(text, encoded["offset_mapping"][i][self.max_tokens - 1][1]))
+            else:
+                decoded = self.tokenizer.decode(ids[:self.max_tokens])
+                capped.append(_cut(decoded, len(decoded)))
+        return capped
+
+    def apply(self, batch: dict[str, list]) -> dict[str, list]:
+        n = len(next(iter(batch.values())))
+        if "thought_text" not in batch:
+            return {**batch, RAW_COLUMN: [0] * n}
+        thoughts = [text or "" for text in batch["thought_text"]]
+        raw = [len(ids) for ids in self._encode(thoughts)["input_ids"]]
+        if self.policy in ("keep", "filter"):
+            return {**batch, RAW_COLUMN: raw}
+        if self.policy == "compress":
+            thoughts = [compress_thought(text) for text in thoughts]
+        if self.max_tokens > 0:
+            thoughts = self._cap(thoughts)
+        # 원래 비어 있던 thought(None)는 그대로 둔다
+        thoughts = [new if old else old for old, new in zip(batch["thought_text"], thoughts)]
+        return {**batch, "thought_text": thoughts, RAW_COLUMN: raw}
+
+
+def _stats(values: np.ndarray) -> dict:
+    if len(values) == 0:
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "max": int(values.max()), "sum": int(values.sum())}
+
+
+def thought_report(raw: np.ndarray, after: np.ndarray, policy: str, max_tokens: int) -> dict:
+    over = raw > max_tokens if max_tokens > 0 else np.zeros(len(raw), dtype=bool)
+    kept = ~over if policy == "filter" else np.ones(len(raw), dtype=bool)
+    return {
+        "policy": policy,
+        "max_tokens": max_tokens,
+        "samples": int(len(raw)),
+        "over_budget": int(over.sum()),
+        "shortened": int((after[kept] < raw[kept]).sum()),
+        "dropped": int((~kept).sum()),
+        "raw": _stats(raw),
+        "after": _stats(after[kept]),
+        "tokens_saved": int(raw.sum() - after[kept].sum()),
+    }
+
+
+def print_thought_report(report: dict) -> None:
+    raw, after = report["raw"], report["after"]
+    if not raw:
+        return
+    print(f"  thought budget: policy={report['policy']}, max_tokens={report['max_tokens'] or '-'}, "
+          f"over budget {report['over_budget']}/{report['samples']}, "
+          f"shortened {report['shortened']}, dropped {report['dropped']}")
+    print(f"    {'thought':<14}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, s in (("raw", raw), ("after", after)):
+        if s:
+            print(f"    {name:<14}{s['mean']:>9.0f}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['p99']:>9.0f}{s['max']:>9}")
+    print(f"    tokens saved: {report['tokens_saved']} "
+          f"({report['tokens_saved'] / max(raw['sum'], 1):.1%} of thought tokens)")
+
+
+def apply_thought_budget(ds, policy: str = "keep", max_tokens: int = 0, report_path: str = ""):
+    """렌더링된 데이터셋의 thought 리포트 작성, filter 정책이면 예산 초과 샘플 제거."""
+    columns = ds.select_columns([RAW_COLUMN, "tokens_thought"]).with_format("numpy")[:]
+    raw, after = columns[RAW_COLUMN], columns["tokens_thought"]
+    report = thought_report(raw, after, policy, max_tokens)
+    print_thought_report(report)
+    if report_path:
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"  thought budget report: {report_path}")
+
+    if policy == "filter" and report["dropped"]:
+        ds = ds.select(np.flatnonzero(raw <= max_tokens))
+        print(f"  dropped {report['dropped']} samples over thought budget → {len(ds)} remain")
+    return ds
@@ -0,0 +1,176 @@
+"""학습 샘플 토큰 예산 분석.
+
+렌더링 단계에서 샘플별 토큰 수를 구성 요소별(system+tools / image / context / thought /
+tool call / 기타 template·tool result)로 세어 컬럼으로 남기고, 학습 전에 분포 리포트를
+작성한 뒤 max_seq_length를 넘는 샘플을 정책에 따라 제거(drop)하거나 표시(flag)한다.
+"""
+
+import io
+import json
+import os
+
+import numpy as np
+
+TOKEN_COLUMNS = [
+    "tokens_system_tools",
+    "tokens_image",
+    "tokens_context",
+    "tokens_thought",
+    "tokens_tool_call",
+    "tokens_other",
+    "tokens_total",
+]
+
+OVERLENGTH_POLICIES = ("drop", "flag")
+
+
+def _image_size(image) -> tuple[int, int]:
+    """PIL 이미지 또는 {"bytes", "path"} dict의 (width, height). 헤더만 읽는다."""
+    if hasattr(image, "size"):
+        return image.size
+    from PIL import Image
+
+    source = io.BytesIO(image["bytes"]) if image.get("bytes") else image["path"]
+    with Image.open(source) as opened:
+        return opened.size
+
+
+class TokenCounter:
+    """렌더링 batch(메시지 리스트 + 렌더링된 텍스트)의 샘플별 토큰 수를 센다.
+
+    구성 요소별 문자열을 batch 전체에서 모아 tokenizer를 한 번씩만 호출하고
+    np.bincount로 샘플별로 합산한다.
+    """
+
+    def __init__(self, processor, tools: list[dict]):
+        self.processor = processor
+        self.tokenizer = processor.tokenizer
+        self.tools = tools
+        self.merge_length = processor.image_processor.merge_size ** 2
+        self._prefix_tokens: dict[str, int] = {}
+
+    def image_tokens(self, image) -> int:
+        width, height = _image_size(image)
+        patches = self.processor.image_processor.get_number_of_image_patches(height, width, {})
+        return patches // self.merge_length
+
+    def system_tools_tokens(self, system_prompt: str) -> int:
+        """system 메시지 + TOOLS 스키마가 렌더링된 prefix 토큰 수 (system prompt별 캐시)."""
+        if system_prompt not in self._prefix_tokens:
+            prefix = self.processor.apply_chat_template(
+                [{"role": "system", "content": system_prompt}],
+                tools=self.tools, tokenize=False, add_generation_prompt=False,
+            )
+            self._prefix_tokens[system_prompt] = len(self.tokenizer(prefix, add_special_tokens=False)["input_ids"])
+        return self._prefix_tokens[system_prompt]
+
+    def _sum_tokens(self, owners: list[int], texts: list[str], n: int) -> np.ndarray:
+        if not texts:
+            return np.zeros(n, dtype=np.int64)
+        lengths = [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+        return np.bincount(owners, weights=lengths, minlength=n).astype(np.int64)
+
+    def count(self, conversations: list[list[dict]], texts: list[str]) -> dict[str, list[int]]:
+        n = len(conversations)
+        system_tools = np.zeros(n, dtype=np.int64)
+        image = np.zeros(n, dtype=np.int64)
+        image_placeholders = np.zeros(n, dtype=np.int64)
+        parts = {"context": ([], []), "thought": ([], []), "tool_call": ([], [])}
+
+        for i, messages in enumerate(conversations):
+            for message in messages:
+                role, content = message["role"], message.get("content")
+                if role == "system":
+                    system_tools[i] += self.system_tools_tokens(content)
+                elif role == "user" and isinstance(content, list):
+                    for item in content:
+                        if item["type"] == "image":
+                            image[i] += self.image_tokens(item["image"])
+                            image_placeholders[i] += 1
+                        elif item["type"] == "text":
+                            parts["context"][0].append(i)
+                            parts["context"][1].append(item["text"])
+                elif role == "user" and content:
+                    parts["context"][0].append(i)
+                    parts["context"][1].append(content)
+                elif role == "assistant":
+                    if content:
+                        parts["thought"][0].append(i)
+                        parts["thought"][1].append(content)
+                    for call in message.get("tool_calls") or []:
+                        parts["tool_call"][0].append(i)
+                        parts["tool_call"][1].append(
+                            json.dumps({"name": call["function"]["name"], "arguments": call["function"]["arguments"]},
+                                       ensure_ascii=False)
+                        )
+
+        counts = {name: self._sum_tokens(owners, strings, n) for name, (owners, strings) in parts.items()}
+        # 렌더링된 텍스트는 이미지당 placeholder 1개 → grid 크기만큼 펼쳐진 토큰 수로 보정
+        total = self._sum_tokens(list(range(n)), texts, n) + image - image_placeholders
+        other = total - system_tools - image - counts["context"] - counts["thought"] - counts["tool_call"]
+        return {
+            "tokens_system_tools": system_tools.tolist(),
+            "tokens_image": image.tolist(),
+            "tokens_context": counts["context"].tolist(),
+            "tokens_thought": counts["thought"].tolist(),
+            "tokens_tool_call": counts["tool_call"].tolist(),
+            "tokens_other": np.maximum(other, 0).tolist(),
+            "tokens_total": total.tolist(),
+        }
+
+
+def budget_report(columns: dict[str, np.ndarray], max_seq_length: int, bins: int = 20) -> dict:
+    """구성 요소별 백분위 + 전체 토큰 히스토그램."""
+    total = columns["tokens_total"]
+    report = {
+        "samples": int(len(total)),
+        "max_seq_length": max_seq_length,
+        "over_length": int((total > max_seq_length).sum()),
+        "components": {},
+    }
+    for name in TOKEN_COLUMNS:
+        values = columns[name]
+        if len(values) == 0:
+            continue
+        p50, p90, p95, p99 = np.percentile(values, [50, 90, 95, 99])
+        report["components"][name.removeprefix("tokens_")] = {
+            "mean": float(values.mean()), "p50": float(p50), "p90": float(p90),
+            "p95": float(p95), "p99": float(p99), "max": int(values.max()),
+            "sum": int(values.sum()),
+        }
+    if len(total):
+        counts, edges = np.histogram(total, bins=bins)
+        report["histogram_total"] = {"edges": [int(e) for e in edges], "counts": counts.tolist()}
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"  token budget: {report['samples']} samples, "
+          f"over max_seq_length({report['max_seq_length']}): {report['over_length']}")
+    print(f"    {'component':<14}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, s in report["components"].items():
+        print(f"    {name:<14}{s['mean']:>9.0f}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['p99']:>9.0f}{s['max']:>9}")
+
+
+def apply_token_budget(ds, max_seq_length: int, policy: str = "drop", report_path: str = ""):
+    """리포트 작성 후 over-length 샘플을 정책대로 처리한 데이터셋을 반환."""
+    if policy not in OVERLENGTH_POLICIES:
+        raise ValueError(f"overlength_policy는 {OVERLENGTH_POLICIES} 중 하나여야 합니다: {policy}")
+
+    columns = ds.select_columns(TOKEN_COLUMNS).with_format("numpy")[:]
+    report = budget_report(columns, max_seq_length)
+    report["policy"] = policy
+    print_report(report)
+    if report_path:
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"  token budget report: {report_path}")
+
+    over = columns["tokens_total"] > max_seq_length
+    if policy == "flag":
+        return ds.add_column("over_length", over.tolist())
+    if over.any():
+        ds = ds.select(np.flatnonzero(~over))
+        print(f"  dropped {int(over.sum())} over-length samples → {len(ds)} remain")
+    return ds
@@ -0,0 +1,496 @@
+"""사파리 tool calling 평가 하네스 — OpenAI 호환 엔드포인트(vLLM, RunPod) 대상 동시 실행.
+
+notebook/qwen3-vl-test.ipynb(Level 1~6)와 qwen3-vl-diag.ipynb(Set A: A1~A7)의 테스트 케이스/검증 함수를
+옮겨 왔다. 노트북은 ChatOpenAI.invoke로 케이스를 하나씩 호출하지만, 여기서는 asyncio + 연결 풀을 쓰는
+httpx 클라이언트로 (설정 × 케이스 × 반복)을 concurrency만큼 동시에 보낸다.
+
+설정(모델)별로 pass rate, latency p50/p95, completion tokens, tokens/s를 집계한다.
+CLI: scripts/run_tool_eval.py
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# 모델 설정 (노트북 llm_configs)
+# ---------------------------------------------------------------------------
+
+LLM_CONFIGS = {
+    "runpod": {
+        "base_url": "https://api.runpod.ai/v2/8iiebdj6zt0fbd/openai/v1",
+        "model": "qwen/qwen3-vl-4b-thinking-fp8",
+        "api_key_env": "RUNPOD_API_KEY",
+    },
+    "local": {
+        "base_url": "http://192.168.50.32:8000/v1",
+        "model": "Qwen3-VL-2B-Thinking",
+    },
+    "local-emoji": {
+        "base_url": "http://192.168.50.32:8000/v1",
+        "model": "emoji-lora",
+    },
+    "local-safari": {
+        "base_url": "http://192.168.50.32:8000/v1",
+        "model": "safari-lora",
+    },
+}
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(__file__), "..", "notebook", "images", "safari-sample.png")
+
+# ---------------------------------------------------------------------------
+# 도구 스키마 (노트북 pydantic args_schema → OpenAI tools 형식)
+# ---------------------------------------------------------------------------
+
+_DIRECTION = {"type": "string", "enum": ["UP", "DOWN", "LEFT", "RIGHT"]}
+
+
+def _tool(name: str, description: str, properties: dict, required: list[str]) -> dict:
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        },
+    }
+
+
+TOOLS = {
+    "move": _tool("move", "플레이어를 이동시킨다.", {
+        "actions": {
+            "type": "array",
+            "description": "최대 4개 행동을 순서대로 실행",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "direction": {**_DIRECTION, "description": "이동 방향"},
+                    "steps": {"type": "integer", "description": "이동 칸수 (1~3)", "minimum": 1, "maximum": 3},
+                },
+                "required": ["direction", "steps"],
+            },
+        },
+    }, ["actions"]),
+    "catch_animal": _tool("catch_animal", "인접 타일(상하좌우)의 동물을 포획한다.", {
+        "direction": {**_DIRECTION, "description": "포획할 동물이 있는 방향"},
+    }, ["direction"]),
+    "update_notepad": _tool("update_notepad", "메모장 전체를 덮어쓴다.", {
+        "content": {"type": "string",
+                    "description": "메모장 전체를 덮어쓴다. 유지할 내용도 포함해서 작성해야 한다. 최대 2000자."},
+    }, ["content"]),
+    "declare_found": _tool("declare_found", "특정 타겟을 찾아서 도달했음을 선언한다.", {
+        "target": {"type": "string", "description": "찾은 타겟 이름"},
+    }, ["target"]),
+    "declare_done": _tool("declare_done", "전체 미션이 완료되었음을 선언한다.", {
+        "reason": {"type": "string", "description": "미션 완료 사유"},
+    }, []),
+}
+
+SYSTEM_MSG_LEVEL = (
+    "너는 50x50 격자 맵 위의 사파리 에이전트야. "
+    "반드시 제공된 도구를 사용해서 행동해. 텍스트로 답하지 말고 도구를 호출해."
+)
+SYSTEM_MSG_DIAG = SYSTEM_MSG_LEVEL + " 좌표계: x축은 RIGHT(+)/LEFT(-), y축은 DOWN(+)/UP(-)."
+
+# ---------------------------------------------------------------------------
+# 검증 함수 — tool_calls: [{"id", "name", "args"}] → (passed, reason)
+# ---------------------------------------------------------------------------
+
+
+def _calls(tool_calls: list[dict], name: str) -> list[dict]:
+    return [tc for tc in tool_calls if tc["name"] == name]
+
+
+def _net_delta(move_calls: list[dict], y_up: int) -> tuple[int, int, int]:
+    """move 호출들의 이동량 합 (dx, dy, action 수). y_up: UP 한 칸의 y 변화량 (level=+1, diag=-1)."""
+    dx = dy = n = 0
+    for mc in move_calls:
+        for a in mc["args"].get("actions", []):
+            n += 1
+            d, s = a.get("direction"), a.get("steps", 0)
+            if d == "RIGHT":
+                dx += s
+            elif d == "LEFT":
+                dx -= s
+            elif d == "UP":
+                dy += s * y_up
+            elif d == "DOWN":
+                dy -= s * y_up
+    return dx, dy, n
+
+
+def _require(tool_calls: list[dict], name: str):
+    if not tool_calls:
+        return None, (False, "tool call 없음")
+    calls = _calls(tool_calls, name)
+    if not calls:
+        return None, (False, f"{name} 호출 없음 (호출된 도구: {[tc['name'] for tc in tool_calls]})")
+    return calls, None
+
+
+def validate_single_move(direction: str, steps: int):
+    def validate(tool_calls):
+        calls, fail = _require(tool_calls, "move")
+        if fail:
+            return fail
+        actions = calls[0]["args"].get("actions", [])
+        if len(actions) == 1 and actions[0].get("direction") == direction and actions[0].get("steps") == steps:
+            return True, f"move({direction}, {steps}) 정확 호출"
+        return False, f"예상과 다른 호출: {actions}"
+    return validate
+
+
+def validate_arrival(start: tuple[int, int], goal: tuple[int, int], y_up: int, forbidden: str = ""):
+    def validate(tool_calls):
+        calls, fail = _require(tool_calls, "move")
+        if fail:
+            return fail
+        dx, dy, n = _net_delta(calls, y_up)
+        x, y = start[0] + dx, start[1] + dy
+        issues = []
+        if forbidden and any(a.get("direction") == forbidden for mc in calls for a in mc["args"].get("actions", [])):
+            issues.append(f"{forbidden} 사용 (막힌 방향)")
+        if (x, y) != goal:
+            issues.append(f"도착 ({x},{y}) ≠ {goal}")
+        if issues:
+            return False, " / ".join(issues)
+        return True, f"{goal} 도착, actions={n}개"
+    return validate
+
+
+def validate_both(*names: str):
+    def validate(tool_calls):
+        if not tool_calls:
+            return False, "tool call 없음"
+        called = [tc["name"] for tc in tool_calls]
+        missing = [name for name in names if name not in called]
+        if missing:
+            return False, f"누락: {missing}, 호출된 도구: {called}"
+        return True, f"{' + '.join(names)} 동시 호출 ({len(tool_calls)}개)"
+    return validate
+
+
+def validate_any_move(tool_calls):
+    """move 호출이면 통과 (qwen3-vl-test.ipynb validate_l5)."""
+    calls, fail = _require(tool_calls, "move")
+    if fail:
+        return fail
+    return True, f"move 호출 (actions={len(calls[0]['args'].get('actions', []))}개)"
+
+
+def validate_move_with_actions(tool_calls):
+    """move 호출 + actions가 비어 있지 않아야 통과 (qwen3-vl-diag.ipynb validate_a7)."""
+    calls, fail = _require(tool_calls, "move")
+    if fail:
+        return fail
+    actions = calls[0]["args"].get("actions", [])
+    if actions:
+        return True, f"move 호출 (방향: {actions[0].get('direction')}, actions={len(actions)}개)"
+    return False, "move 호출되었으나 actions 비어있음"
+
+
+def validate_catch(tool_calls):
+    calls, fail = _require(tool_calls, "catch_animal")
+    if fail:
+        return fail
+    direction = calls[0]["args"].get("direction")
+    if direction == "RIGHT":
+        return True, "catch_animal(RIGHT) 정확 호출"
+    return False, f"방향 불일치: {direction} (expected RIGHT)"
+
+
+def validate_notepad(tool_calls):
+    calls, fail = _require(tool_calls, "update_notepad")
+    if fail:
+        return fail
+    content = calls[0]["args"].get("content", "")
+    if content:
+        return True, f"update_notepad 호출 + 내용 포함 ({len(content)}자)"
+    return False, "content가 비어있음"
+
+
+def validate_declare_tiger(tool_calls):
+    calls, fail = _require(tool_calls, "declare_found")
+    if fail:
+        return fail
+    target = calls[0]["args"].get("target", "")
+    if "호랑이" in target or "tiger" in target.lower():
+        return True, f"declare_found 호출 + '호랑이' 포함 (target='{target}')"
+    return False, f"target에 '호랑이' 없음: '{target}'"
+
+
+def validate_exact_actions(expected: list[dict]):
+    def validate(tool_calls):
+        calls, fail = _require(tool_calls, "move")
+        if fail:
+            return fail
+        actions = calls[0]["args"].get("actions", [])
+        if len(actions) != len(expected):
+            return False, f"action 수 불일치: {len(actions)}개 (expected {len(expected)})"
+        for i, (a, e) in enumerate(zip(actions, expected)):
+            if a.get("direction") != e["direction"] or a.get("steps") != e["steps"]:
+                return False, f"action[{i}] 불일치: {a} (expected {e})"
+        return True, f"정확히 {len(expected)}개 action 순서대로 호출"
+    return validate
+
+
+def validate_detour(tool_calls):
+    calls, fail = _require(tool_calls, "move")
+    if fail:
+        return fail
+    directions = {a.get("direction") for mc in calls for a in mc["args"].get("actions", [])}
+    if "RIGHT" in directions:
+        return False, "RIGHT 사용됨 (막힌 방향)"
+    if "DOWN" not in directions:
+        return False, "DOWN 미사용 (우회 방향)"
+    return True, "RIGHT 미사용 + DOWN 사용 (조건 추론 성공)"
+
+
+# ---------------------------------------------------------------------------
+# 테스트 케이스
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Turn:
+    """한 번의 요청. tool_result는 이 턴의 tool call들에 돌려줄 결과 (다음 턴이 있을 때)."""
+    user: str | list
+    tool_result: dict | None = None
+
+
+@dataclass
+class EvalCase:
+    case_id: str
+    title: str
+    system: str
+    turns: list[Turn]
+    tools: list[str]
+    validator: Callable[[list[dict]], tuple[bool, str]] | None = None  # 마지막 턴 tool_calls 검증
+    max_tokens: int | None = None
+    multi_turn_validator: Callable[[list[list[dict]]], tuple[bool, str]] | None = None  # 턴별 tool_calls 검증
+
+
+def _image_content(text: str) -> list:
+    with open(SAMPLE_IMAGE, "rb") as f:
+        b64 = base64.b64encode(f.read()).decode()
+    return [{"type": "text", "text": text}, {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}}]
+
+
+def _validate_level6(turn_calls: list[list[dict]]):
+    turns_ok = sum(bool(calls) for calls in turn_calls)
+    has_declare = bool(turn_calls) and any(tc["name"] == "declare_found" for tc in turn_calls[-1])
+    if turns_ok == len(turn_calls) and has_declare:
+        return True, f"{turns_ok}턴 모두 tool call 성공 + declare_found 호출"
+    if turns_ok == len(turn_calls):
+        return True, f"{turns_ok}턴 모두 tool call 성공 (declare_found 누락)"
+    return False, f"{turns_ok}/{len(turn_calls)} 턴만 tool call 성공"
+
+
+def level_cases() -> list[EvalCase]:
+    """qwen3-vl-test.ipynb Level 1~6 (좌표계: UP = y+1)."""
+    s = SYSTEM_MSG_LEVEL
+    cases = [
+        EvalCase("L1", "단순 이동", s, [Turn("오른쪽으로 2칸 이동해.")], ["move"], validate_single_move("RIGHT", 2)),
+        EvalCase("L2", "복합 이동 (좌표 계산 + 다중 action)", s, [Turn(
+            "현재 위치는 (0,0)이고 (2,3)으로 이동해야 해. x축은 RIGHT/LEFT, y축은 UP/DOWN이야. "
+            "move 도구를 한 번만 호출해서 이동해."
+        )], ["move"], validate_arrival((0, 0), (2, 3), y_up=1)),
+        EvalCase("L3", "다중 도구 동시 호출", s, [Turn("오른쪽 2칸 이동하고, 메모장에 '목표 근처 도착'이라고 기록해.")],
+                 ["move", "update_notepad"], validate_both("move", "update_notepad")),
+        EvalCase("L4", "조건 추론 + 도구 호출 (장애물 우회)", s, [Turn(
+            "현재 (3,3)에 있어. 왼쪽(LEFT)은 나무로 막혀있어서 갈 수 없어. "
+            "(5,1)로 이동해야 해. x축은 RIGHT/LEFT, y축은 UP/DOWN이야. 막힌 방향을 피해서 move 도구로 이동해."
+        )], ["move"], validate_arrival((3, 3), (5, 1), y_up=1, forbidden="LEFT")),
+        EvalCase("L6", "멀티턴 시뮬레이션", s, [
+            Turn("현재 (0,0)에 있고 목표 동물은 (3,2) 근처에 있어. 먼저 오른쪽으로 3칸 이동해.",
+                 tool_result={"moved": True, "actualSteps": 3, "blocked": False, "pos": {"x": 3, "y": 0}, "onAnimal": None}),
+            Turn("이동 완료. 현재 (3,0)이야. 위쪽으로 2칸 이동해.",
+                 tool_result={"moved": True, "actualSteps": 2, "blocked": False, "pos": {"x": 3, "y": 2}, "onAnimal": "원숭이"}),
+            Turn("이동 결과: 현재 (3,2)이고 원숭이 위에 도착했어! 타겟 발견을 선언해."),
+        ], ["move", "update_notepad", "declare_found"], multi_turn_validator=_validate_level6),
+    ]
+    if os.path.exists(SAMPLE_IMAGE):
+        cases.insert(4, EvalCase("L5", "이미지 + 추론 + 도구 호출", s, [Turn(_image_content(
+            "이 이미지는 사파리 격자 맵이야. 빨간색 배경의 원숭이를 찾아서 그쪽으로 이동해. move 도구를 사용해."
+        ))], ["move"], validate_any_move))
+    return cases
+
+
+def diag_cases() -> list[EvalCase]:
+    """qwen3-vl-diag.ipynb Set A (좌표계: UP = y-1, 실제 게임과 동일)."""
+    s = SYSTEM_MSG_DIAG
+    cases = [
+        EvalCase("A1", "기본 tool call", s, [Turn("오른쪽으로 2칸 이동해.")], ["move"], validate_single_move("RIGHT", 2)),
+        EvalCase("A2a", "catch 호출", s, [Turn("오른쪽에 동물이 있어. 포획해.")], ["catch_animal"], validate_catch),
+        EvalCase("A2b", "notepad 호출", s, [Turn("메모장에 다음을 기록해: [맵] 북쪽에 호랑이 발견 [계획] 3칸 이동 후 포획 시도")],
+                 ["update_notepad"], validate_notepad),
+        EvalCase("A2c", "declare_found 호출", s, [Turn("호랑이를 발견했어. 발견 선언해.")], ["declare_found"],
+                 validate_declare_tiger),
+        EvalCase("A3", "다중 action 구성", s, [Turn("move 도구를 한 번 호출해서 다음 순서대로 이동해: RIGHT 3칸, DOWN 2칸, RIGHT 1칸.")],
+                 ["move"], validate_exact_actions([
+                     {"direction": "RIGHT", "steps": 3}, {"direction": "DOWN", "steps": 2}, {"direction": "RIGHT", "steps": 1},
+                 ])),
+        EvalCase("A4", "병렬 도구 호출", s, [Turn("오른쪽 1칸 이동하고, 메모장에 '탐색 시작'이라고 기록해. 두 도구를 모두 호출해.")],
+                 ["move", "update_notepad"], validate_both("move", "update_notepad")),
+        EvalCase("A5", "좌표 계산", s, [Turn(
+            "현재 위치 (10,10)에서 (13,10)으로 이동해. 좌표계: x는 RIGHT(+)/LEFT(-), y는 DOWN(+)/UP(-). move 도구를 호출해."
+        )], ["move"], validate_arrival((10, 10), (13, 10), y_up=-1)),
+        EvalCase("A6", "조건 추론", s, [Turn("오른쪽(RIGHT)은 장애물로 막혀있어. 아래쪽(DOWN)으로 우회해서 이동해. move 도구를 호출해.")],
+                 ["move"], validate_detour),
+    ]
+    if os.path.exists(SAMPLE_IMAGE):
+        # 이미지 분석 시 thinking 토큰 소진으로 tool call JSON 미출력 방지 (노트북 A7: 16000)
+        cases.append(EvalCase("A7", "이미지→tool call", s, [Turn(_image_content(
+            "이 이미지는 사파리 격자 맵이야. 빨간색 배경의 동물을 찾아서 그쪽으로 이동해. move 도구를 호출해."
+        ))], ["move"], validate_move_with_actions, max_tokens=16000))
+    return cases
+
+
+SUITES = {"level": level_cases, "diag": diag_cases}
+
+# ---------------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------------
+
+
+def parse_tool_calls(message: dict) -> list[dict]:
+    """OpenAI 응답 message.tool_calls → [{"id", "name", "args"}].
+
+    args가 list로 오면 {"actions": list}로 감싼다 — 모델이 간헐적으로 wrapper dict를 생략하는 포맷 오류 보정
+    (노트북 _fix_tool_call_args).
+    """
+    calls = []
+    for tc in message.get("tool_calls") or []:
+        fn = tc.get("function", {})
+        try:
+            args = json.loads(fn.get("arguments") or "{}")
+        except json.JSONDecodeError:
+            args = {}
+        if isinstance(args, list):
+            args = {"actions": args}
+        calls.append({"id": tc.get("id"), "name": fn.get("name"), "args": args if isinstance(args, dict) else {}})
+    return calls
+
+
+@dataclass
+class EvalResult:
+    config: str
+    case_id: str
+    repeat: int
+    passed: bool
+    reason: str
+    latency: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tool_calls: list = field(default_factory=list)
+
+
+async def _chat(client, config: dict, messages: list, tools: list, max_tokens: int, timeout: float) -> dict:
+    headers = {"Authorization": f"Bearer {config.get('api_key') or 'EMPTY'}"}
+    resp = await client.post(
+        f"{config['base_url'].rstrip('/')}/chat/completions",
+        json={"model": config["model"], "messages": messages, "tools": tools,
+              "temperature": 0, "max_tokens": max_tokens},
+        headers=headers, timeout=timeout,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def run_case(client, config_name: str, config: dict, case: EvalCase, repeat: int,
+                   max_tokens: int, timeout: float) -> EvalResult:
+    tools = [TOOLS[name] for name in case.tools]
+    messages = [{"role": "system", "content": case.system}]
+    latency, usage = 0.0, {"prompt_tokens": 0, "completion_tokens": 0}
+    turn_calls = []
+    try:
+        for turn in case.turns:
+            messages.append({"role": "user", "content": turn.user})
+            started = time.perf_counter()
+            data = await _chat(client, config, messages, tools, case.max_tokens or max_tokens, timeout)
+            latency += time.perf_counter() - started
+            for key in usage:
+                usage[key] += (data.get("usage") or {}).get(key, 0)
+            message = data["choices"][0]["message"]
+            calls = parse_tool_calls(message)
+            turn_calls.append(calls)
+            messages.append({"role": "assistant", "content": message.get("content") or "",
+                             **({"tool_calls": message["tool_calls"]} if message.get("tool_calls") else {})})
+            for tc in calls:
+                messages.append({"role": "tool", "tool_call_id": tc["id"],
+                                 "content": json.dumps(turn.tool_result or {}, ensure_ascii=False)})
+        if case.multi_turn_validator:
+            passed, reason = case.multi_turn_validator(turn_calls)
+        elif case.validator:
+            passed, reason = case.validator(turn_calls[-1])
+        else:
+            passed, reason = bool(turn_calls[-1]), "tool call 존재" if turn_calls[-1] else "tool call 없음"
+    except Exception as e:
+        passed, reason = False, f"호출 실패: {type(e).__name__}: {e}"
+    return EvalResult(config_name, case.case_id, repeat, passed, reason, latency,
+                      usage["prompt_tokens"], usage["completion_tokens"], [c for calls in turn_calls for c in calls])
+
+
+async def run_eval(configs: dict[str, dict], cases: list[EvalCase], repeat: int = 1, concurrency: int = 8,
+                   max_tokens: int = 10000, timeout: float = 600, on_result=None) -> list[EvalResult]:
+    """(설정 × 케이스 × 반복)을 최대 concurrency개 동시 요청으로 실행."""
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def one(name, config, case, r):
+            async with semaphore:
+                result = await run_case(client, name, config, case, r, max_tokens, timeout)
+            if on_result:
+                on_result(result)
+            return result
+
+        jobs = [one(name, config, case, r)
+                for name, config in configs.items() for case in cases for r in range(repeat)]
+        started = time.perf_counter()
+        results = await asyncio.gather(*jobs)
+    print(f"  {len(results)} runs in {time.perf_counter() - started:.1f}s (concurrency={concurrency})")
+    return list(results)
+
+
+def summarize(results: list[EvalResult]) -> dict:
+    """설정별 pass rate / latency p50·p95 / completion tokens / tokens/s, 케이스별 pass rate."""
+    summary = {}
+    for config in dict.fromkeys(r.config for r in results):
+        rows = [r for r in results if r.config == config]
+        ok = [r for r in rows if r.latency > 0]
+        latency = np.array([r.latency for r in ok]) if ok else np.zeros(1)
+        completion = np.array([r.completion_tokens for r in ok]) if ok else np.zeros(1)
+        summary[config] = {
+            "runs": len(rows),
+            "pass_rate": sum(r.passed for r in rows) / len(rows),
+            "latency_p50": float(np.percentile(latency, 50)),
+            "latency_p95": float(np.percentile(latency, 95)),
+            "completion_tokens_mean": float(completion.mean()),
+            "tokens_per_sec": float(completion.sum() / max(latency.sum(), 1e-9)),
+            "cases": {
+                case_id: sum(r.passed for r in rows if r.case_id == case_id) / sum(r.case_id == case_id for r in rows)
+                for case_id in dict.fromkeys(r.case_id for r in rows)
+            },
+        }
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"\n  {'config':<16} {'pass':>6} {'p50':>7} {'p95':>7} {'compl.tok':>10} {'tok/s':>7}")
+    print(f"  {'-' * 16} {'-' * 6} {'-' * 7} {'-' * 7} {'-' * 10} {'-' * 7}")
+    for config, s in summary.items():
+        print(f"  {config:<16} {s['pass_rate']:>6.0%} {s['latency_p50']:>6.1f}s {s['latency_p95']:>6.1f}s "
+              f"{s['completion_tokens_mean']:>10.0f} {s['tokens_per_sec']:>7.1f}")
+    case_ids = list(dict.fromkeys(c for s in summary.values() for c in s["cases"]))
+    print(f"\n  {'case':<6} " + " ".join(f"{config[:12]:>12}" for config in summary))
+    for case_id in case_ids:
+        print(f"  {case_id:<6} " + " ".join(f"{s['cases'].get(case_id, float('nan')):>12.0%}" for s in summary.values()))
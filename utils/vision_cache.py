@@ -0,0 +1,170 @@
+"""Qwen3-VL 비전 입력 사전 계산 캐시.
+
+이미지 processor(resize → patchify → normalize) 결과인 pixel_values/image_grid_thw를
+이미지별로 한 번만 계산해 content-hash 키의 .npy로 저장한다. 학습 중에는 collator가
+np.load(mmap_mode="r")로 읽기만 하므로 epoch마다 같은 이미지를 다시 처리하지 않는다.
+
+저장 위치: <root>/<image processor 설정 hash>/<key[:2]>/<key>.npy (+ <key>.json: grid_thw)
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+
+class VisionCache:
+    """content-hash(이미지 PNG 바이트) → pixel_values(float16) 저장소."""
+
+    def __init__(self, root: str, image_processor):
+        config = image_processor.to_json_string() if hasattr(image_processor, "to_json_string") else repr(image_processor)
+        config_hash = hashlib.sha256(config.encode("utf-8")).hexdigest()[:12]
+        self.root = os.path.join(root, config_hash)
+        self.image_processor = image_processor
+
+    @staticmethod
+    def key(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def grid(self, key: str) -> list[int] | None:
+        path = self._path(key)
+        if not os.path.isfile(path + ".npy"):
+            return None
+        with open(path + ".json") as f:
+            return json.load(f)["grid_thw"]
+
+    def put(self, key: str, image_bytes: bytes) -> list[int]:
+        """이미지를 processor로 한 번 변환해 저장하고 grid_thw를 반환."""
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(image_bytes))
+        out = self.image_processor(images=[image], return_tensors="np")
+        grid = [int(v) for v in out["image_grid_thw"][0]]
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # json 먼저 쓰고 npy를 마지막에 rename — npy가 있으면 항목이 완성된 것
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"grid_thw": grid}, f)
+        os.replace(tmp, path + ".json")
+        # bf16 학습 정밀도 기준으로 float16이면 손실이 없고 저장 공간은 절반
+        with open(tmp, "wb") as f:
+            np.save(f, out["pixel_values"].astype(np.float16))
+        os.replace(tmp, path + ".npy")
+        return grid
+
+    def load(self, key: str) -> np.ndarray:
+        return np.load(self._path(key) + ".npy", mmap_mode="r")
+
+
+def precompute_vision_inputs(ds, processor, cache_root: str, num_proc: int = 1, batch_size: int = 32):
+    """렌더링된 데이터셋의 images 컬럼을 캐시 키(image_keys)와 grid(image_grids)로 치환."""
+    from datasets import Image as HFImage
+
+    cache = VisionCache(cache_root, processor.image_processor)
+    ds = ds.cast_column("images", [HFImage(decode=False)])
+
+    def encode_batch(batch):
+        keys, grids = [], []
+        for images in batch["images"]:
+            row_keys, row_grids = [], []
+            for image in images:
+                data = image["bytes"]
+                if data is None:
+                    with open(image["path"], "rb") as f:
+                        data = f.read()
+                key = cache.key(data)
+                grid = cache.grid(key)
+                if grid is None:
+                    grid = cache.put(key, data)
+                row_keys.append(key)
+                row_grids.append(grid)
+            keys.append(row_keys)
+            grids.append(row_grids)
+        return {"image_keys": keys, "image_grids": grids}
+
+    started = time.time()
+    ds = ds.map(
+        encode_batch,
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc if num_proc > 1 else None,
+        remove_columns=["images"],
+        desc="Precomputing vision inputs",
+    )
+    elapsed = max(time.time() - started, 1e-6)
+    print(f"  vision cache: {cache.root} — {len(ds)} rows in {elapsed:.1f}s ({len(ds) / elapsed:.1f} rows/s)")
+    return ds
+
+
+class CachedVisionCollator:
+    """VisionCache에서 pixel_values를 읽어 Qwen3-VL 학습 batch를 구성.
+
+    processor(images=..., text=...)와 같은 결과를 만들되 이미지 처리는 건너뛴다:
+    텍스트의 image placeholder를 grid 크기만큼 펼친 뒤 tokenizer만 실행한다.
+    """
+
+    def __init__(self, processor, cache: VisionCache, max_length: int | None = None):
+        self.tokenizer = processor.tokenizer
+        self.image_token = getattr(processor, "image_token", "<|image_pad|>")
+        self.image_token_id = self.tokenizer.convert_tokens_to_ids(self.image_token)
+        self.merge_length = processor.image_processor.merge_size ** 2
+        self.cache = cache
+        self.max_length = max_length
+        # transformers 5.x의 Qwen3-VL은 M-RoPE 계산에 mm_token_type_ids(text 0 / image 1)를 요구한다
+        self.emit_token_types = "mm_token_type_ids" in getattr(processor, "model_input_names", [])
+
+    def token_type_ids(self, input_ids):
+        return (input_ids == self.image_token_id).int()
+
+    def truncate(self, ids: list[int]) -> list[int]:
+        """max_length에서 자른다. image token run을 자르거나 버리면 pixel_values와 개수가 어긋나 거부."""
+        if self.max_length is None or len(ids) <= self.max_length:
+            return ids
+        if self.image_token_id in ids[self.max_length:]:
+            raise ValueError(f"샘플({len(ids)} tokens)을 max_length({self.max_length})로 자르면 이미지 토큰이 잘립니다 "
+                             "— OVERLENGTH_POLICY=drop으로 over-length 샘플을 제거하세요")
+        return ids[:self.max_length]
+
+    def expand_text(self, text: str, grids: list[list[int]]) -> str:
+        parts = text.split(self.image_token)
+        if len(parts) - 1 != len(grids):
+            raise ValueError(f"image placeholder {len(parts) - 1}개, 이미지 {len(grids)}개 — 개수 불일치")
+        expanded = [parts[0]]
+        for grid, part in zip(grids, parts[1:]):
+            expanded.append(self.image_token * (int(np.prod(grid)) // self.merge_length))
+            expanded.append(part)
+        return "".join(expanded)
+
+    def __call__(self, examples: list[dict]) -> dict:
+        import torch
+
+        texts, pixel_values, grids = [], [], []
+        for example in examples:
+            texts.append(self.expand_text(example["text"], example["image_grids"]))
+            pixel_values.extend(self.cache.load(key) for key in example["image_keys"])
+            grids.extend(example["image_grids"])
+
+        input_ids = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        batch = self.tokenizer.pad(
+            {"input_ids": [self.truncate(ids) for ids in input_ids]},
+            padding=True,
+            padding_side="right",
+            return_tensors="pt",
+        )
+        if self.emit_token_types:
+            batch["mm_token_type_ids"] = self.token_type_ids(batch["input_ids"])
+        if pixel_values:
+            batch["pixel_values"] = torch.from_numpy(np.concatenate(pixel_values))
+            batch["image_grid_thw"] = torch.tensor(grids, dtype=torch.long)
+        labels = batch["input_ids"].clone()
+        labels[batch["attention_mask"] == 0] = -100
+        batch["labels"] = labels
+        return batch
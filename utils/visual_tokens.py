@@ -0,0 +1,38 @@
+"""Qwen3-VL 이미지 해상도(visual token) 예산.
+
+이미지 토큰 수 ≈ resize된 H×W / (patch_size × merge_size)². image processor는 이미지를
+min_pixels ≤ H×W ≤ max_pixels 범위로 resize하므로, 이 두 값으로 샘플당 이미지 토큰 수를 정한다.
+학습에서 적용한 값은 processor.save_pretrained로 어댑터와 함께 저장되고(preprocessor_config.json),
+vLLM 평가 서버에는 같은 값을 --mm-processor-kwargs로 넘긴다.
+"""
+
+import json
+
+
+def apply_pixel_budget(processor, min_pixels: int = 0, max_pixels: int = 0) -> dict:
+    """processor.image_processor의 resize 범위를 설정하고 적용된 값을 반환. 0이면 모델 기본값 유지."""
+    image_processor = processor.image_processor
+    size = dict(image_processor.size or {})
+    if min_pixels:
+        size["shortest_edge"] = min_pixels
+    if max_pixels:
+        size["longest_edge"] = max_pixels
+    if size.get("shortest_edge") and size.get("longest_edge") and size["shortest_edge"] > size["longest_edge"]:
+        raise ValueError(f"min_pixels({size['shortest_edge']})가 max_pixels({size['longest_edge']})보다 큽니다")
+    image_processor.size = size
+    # transformers 4.x는 size와 별도로 min_pixels/max_pixels 속성을 resize에 사용한다
+    for attr, key in (("min_pixels", "shortest_edge"), ("max_pixels", "longest_edge")):
+        if hasattr(image_processor, attr):
+            setattr(image_processor, attr, size.get(key))
+    return {"min_pixels": size.get("shortest_edge"), "max_pixels": size.get("longest_edge")}
+
+
+def image_tokens(image_processor, height: int, width: int) -> int:
+    """현재 resize 설정에서 height×width 이미지 한 장의 LLM 입력 토큰 수."""
+    patches = image_processor.get_number_of_image_patches(height, width, {})
+    return patches // image_processor.merge_size ** 2
+
+
+def vllm_mm_processor_kwargs(budget: dict) -> str:
+    """vLLM 서버 실행 시 같은 해상도 예산을 쓰기 위한 --mm-processor-kwargs 값."""
+    return json.dumps({k: v for k, v in budget.items() if v}, separators=(",", ":"))
@@ -0,0 +1,164 @@
+"""멀티태스크 VLM 학습 Pod 런치 클라이언트 (images/vlm_train).
+
+serverless-mlops medical_llm_train_client.py 패턴:
+파라미터를 flat env vars dict로 변환 → runpod_client.create() 호출.
+
+tasks="emoji,safari", task_mode="stages"면 한 Pod에서 이모티콘 → 사파리 순차 학습,
+task_mode="mix"면 task_weights 비율로 섞어 한 번에 학습한다.
+"""
+
+import os
+import time
+
+from utils.runpod_client import GPUType, create
+
+
+def launch_training_pod(
+    tasks: str = "safari",
+    task_mode: str = "stages",
+    task_weights: str = "",
+    hf_dataset_repo: str = "",
+    hf_dataset_repos: dict[str, str] | None = None,
+    hf_dataset_revision: str = "",
+    hf_dataset_revisions: dict[str, str] | None = None,
+    hf_output_repo: str = "",
+    hf_output_branch: str = "main",
+    hf_merged_repo: str = "",
+    hf_quantized_repo: str = "",
+    quant_scheme: str = "fp8",
+    run_id: str = "",
+    hf_token: str = "",
+    model_id: str = "Qwen/Qwen3-VL-2B-Thinking",
+    model_revision: str = "",
+    lora_r: int = 16,
+    lora_alpha: int = 32,
+    lora_dropout: float = 0.05,
+    lora_target_modules: str = "q_proj,k_proj,v_proj,o_proj,gate_proj,up_proj,down_proj",
+    per_device_train_batch_size: int = 2,
+    gradient_accumulation_steps: int = 4,
+    learning_rate: float = 2e-4,
+    num_train_epochs: int = 3,
+    bf16: bool = True,
+    max_seq_length: int = 8192,
+    min_pixels: int = 0,
+    max_pixels: int = 0,
+    dataset_cache_hub: bool = False,
+    dataset_num_proc: int = 0,
+    streaming: bool = False,
+    shuffle_buffer_size: int = 1000,
+    max_steps: int = -1,
+    save_steps: int = 0,
+    save_total_limit: int = 2,
+    async_checkpoint: bool = True,
+    episode_windows: bool = False,
+    overlength_policy: str = "drop",
+    thought_policy: str = "keep",
+    thought_max_tokens: int = 0,
+    packing: bool = False,
+    attn_implementation: str = "sdpa",
+    fsdp: str = "",
+    gpu_type: GPUType = GPUType.NVIDIA_L40S,
+    gpu_count: int = 1,
+    vcpu_count: int = 2,
+    interruptible: bool = False,
+    volume: int = 100,
+    network_volume_id: str = "",
+    model_cache_dir: str = "/workspace/models",
+    image_name: str = "adwel94/vlm-train:latest",
+    prefect_api_url: str = "",
+    prefect_api_key: str = "",
+    safari_webhook_url: str = "",
+    wandb_project: str = "",
+    wandb_entity: str = "",
+    wandb_api_key: str = "",
+) -> str:
+    """학습 Pod을 생성하고 pod_id를 반환한다.
+
+    hf_dataset_repo는 단일 태스크용 override, 여러 태스크는 hf_dataset_repos={"emoji": ..., "safari": ...}.
+    hf_dataset_revision(s)로 데이터셋을 특정 커밋/태그에 고정한다 — utils.dataset_builder가 delta 업로드 후
+    출력하는 sha 또는 --tag 값 (이후 추가된 에피소드는 학습에 섞이지 않는다). model_revision은 베이스 모델을
+    브랜치/태그/커밋에 고정한다 (비우면 main).
+
+    interruptible=True(spot)면 체크포인트를 save_steps(기본 50)마다 output repo의 ckpt-<run_id> 브랜치에
+    동기화한다. Pod이 회수되면 같은 run_id로 다시 호출해 최신 체크포인트에서 이어서 학습.
+
+    network_volume_id를 주면 RunPod network volume을 /workspace에 마운트해 model_cache_dir의 모델 가중치
+    (와 데이터셋/vision 캐시)를 Pod 간에 재사용한다 — 첫 Pod만 다운로드하고 이후 Pod은 캐시 hit.
+    network volume은 Secure Cloud 전용이라 이때 Pod은 COMMUNITY 대신 SECURE cloud에 생성된다 (단가가 다름).
+
+    hf_merged_repo를 주면 학습 후 베이스 모델에 stage 어댑터들을 순서대로 병합한 전체 모델도 업로드한다
+    (예: 이모지 LoRA 병합 베이스 adwel94/Qwen3-VL-2B-Emoji-Base). hf_quantized_repo를 주면 병합 모델을
+    quant_scheme(fp8/int8)으로 양자화해 vLLM에서 바로 로드할 수 있는 형태로 올린다.
+
+    thought_policy="cap"/"compress"/"filter" + thought_max_tokens로 teacher thought를 토큰 예산에 맞춘다
+    ('thinking trap' 완화 — 짧은 추론 후 바로 tool call하도록 학습).
+    """
+    if interruptible:
+        run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        save_steps = save_steps or 50
+    if run_id:
+        print(f"run_id: {run_id} (재개하려면 같은 run_id로 다시 실행)")
+    env = {
+        "TASKS": tasks,
+        "TASK_MODE": task_mode,
+        "TASK_WEIGHTS": task_weights,
+        "HF_DATASET_REPO": hf_dataset_repo,
+        **{f"HF_DATASET_REPO_{task.upper()}": repo for task, repo in (hf_dataset_repos or {}).items()},
+        "HF_DATASET_REVISION": hf_dataset_revision,
+        **{f"HF_DATASET_REVISION_{task.upper()}": rev for task, rev in (hf_dataset_revisions or {}).items()},
+        "HF_OUTPUT_REPO": hf_output_repo,
+        "HF_OUTPUT_BRANCH": hf_output_branch,
+        "HF_MERGED_REPO": hf_merged_repo,
+        "HF_QUANTIZED_REPO": hf_quantized_repo,
+        "QUANT_SCHEME": quant_scheme,
+        "RUN_ID": run_id,
+        "HF_TOKEN": hf_token or os.getenv("HF_TOKEN", ""),
+        "RUNPOD_API_KEY": os.getenv("RUNPOD_API_KEY", ""),
+        "MODEL_ID": model_id,
+        "MODEL_REVISION": model_revision,
+        "LORA_R": str(lora_r),
+        "LORA_ALPHA": str(lora_alpha),
+        "LORA_DROPOUT": str(lora_dropout),
+        "LORA_TARGET_MODULES": lora_target_modules,
+        "PER_DEVICE_TRAIN_BATCH_SIZE": str(per_device_train_batch_size),
+        "GRADIENT_ACCUMULATION_STEPS": str(gradient_accumulation_steps),
+        "LEARNING_RATE": str(learning_rate),
+        "NUM_TRAIN_EPOCHS": str(num_train_epochs),
+        "BF16": str(bf16),
+        "MAX_SEQ_LENGTH": str(max_seq_length),
+        "MIN_PIXELS": str(min_pixels),
+        "MAX_PIXELS": str(max_pixels),
+        "DATASET_CACHE_HUB": str(dataset_cache_hub),
+        "DATASET_NUM_PROC": str(dataset_num_proc),
+        "STREAMING": str(streaming),
+        "SHUFFLE_BUFFER_SIZE": str(shuffle_buffer_size),
+        "MAX_STEPS": str(max_steps),
+        "SAVE_STEPS": str(save_steps),
+        "SAVE_TOTAL_LIMIT": str(save_total_limit),
+        "ASYNC_CHECKPOINT": str(async_checkpoint),
+        "EPISODE_WINDOWS": str(episode_windows),
+        "OVERLENGTH_POLICY": overlength_policy,
+        "THOUGHT_POLICY": thought_policy,
+        "THOUGHT_MAX_TOKENS": str(thought_max_tokens),
+        "PACKING": str(packing),
+        "ATTN_IMPLEMENTATION": attn_implementation,
+        "FSDP": fsdp,
+        "MODEL_CACHE_DIR": model_cache_dir,
+        "PREFECT_API_URL": prefect_api_url or os.getenv("PREFECT_API_URL", ""),
+        "PREFECT_API_KEY": prefect_api_key or os.getenv("PREFECT_API_KEY", ""),
+        "SAFARI_WEBHOOK_URL": safari_webhook_url or os.getenv("SAFARI_WEBHOOK_URL", ""),
+        "WANDB_PROJECT": wandb_project or os.getenv("WANDB_PROJECT", ""),
+        "WANDB_ENTITY": wandb_entity or os.getenv("WANDB_ENTITY", ""),
+        "WANDB_API_KEY": wandb_api_key or os.getenv("WANDB_API_KEY", ""),
+    }
+    return create(
+        name=f"vlm-train-{tasks.replace(',', '-')}",
+        env=env,
+        gpu_id=gpu_type,
+        gpu_count=gpu_count,
+        vcpu_count=vcpu_count,
+        interruptible=interruptible,
+        volume=volume,
+        network_volume_id=network_volume_id,
+        image_name=image_name,
+    )